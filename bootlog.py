@@ -0,0 +1,32 @@
+# bootlog.py — Chronométrage des phases de démarrage de code.py
+# mark("phase") note l'instant monotone en ms depuis la mise sous tension (pour
+# une box alimentée par l'USB : depuis le branchement) ; report() affiche la
+# durée de chaque phase et le total jusqu'au premier scan des boutons, c.-à-d.
+# jusqu'au premier appui utilisable. Quelques tuples en RAM, rien sur la flash.
+
+import time
+
+_phases = []  # (nom, ms depuis la mise sous tension)
+
+
+def now_ms():
+    return time.monotonic_ns() // 1000000
+
+
+def mark(name):
+    _phases.append((name, now_ms()))
+
+
+def phases():
+    """[(nom, t_ms, durée_ms)] ; la première durée part de la mise sous tension."""
+    out = []
+    prev = 0
+    for name, t in _phases:
+        out.append((name, t, t - prev))
+        prev = t
+    return out
+
+
+def report():
+    for name, t, delta in phases():
+        print(f"[BOOT] {name:<10} +{delta:>5} ms  (t={t} ms)")
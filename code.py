@@ -1,22 +1,33 @@
+import bootlog
+import logger
+bootlog.mark("start")  # phases du boot : voir bootlog.report() au premier scan
+
 import board
 import digitalio
-import pwmio
 import time
 import usb_hid
-import json
 import os
+import microcontroller
 from adafruit_hid.keyboard import Keyboard
-from adafruit_hid.keycode import Keycode
 from adafruit_hid.keyboard_layout_win_fr import KeyboardLayout  # Layout FR
 
-# BLE importé mais non utilisé en mode normal ; conservé si besoin futur
-import adafruit_ble
-from adafruit_ble.advertising import Advertisement
-from adafruit_ble.advertising.standard import ProvideServicesAdvertisement
-from adafruit_ble.services.standard.hid import HIDService
-from adafruit_ble.services.standard.device_info import DeviceInfoService
-
-from password_manager import PasswordManager
+# Sous-systèmes optionnels importés là où ils servent, pas au boot :
+# pwmio dans macro_marche(), setup (Wi-Fi/HTTP) seulement si /setup existe,
+# adafruit_ble (non utilisé en mode normal) dans la fonction qui en aura besoin.
+
+from vault import Vault, wipe_buffer
+from scanner import Event, make_scanner, now_ms
+from hid_stream import ReportWriter, TextFileStream, compile_text
+from executor import Executor, OP_CALL, OP_DEFER, OP_TEMPLATE, OP_WAIT, PROFILE_NORMAL, args_of
+import config_cache
+from config_compiler import (DEFAULT_PROFILE, PROFILE_NEXT, command_steps, find_cycle,
+                             load_buttons_from_json, load_macro, load_profile_buttons,
+                             matrix_from_json, pin_from_name, profile_names,
+                             profile_switch_from_json, read_commands)
+from leds import LedPatterns
+from gestures import KINDS, TAP, GestureRecognizer
+from stats import SECRET, MacroStats
+bootlog.mark("imports")
 #3 → 2 → 1 → 3 → 2 → 1 → 3 → 2 → 1 → 3 → 2 → 1 → 5 → 2 → 3
 
 # -------------------- Helpers setup / fichiers --------------------
@@ -28,76 +39,24 @@ def setup_mode():
         return False
 
 
-def _pin_from_name(name: str):
-    # Attend "GPxx"
-    try:
-        return getattr(board, name)
-    except AttributeError:
-        raise ValueError(f"Pin inconnu: {name}")
-
-
-def load_buttons_from_json(path="/commands.json"):
-    try:
-        with open(path, "r") as f:
-            data = json.load(f)
-    except Exception as e:
-        print(f"[WARN] Impossible de lire {path}: {e}")
-        return []
-
-    btns = []
-    seen_ids = set()
-    for entry in data.get("buttons", []):
-        try:
-            bid = int(entry["id"])
-            if bid in seen_ids:
-                print(f"[WARN] id {bid} dupliqué: ignoré")
-                continue
-            seen_ids.add(bid)
-            pin = _pin_from_name(entry["pin"])
-            color = entry.get("color", "")
-            macro = entry.get("macro", "")
-            cmd = entry.get("command", "")
-            pass_key = entry.get("pass_key", "")
-            winsearch = bool(entry.get("winsearch", True))
-            delay_ms = int(entry.get("delay_ms", 500))
-
-            btns.append({
-                "id": bid,
-                "couleur": color,
-                "pin": pin,
-                "macro": macro,          # ex: "demeter"
-                "command": cmd,          # fallback direct si macro vide
-                "pass_key": pass_key,
-                "winsearch": winsearch,
-                "delay_ms": delay_ms
-            })
-        except Exception as e:
-            print(f"[WARN] bouton ignoré (entrée invalide): {entry} ; err={e}")
-            continue
-    return btns
-
-
 # -------------------- LEDs feedback --------------------
+# Motifs non bloquants (leds.py) : mis en file ici, joués par leds.tick() dans les boucles.
 def blink_ok(n: int):
-    """Clignote la LED verte n fois (0,2s ON / 0,2s OFF)."""
-    for _ in range(n):
-        led.value = True
-        time.sleep(0.2)
-        led.value = False
-        time.sleep(0.2)
+    """Clignote la LED verte n fois (0,2s ON / 0,2s OFF), sans bloquer."""
+    led.blink(n)
 
 
 def blink_ko(n: int):
-    """Clignote la LED rouge n fois (0,2s ON / 0,2s OFF)."""
-    for _ in range(n):
-        led_red.value = True
-        time.sleep(0.2)
-        led_red.value = False
-        time.sleep(0.2)
+    """Clignote la LED rouge n fois (0,2s ON / 0,2s OFF), sans bloquer."""
+    led_red.blink(n)
 
 
 # -------------------- Macros "musique" (exemple hors JSON) --------------------
+# Une macro Python macro_<name>() ne joue rien elle-même : elle retourne ses
+# étapes (op, arg), exécutées par tranches comme une macro JSON (annulables).
 def macro_marche():
+    import pwmio
+
     # Define the notes (in Hz) and corresponding durations (in seconds)
     NOTES = [
         (392, 0.5),  # G
@@ -119,48 +78,90 @@ def macro_marche():
         (466, 0.15), # Bb
         (392, 1.0),  # G
     ]
-    buzzer = pwmio.PWMOut(board.GP20, variable_frequency=True)
+    buzzer = []  # PWMOut, ouvert par la première étape
+
+    def open_buzzer():
+        buzzer.append(pwmio.PWMOut(board.GP20, variable_frequency=True))
+
+    def close_buzzer():  # aussi sur annulation : le buzzer se tait
+        if buzzer:
+            buzzer.pop().deinit()
+
+    def note(frequency):
+        def play():
+            buzzer[0].frequency = frequency
+            buzzer[0].duty_cycle = 2**15
+        return play
+
+    def mute():
+        buzzer[0].duty_cycle = 0
+
+    steps = [(OP_DEFER, close_buzzer), (OP_CALL, open_buzzer)]
     for frequency, duration in NOTES:
-        buzzer.frequency = frequency
-        buzzer.duty_cycle = 2**15
-        time.sleep(duration)
-        buzzer.duty_cycle = 0
-        time.sleep(0.05)
-    buzzer.deinit()
+        steps += [(OP_CALL, note(frequency)), (OP_WAIT, int(duration * 1000)),
+                  (OP_CALL, mute), (OP_WAIT, 50)]
+    return steps
 
 
 # -------------------- USB HID --------------------
 keyboard = Keyboard(usb_hid.devices)
 keyboard_layout = KeyboardLayout(keyboard)
+writer = ReportWriter(keyboard)
 
 # LED carte
-led_board = digitalio.DigitalInOut(board.LED)
-led_board.direction = digitalio.Direction.OUTPUT
+led_board_io = digitalio.DigitalInOut(board.LED)
+led_board_io.direction = digitalio.Direction.OUTPUT
 
 # Switch ON/OFF (pull-up)
 switch = digitalio.DigitalInOut(board.GP15)
 switch.direction = digitalio.Direction.INPUT
 switch.pull = digitalio.Pull.UP
 
-# Charge config boutons
-buttons_config = load_buttons_from_json()
-
-# Instancie les entrées physiques
-buttons = []
-for config in buttons_config:
-    button = digitalio.DigitalInOut(config["pin"])
-    button.direction = digitalio.Direction.INPUT
-    button.pull = digitalio.Pull.UP
-    buttons.append((
-        button,
-        config["id"],
-        config["couleur"],
-        config["macro"],
-        config["command"],
-        config["pass_key"],
-        config.get("winsearch", True),
-        config.get("delay_ms", 500)
-    ))
+# Charge config boutons : image compilée (config.bin) si à jour, sinon JSON
+config_image = config_cache.load()
+buttons_config = None
+matrix = None
+if config_image:
+    try:
+        buttons_config = config_image.get("buttons")
+        matrix = config_image.get("matrix")
+        profile_switch = config_image.get("profile_switch")
+        banks = [(name, config_image.get("profile:" + name)) for name in config_image.get("profiles")]
+    except ValueError as e:
+        logger.warn("[CACHE] %s → JSON", e)
+        config_image = None
+        buttons_config = None
+if buttons_config is None:
+    commands = read_commands() or {}
+    buttons_config = load_buttons_from_json(data=commands)
+    try:
+        matrix = matrix_from_json(commands)
+    except ValueError:
+        matrix = None  # boutons de la matrice déjà écartés (avertissement affiché)
+    profile_switch = profile_switch_from_json(commands)
+    banks = [(name, load_profile_buttons(name, commands, buttons_config)) for name in profile_names()]
+
+# Profils : tous compilés ici, une liste de configs par profil ; un bouton que
+# le profil ne redéfinit pas y est la config de commands.json elle-même (partagée)
+PROFILES = [(DEFAULT_PROFILE, buttons_config)]
+PROFILES += [(name, [b or base for b, base in zip(btns, buttons_config)])
+             for name, btns in banks if btns is not None]
+if profile_switch:  # geste réservé : profil suivant, dans tous les profils
+    for _, btns in PROFILES:
+        for config in btns:
+            if config["id"] == profile_switch[0]:
+                config["macro" if profile_switch[1] == "tap" else profile_switch[1]] = PROFILE_NEXT
+bootlog.mark("config")
+
+# Scan des entrées physiques : file d'événements appui/relâchement (index = rang dans buttons_config).
+# Touche de matrice : (rang, colonne) ; keypad scanne en fond, coût constant quel que soit le nombre
+scanner = make_scanner(
+    [(config["row"], config["col"]) if config["row"] >= 0 else pin_from_name(config["pin"])
+     for config in buttons_config],
+    debounce_ms=[config["debounce_ms"] for config in buttons_config],
+    matrix=matrix and ([pin_from_name(p) for p in matrix["rows"]], [pin_from_name(p) for p in matrix["cols"]],
+                       matrix["columns_to_anodes"], matrix["diodes"]),
+)
 
 # Comptage appuis (mode OFF → construction aes_key)
 button_press_counts = {config["id"]: 0 for config in buttons_config}
@@ -170,211 +171,238 @@ display_message = True
 transition_message_displayed = False
 
 
-# -------------------- ENVOI d'une seule action --------------------
-def send_command(winsearch, command, password_key=None, delay_ms=1000):
-    global aes_key
-    led.value = True
-    print(f"Delay : {delay_ms} ms") 
+# -------------------- Exécution des macros --------------------
+# Durées par macro (stats.py) : cumulées depuis la NVM, réécrites au passage sur OFF
+macro_stats = MacroStats()
+macro_stats.load(microcontroller.nvm)
 
-    if winsearch:
-        keyboard.press(Keycode.WINDOWS, Keycode.R)
-        keyboard.release_all()
-        
-        time.sleep(max(0, delay_ms)/1000)
-        
 
-    keyboard_layout.write(command)
-    time.sleep(0.2)
-    led.value = False
+def _span(name, kind, us):
+    # span sans nom (_resolve_secret) : compté pour la macro en cours
+    macro_stats.record(name or executor.name or "?", kind, us)
 
-    if password_key:
-        led.value = True
-        print(f"Longueur de la clé AES : {len(aes_key)} octets")
-        if len(aes_key) == 24:
+
+def _resolve_secret(password_key):
+    """Flux HID du secret + Entrée, depuis le coffre déverrouillé (ni flash ni AES ici).
+
+    None si le coffre est verrouillé ou le secret absent : l'exécuteur abandonne
+    alors la macro (rien de ce qui suit n'est tapé)."""
+    if not vault.unlocked:
+        led_red.value = True
+        return None
+    t0 = time.monotonic_ns()
+    password = bytearray()
+    secret = vault.get(password_key)
+    try:
+        if secret is None:
+            raise KeyError(password_key)
+        compile_text(KeyboardLayout, secret, password)
+        compile_text(KeyboardLayout, "\n", password)
+        _span("", SECRET, (time.monotonic_ns() - t0) // 1000)
+        blink_ok(3)
+    except Exception as e:
+        wipe_buffer(password)
+        blink_ko(3)
+        logger.error("[ERR] secret '%s': %s", password_key, type(e).__name__)
+        return None
+    return password
+
+
+# Commandes à {{secret:nom}} : flux complet (texte + secrets) construit une fois
+# depuis le coffre, puis envoyé tel quel ; effacé au retour sur OFF
+_expanded = {}  # modèle -> bytearray
+
+
+def _expand_template(parts):
+    stream = _expanded.get(parts)
+    if stream is not None:
+        return stream
+    if not vault.unlocked:
+        led_red.value = True
+        return None
+    t0 = time.monotonic_ns()
+    stream = bytearray()
+    for part in parts:
+        if isinstance(part, str):
+            secret = vault.get(part)
             try:
-                manager = PasswordManager(aes_key)
-                password = manager.load_password(password_key) + '\n'
-                blink_ok(3)
+                if secret is None:
+                    raise KeyError(part)
+                compile_text(KeyboardLayout, secret, stream)
             except Exception as e:
-                password = ""
-                blink_ko(3)
-                print(f"[ERR] PasswordManager.load_password: {e}")
+                wipe_buffer(stream)
+                logger.error("[ERR] secret '%s': %s", part, type(e).__name__)
+                return None
         else:
-            password = ""
-            led.value = False
-            led_red.value = True
-
-        time.sleep(2)  # laisser l'appli se connecter
-        keyboard_layout.write(password)
-        time.sleep(0.5)
-        led.value = False
-
-def run_action(a):
-    """Exécute UNE action normalisée (texte OU combo de touches)."""
-    # Priorité aux combos de touches si présents
-    if a.get("keys"):
-        kcs = _keycodes_from_names(a["keys"])
-        if kcs:
-            keyboard.send(*kcs)  # press + release
-        else:
-            print("[MACROS] aucune touche valide dans 'keys'")
-    else:
-        # Action "texte" classique
-        send_command(
-            a.get("winsearch", False),
-            a.get("command", "") or "",
-            (a.get("password_key") or None),
-            a.get("delay_ms", 0)
-        )
+            stream.extend(part)
+    _expanded[parts] = stream
+    if executor.busy:  # pas préparé au passage OFF→ON : compté dans la macro
+        _span("", SECRET, (time.monotonic_ns() - t0) // 1000)
+    return stream
 
-    # Pause optionnelle de fin d’action
-    sm = int(a.get("sleep_ms", 0))
-    if sm > 0:
-        time.sleep(sm / 1000)
 
+def _expand_templates():
+    """Au passage OFF→ON : modèles des boutons et des macros déjà chargées."""
+    programs = [config["steps"] for _, btns in PROFILES for config in btns]
+    programs += [program for program in MACROS.values() if program is not None]
+    n = 0
+    for program in programs:
+        for parts in args_of(program, OP_TEMPLATE):
+            if parts not in _expanded and _expand_template(parts) is not None:
+                n += 1
+    return n
 
-# -------------------- Système de MACROS JSON --------------------
-# Structure acceptée dans macros/<name>.json :
-# {
-#   "actions": [
-#     { "winsearch": true/false, "delay_ms": int, "command": "str", "password_key": "str", "sleep_ms": int },
-#     ...
-#   ]
-# }
-
-def _norm_action(a):
-    """Normalise une action JSON en dict complet (texte OU combo de touches)."""
-    try:
-        # keys peut être une liste ["CTRL","D"] ou une string "CTRL+D"
-        raw_keys = a.get("keys")
-        if isinstance(raw_keys, str):
-            keys = [s.strip() for s in raw_keys.split("+") if s.strip()]
-        elif isinstance(raw_keys, list):
-            keys = [str(x).strip() for x in raw_keys if str(x).strip()]
-        else:
-            keys = []
-
-        return {
-            "winsearch": bool(a.get("winsearch", False)),
-            "delay_ms": int(a.get("delay_ms", 0)),
-            "command": str(a.get("command", "")),
-            "password_key": str(a.get("password_key", "")),
-            "sleep_ms": int(a.get("sleep_ms", 0)),
-            "keys": keys,
-        }
-    except Exception as e:
-        print(f"[MACROS] action invalide: {a} ; err={e}")
+
+def _wipe_templates():
+    for stream in _expanded.values():
+        wipe_buffer(stream)
+    _expanded.clear()
+
+
+def _on_macro_error(name, e):
+    blink_ko(2)
+
+
+def _host_signal():
+    """Signal "hôte prêt" : LED Scroll Lock du rapport de sortie clavier (basculée par tools/host_sync.py)."""
+    return keyboard.led_on(Keyboard.LED_SCROLL_LOCK)
+
+
+def _python_macro(name):
+    """Étapes de la fonction macro_<name>() ; None si elle n'existe pas ou n'en retourne pas."""
+    func_name = f"macro_{name}"
+    if func_name not in globals():
+        return None
+    steps = globals()[func_name]()
+    if not isinstance(steps, list):
+        logger.warn("[MACROS] %s() doit retourner ses étapes (op, arg)", func_name)
         return None
+    return steps
 
-def _keycodes_from_names(names):
-    """Convertit une liste de noms ['CTRL','D','ENTER'] en Keycodes."""
-    out = []
-    for n in (names or []):
-        u = n.upper()
-        if u in ("CTRL", "CONTROL", "LEFT_CTRL", "LCTRL"): out.append(Keycode.CONTROL)
-        elif u in ("ALT", "LEFT_ALT", "LALT"):             out.append(Keycode.ALT)
-        elif u in ("SHIFT", "LEFT_SHIFT", "LSHIFT"):       out.append(Keycode.SHIFT)
-        elif u in ("WIN", "WINDOWS", "GUI"):               out.append(Keycode.WINDOWS)
-        elif u in ("ENTER", "RETURN"):                     out.append(Keycode.ENTER)
-        elif u in ("TAB",):                                out.append(Keycode.TAB)
-        elif u in ("ESC", "ESCAPE"):                       out.append(Keycode.ESCAPE)
-        elif u in ("SPACE", "SPACEBAR"):                   out.append(Keycode.SPACE)
-        elif u in ("BKSP", "BACKSPACE"):                   out.append(Keycode.BACKSPACE)
-        elif u in ("UP", "ARROW_UP"):                      out.append(Keycode.UP_ARROW)
-        elif u in ("DOWN", "ARROW_DOWN"):                  out.append(Keycode.DOWN_ARROW)
-        elif u in ("LEFT", "ARROW_LEFT"):                  out.append(Keycode.LEFT_ARROW)
-        elif u in ("RIGHT", "ARROW_RIGHT"):                out.append(Keycode.RIGHT_ARROW)
-        elif len(u) == 1 and "A" <= u <= "Z":              out.append(getattr(Keycode, u))
-        else:
-            print(f"[KEYS] Ignoré: '{n}' (non mappé)")
-    return out
 
+def _resolve_macro(name):
+    """Macro appelée par une action "call" : JSON, sinon fonction macro_<name>."""
+    program = macro_steps(name)
+    if program is None:
+        program = _python_macro(name)
+    return program
+
+
+# type_file : un seul lecteur (tampon de 256 octets réutilisé), une macro à la fois
+file_stream = TextFileStream(KeyboardLayout)
+
+executor = Executor(writer, resolve_secret=_resolve_secret, on_error=_on_macro_error,
+                    host_signal=_host_signal, open_file=file_stream.open,
+                    resolve_macro=_resolve_macro, resolve_template=_expand_template,
+                    on_span=_span)
 
-def load_macros_from_dir(base="/macros"):
-    """Charge toutes les macros JSON en mémoire: {name: [actions...]}"""
-    macros = {}
-    try:
-        files = os.listdir(base)
-    except OSError:
-        print(f"[MACROS] dossier absent: {base}")
-        return {}
-
-    for fn in files:
-        if not fn.endswith(".json"):
-            continue
-        name = fn[:-5]  # sans .json
-        path = base + "/" + fn
-        try:
-            with open(path, "r") as f:
-                data = json.load(f)
-        except Exception as e:
-            print(f"[MACROS] lecture échouée {path}: {e}")
-            continue
-
-        actions = data.get("actions")
-        # tolérance: certains pourraient écrire "action" (singulier)
-        if actions is None and "action" in data:
-            actions = data["action"]
-        if isinstance(actions, dict):
-            actions = [actions]
-        if not isinstance(actions, list):
-            print(f"[MACROS] format invalide dans {path} (attendu 'actions' liste)")
-            continue
-
-        norm = []
-        for a in actions:
-            if not isinstance(a, dict):
-                continue
-            na = _norm_action(a)
-            if na is not None:
-                norm.append(na)
 
-        macros[name] = norm
-        print(f"[MACROS] chargé {name} ({len(norm)} action(s))")
-    print(f"[MACROS] total: {len(macros)} macro(s)")
-    return macros
+# -------------------- Système de MACROS JSON --------------------
+# Format des fichiers macros/<name>.json et compilation : config_compiler.py
+
+# Chargées à la première utilisation (ou en tâche de fond, voir boucle) depuis
+# config.bin, ou compilées depuis le JSON : name -> programme, ou None (pas de JSON valide)
+MACROS = {}
+_macro_backlog = list(set(config[k].strip() for _, btns in PROFILES for config in btns
+                          for k in ("macro", "double", "hold", "chord")
+                          if config[k] and not config[k].startswith("@")))
+
+
+def macro_steps(name):
+    if name not in MACROS:
+        steps = None
+        if config_image:
+            try:
+                steps = config_image.get("macro:" + name)  # image à jour : absente = pas de JSON
+            except ValueError as e:
+                logger.warn("[CACHE] %s → JSON", e)
+                steps = load_macro(name)
+        else:
+            steps = load_macro(name)
+        MACROS[name] = steps
+    return MACROS[name]
 
 
-MACROS = load_macros_from_dir("/macros")
+def run_macro(name: str, now=0, profile=PROFILE_NORMAL) -> bool:
+    """Démarre une macro par nom : fichier JSON prioritaire, sinon fonction macro_<name>.
 
-def run_macro(name: str) -> bool:
-    """Exécute macro par nom : fichier JSON prioritaire, sinon fonction macro_<name>."""
+    L'exécution se fait ensuite par tranches dans executor.tick() (boucle principale).
+    `profile` (celui du bouton) s'applique sauf si la macro a son propre typing_profile.
+    """
     name = (name or "").strip()
     if not name:
         return False
 
-    if name in MACROS:
-        actions = MACROS[name]
-        print(f"[MACROS] exec fichier '{name}' ({len(actions)} action(s))")
-        for idx, a in enumerate(actions, start=1):
-            try:
-                run_action(a)
-            except Exception as e:
-                print(f"[MACROS] action #{idx} échouée: {e}")
-                blink_ko(1)
-                return False           # <-- erreur ⇒ False
-        return True                     # <-- succès ⇒ True
-
-    func_name = f"macro_{name}"
-    if func_name in globals():
-        print(f"[MACROS] exec fonction {func_name}()")
-        try:
-            globals()[func_name]()
-            return True
-        except Exception as e:
-            print(f"[MACROS] erreur dans {func_name}: {e}")
-            blink_ko(2)
+    program = macro_steps(name)
+    if program is not None:
+        cycle = find_cycle(name, macro_steps)
+        if cycle:
+            logger.warn("[MACROS] appel circulaire refusé: %s", " → ".join(cycle))
             return False
+        logger.info("[MACROS] exec fichier '%s' (%d instruction(s))", name, len(program[0]) // 3)
+        return executor.start(program, name, now, profile)
+
+    steps = _python_macro(name)
+    if steps is not None:
+        logger.info("[MACROS] exec fonction macro_%s() (%d étape(s))", name, len(steps))
+        return executor.start(steps, name, now)
 
-    print(f"[MACROS] inconnue: '{name}' (pas de fichier JSON ni de fonction)")
+    logger.warn("[MACROS] inconnue: '%s' (pas de fichier JSON ni de fonction)", name)
     return False
 
 
 
+# -------------------- Gestes des boutons (gestures.py) --------------------
+def _on_gesture(key, kind, ts):
+    """Tap : macro ou commande du bouton (ou annulation) ; double / hold / chord : leur macro."""
+    config = buttons_config[key]
+    if kind == TAP and config["cancel"]:
+        if executor.cancel():
+            blink_ko(1)
+        return
+    logger.debug("[GESTES] bouton %d : %s", config["id"], KINDS[kind])
+    name = config["macro"] if kind == TAP else config[KINDS[kind]]
+    if name.startswith("@"):  # changement de profil, même pendant une macro
+        _select_profile(name[1:])
+        return
+    if executor.busy:
+        return  # une macro à la fois : geste ignoré pendant l'exécution
+    if name:
+        if not run_macro(name, ts, config["profile"]):
+            blink_ko(2)
+    else:
+        executor.start(config["steps"], f"bouton {config['id']}", ts, config["profile"])
+
+
+# Profil actif : un reconnaisseur par profil, au même rang que dans PROFILES
+# (qui garde sa forme (nom, configs)) ; changer de profil = changer de pointeur
+RECOGNIZERS = [GestureRecognizer(btns, _on_gesture) for _, btns in PROFILES]
+_profiles_by_name = {name: i for i, (name, _) in enumerate(PROFILES)}
+profile_index = 0
+gestures = RECOGNIZERS[0]
+
+
+def _select_profile(target):
+    """"next" ou nom de profil : bascule sans lecture de fichier ; la LED verte
+    clignote (rang du profil + 1) fois."""
+    global profile_index, buttons_config, gestures
+    i = (profile_index + 1) % len(PROFILES) if target == PROFILE_NEXT[1:] else _profiles_by_name.get(target)
+    if i is None:
+        logger.warn("[PROFIL] inconnu: '%s'", target)
+        blink_ko(2)
+        return
+    gestures.reset()  # geste en cours : abandonné (le bouton tenu est ignoré jusqu'au relâchement)
+    profile_index = i
+    buttons_config = PROFILES[i][1]
+    gestures = RECOGNIZERS[i]
+    led.clear()
+    led.blink(i + 1, 120, 120)
+    logger.info("[PROFIL] %s", PROFILES[i][0])
+
+
 # -------------------- (Exemples de macros fonctionnelles en fallback) --------------------
 def macro_example():
-    send_command(True, "https://www.fillon.org\n", "",1000)
-    time.sleep(2)
+    return command_steps(True, "https://www.fillon.org\n", "", 1000) + [(OP_WAIT, 2000)]
     
 
 
@@ -388,8 +416,8 @@ faux_gnd.direction = digitalio.Direction.OUTPUT
 faux_gnd.value = False
 
 # LED verte
-led = digitalio.DigitalInOut(board.GP17)
-led.direction = digitalio.Direction.OUTPUT
+led_io = digitalio.DigitalInOut(board.GP17)
+led_io.direction = digitalio.Direction.OUTPUT
 
 # Faux GND GP8
 faux_gnd2 = digitalio.DigitalInOut(board.GP8)
@@ -397,100 +425,143 @@ faux_gnd2.direction = digitalio.Direction.OUTPUT
 faux_gnd2.value = False
 
 # LED rouge
-led_red = digitalio.DigitalInOut(board.GP9)
-led_red.direction = digitalio.Direction.OUTPUT
+led_red_io = digitalio.DigitalInOut(board.GP9)
+led_red_io.direction = digitalio.Direction.OUTPUT
+
+# Canaux LED : .value = niveau de repos, .blink(n) = motif prioritaire non bloquant
+leds = LedPatterns()
+led = leds.add("green", led_io)
+led_red = leds.add("red", led_red_io)
+led_board = leds.add("board", led_board_io)
+bootlog.mark("gpio")
 
 
 # -------------------- Mode setup (Wi-Fi/HTTP) --------------------
 if setup_mode():
     import setup
-    setup.run(blink_ok=blink_ok, blink_ko=blink_ko, led=led, led_red=led_red)
+    setup.run(blink_ok=blink_ok, blink_ko=blink_ko, led=led, led_red=led_red, tick=leds.tick)
 
 
 # -------------------- Boot feedback --------------------
 blink_ko(3)
+led.pause(1200)  # vert après le rouge, comme avant
 blink_ok(3)
 
 aes_key = ''
+vault = Vault()  # déverrouillé au passage OFF→ON, effacé au retour sur OFF
 
 
 # -------------------- Boucle principale --------------------
-i = 0
+event = Event()
+first_scan = True
 while True:
+    now = now_ms()
+    scanner.update(now)
+    active = False  # appui traité ce tour-ci : pas de vidage du journal
+    if first_scan:  # boutons utilisables à partir d'ici
+        bootlog.mark("first_scan")
+        bootlog.report()
+        first_scan = False
     current_switch_state = switch.value
-    led.value = False
-    led_red.value = False
 
     if current_switch_state:  # Switch OFF (valeur HIGH) → capture AES key
         if display_message:
-            print("Switch à OFF :")
-            print("Presser les boutons.")
+            logger.info("Switch à OFF :")
+            logger.info("Presser les boutons.")
             display_message = False
 
-        for button, id, couleur, macro, command, pass_key, winsearch, delay_ms in buttons:
-            if not button.value:  # appui
-                button_press_counts[id] += 1
-                button_press_order.append(id)
-                led.value = True
-                print(f"Bouton pressé : ID {id}")
-
-                # Construction de la chaîne AES 24
-                button_sequence_str = ''.join(str(i) for i in button_press_order)
-                button_press_counts_str = ''.join(
-                    f"{i}{button_press_counts[i]}"
-                    for i in sorted(button_press_counts) if button_press_counts[i] > 0
-                )
-                final_str = f"{button_sequence_str}X{button_press_counts_str}"
-                print(final_str)
-                print(f"Longueur de la chaîne : {len(final_str)}")
-
-                if len(final_str) == 24:
-                    aes_key = final_str
+        while scanner.events.get_into(event):
+            active = True
+            led.value = event.pressed  # LED verte tenue tant que le bouton est enfoncé
+            if not event.pressed:
+                continue
+            id = buttons_config[event.key_number]["id"]
+            button_press_counts[id] += 1
+            button_press_order.append(id)
+            logger.debug("Bouton pressé : ID %d", id)
+
+            # Construction de la chaîne AES 24
+            button_sequence_str = ''.join(str(i) for i in button_press_order)
+            button_press_counts_str = ''.join(
+                f"{i}{button_press_counts[i]}"
+                for i in sorted(button_press_counts) if button_press_counts[i] > 0
+            )
+            final_str = f"{button_sequence_str}X{button_press_counts_str}"
+            logger.debug("%s", final_str)
+            logger.debug("Longueur de la chaîne : %d", len(final_str))
+
+            if len(final_str) == 24:
+                aes_key = final_str
+                try:
+                    # contrôle de clé du coffre : un bloc AES, verdict immédiat
+                    n = vault.unlock(aes_key)
+                    logger.info("[VAULT] %d secret(s) déverrouillé(s)", n)
                     blink_ok(10)
-
-                time.sleep(0.3)  # anti-rebond
+                except Exception as e:
+                    logger.warn("[AES] test clé: %s", e)
+                    blink_ko(6)
 
     else:  # Switch ON (valeur LOW) → fonctionnement normal
-        if i % 10 == 0:
-            led_red.value = True
-        i += 1
+        led_red.value = now % 1000 < 20  # battement : brève impulsion rouge chaque seconde
 
         if not previous_switch_state:  # OFF -> ON
             if not transition_message_displayed:
-                print("Passage de OFF à ON")
-                print("Liste des boutons pressés dans l'ordre :")
+                led.value = False
+                logger.info("Passage de OFF à ON")
+                logger.info("Liste des boutons pressés dans l'ordre :")
                 for id in button_press_order:
                     couleur = next(config["couleur"] for config in buttons_config if config["id"] == id)
-                    print(f"Bouton {couleur} (ID: {id})")
+                    logger.debug("Bouton %s (ID: %d)", couleur, id)
                 # Reset
                 button_press_counts = {config["id"]: 0 for config in buttons_config}
                 button_press_order = []
                 transition_message_displayed = True
                 try:
-                    manager = PasswordManager(aes_key)
-                    _ = manager.load_password('rpi') + '\n'
-                    blink_ok(2)
+                    if not vault.unlocked:  # déjà fait à la saisie de la clé, sinon maintenant
+                        n = vault.unlock(aes_key)  # déchiffre tous les secrets, une fois
+                        logger.info("[VAULT] %d secret(s) déverrouillé(s)", n)
                 except Exception as e:
-                    print(f"[AES] test clé: {e}")
+                    logger.warn("[AES] test clé: %s", e)
                     blink_ko(6)
-
-        # Exécution des boutons
-        for button, id, couleur, macro, command, pass_key, winsearch, delay_ms in buttons:
-            if not button.value:
-                if macro:
-                    ok = run_macro(macro)
-                    if not ok:
-                        blink_ko(2)
                 else:
-                    send_command(winsearch, command, pass_key, delay_ms)
-                time.sleep(0.5)  # anti-rebond
+                    try:  # clé bonne : une erreur ici vient des modèles, pas de la clé
+                        logger.info("[VAULT] %d modèle(s) prêt(s)", _expand_templates())
+                        blink_ok(2)
+                    except Exception as e:
+                        logger.error("[VAULT] modèles: %s", e)
+                        blink_ko(3)
+                scanner.reset()  # appuis de saisie de clé : pas d'exécution
+                gestures.reset()
+
+        # Exécution des boutons : fronts → gestes (voir _on_gesture)
+        while scanner.events.get_into(event):
+            active = True
+            gestures.feed(event.key_number, event.pressed, event.timestamp)
+        gestures.update(now)
+
+        # Macro en cours : une tranche par tour de boucle
+        executor.tick(now)
+        led.value = executor.busy
 
     # Transition de switch
     if previous_switch_state != current_switch_state:
         previous_switch_state = current_switch_state
+        led_red.value = False
         if current_switch_state:  # ON -> OFF
             display_message = True
             transition_message_displayed = False
-
-    led_red.value = False
-    time.sleep(0.1)
+            executor.cancel()  # le switch interrompt la macro en cours
+            _wipe_templates()
+            vault.wipe()
+            if macro_stats.save(microcontroller.nvm):  # hors exécution : une écriture par session
+                logger.info("[STATS] durées enregistrées en NVM")
+            scanner.reset()
+            gestures.reset()
+
+    # Précompilation des macros des boutons, une par tour, hors exécution
+    if _macro_backlog and not executor.busy:
+        macro_steps(_macro_backlog.pop())
+
+    leds.tick(now)
+    logger.tick(now, active or executor.busy or gestures.pending())  # journal écrit au repos seulement
+    time.sleep(0.001)  # simple passage de main ; le scan (keypad) tourne en fond
@@ -0,0 +1,270 @@
+# config_cache.py — Image binaire de la configuration compilée (/config.bin)
+#
+#   en-tête : magic "BBCF" | u8 version | u8 flags | u16 nb
+#   index   : nb × (u8 len | nom | u32 offset | u32 longueur | u32 crc32)
+#   données : une valeur sérialisée par entrée : "sources", "buttons", "matrix",
+#             "profiles" (noms), "profile:<nom>", "profile_switch", "macro:<nom>"
+#
+# Valeurs : un octet de type puis le contenu. N None, T/F bool, i int32,
+# q int64 (crc32 et mtime hors de l'int32), s str et b bytes (u32 longueur), l liste et t tuple (u16 n), d dict (u16 n,
+# clés str). Les flux HID précompilés y sont tels quels : le boot lit les
+# boutons sans JSON ni compilation, et une macro n'est lue (seek + crc) qu'à
+# sa première utilisation.
+#
+# Fraîcheur : "sources" liste (chemin, taille, mtime, crc32) de commands.json,
+# de chaque profiles/*.json et de chaque macros/*.json. L'image vaut tant que ce sont les mêmes fichiers,
+# de même taille, avec la même mtime ou à défaut le même crc32 (la mtime FAT
+# est en heure locale : une image compilée sur le PC n'a pas forcément la même).
+# Écrite par setup.py à chaque enregistrement et par tools/compile_config.py.
+
+import os
+import struct
+from binascii import crc32
+
+MAGIC = b"BBCF"
+VERSION = 8  # à incrémenter si le format des étapes compilées change
+CACHE = "/config.bin"
+_HEADER = "<4sBBH"
+_HEADER_SIZE = 8
+_ENTRY = "<III"     # offset, longueur, crc32 (après u8 len + nom)
+_ENTRY_SIZE = 12
+_CHUNK = 512
+
+
+# -------------------- Sérialisation --------------------
+def encode(value, out):
+    if value is None:
+        out.append(0x4E)  # N
+    elif value is True:
+        out.append(0x54)  # T
+    elif value is False:
+        out.append(0x46)  # F
+    elif isinstance(value, int):
+        if -0x80000000 <= value <= 0x7FFFFFFF:
+            out.append(0x69)  # i
+            out.extend(struct.pack("<i", value))
+        else:
+            out.append(0x71)  # q
+            out.extend(struct.pack("<q", value))
+    elif isinstance(value, str):
+        raw = value.encode("utf-8")
+        out.append(0x73)  # s
+        out.extend(struct.pack("<I", len(raw)))
+        out.extend(raw)
+    elif isinstance(value, (bytes, bytearray)):
+        out.append(0x62)  # b
+        out.extend(struct.pack("<I", len(value)))
+        out.extend(value)
+    elif isinstance(value, (list, tuple)):
+        out.append(0x74 if isinstance(value, tuple) else 0x6C)  # t / l
+        out.extend(struct.pack("<H", len(value)))
+        for item in value:
+            encode(item, out)
+    elif isinstance(value, dict):
+        out.append(0x64)  # d
+        out.extend(struct.pack("<H", len(value)))
+        for key, item in value.items():
+            encode(str(key), out)
+            encode(item, out)
+    else:
+        raise TypeError(f"type non sérialisable: {type(value).__name__}")
+    return out
+
+
+def decode(buf, pos=0):
+    """(valeur, position suivante)."""
+    tag = buf[pos]
+    pos += 1
+    if tag == 0x4E:
+        return None, pos
+    if tag == 0x54:
+        return True, pos
+    if tag == 0x46:
+        return False, pos
+    if tag == 0x69:
+        return struct.unpack_from("<i", buf, pos)[0], pos + 4
+    if tag == 0x71:
+        return struct.unpack_from("<q", buf, pos)[0], pos + 8
+    if tag in (0x73, 0x62):
+        (n,) = struct.unpack_from("<I", buf, pos)
+        pos += 4
+        raw = buf[pos:pos + n]
+        return (raw.decode("utf-8") if tag == 0x73 else raw), pos + n
+    if tag in (0x6C, 0x74, 0x64):
+        (n,) = struct.unpack_from("<H", buf, pos)
+        pos += 2
+        if tag == 0x64:
+            out = {}
+            for _ in range(n):
+                key, pos = decode(buf, pos)
+                out[key], pos = decode(buf, pos)
+            return out, pos
+        items = []
+        for _ in range(n):
+            item, pos = decode(buf, pos)
+            items.append(item)
+        return (tuple(items) if tag == 0x74 else items), pos
+    raise ValueError(f"type inconnu 0x{tag:02x}")
+
+
+# -------------------- Sources et fraîcheur --------------------
+def file_crc(path, buf=None):
+    """crc32 d'un fichier, lu par blocs dans un tampon réutilisé."""
+    buf = buf or bytearray(_CHUNK)
+    view = memoryview(buf)
+    crc = 0
+    with open(path, "rb") as f:
+        while True:
+            n = f.readinto(buf)
+            if not n:
+                return crc
+            crc = crc32(view[:n], crc)
+
+
+def sources(commands="/commands.json", macros_dir="/macros", profiles_dir="/profiles"):
+    """[(chemin, taille, mtime)] des fichiers JSON dont dépend l'image, triés."""
+    paths = [commands]
+    for d in (profiles_dir, macros_dir):
+        try:
+            paths += sorted(d + "/" + fn for fn in os.listdir(d) if fn.endswith(".json"))
+        except OSError:
+            pass
+    out = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        out.append((path, st[6], st[8]))
+    return out
+
+
+def _fresh(stamped, current):
+    if len(stamped) != len(current):
+        return False
+    buf = None
+    for (path, size, mtime, crc), (cpath, csize, cmtime) in zip(stamped, current):
+        if path != cpath or size != csize:
+            return False
+        if mtime != cmtime:
+            buf = buf or bytearray(_CHUNK)
+            if file_crc(path, buf) != crc:
+                return False
+    return True
+
+
+# -------------------- Lecture --------------------
+class ConfigCache:
+    """Index de l'image ; les entrées sont lues (et vérifiées) à la demande."""
+
+    def __init__(self, path=CACHE):
+        self.path = path
+        self._index = {}
+        with open(path, "rb") as f:
+            magic, version, _flags, count = struct.unpack(_HEADER, f.read(_HEADER_SIZE))
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"{path}: format inconnu")
+            for _ in range(count):
+                n = f.read(1)[0]
+                name = f.read(n).decode("utf-8")
+                self._index[name] = struct.unpack(_ENTRY, f.read(_ENTRY_SIZE))
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def get(self, name):
+        """Valeur de l'entrée, None si absente ; ValueError si elle est corrompue."""
+        entry = self._index.get(name)
+        if entry is None:
+            return None
+        offset, length, crc = entry
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            data = f.read(length)
+        if len(data) != length or crc32(data) != crc:
+            raise ValueError(f"{self.path}: entrée '{name}' corrompue")
+        return decode(data)[0]
+
+    def fresh(self, current=None):
+        return _fresh(self.get("sources") or [], sources() if current is None else current)
+
+
+def load(path=CACHE):
+    """ConfigCache à jour, ou None (absente, périmée ou illisible : repli JSON)."""
+    try:
+        cache = ConfigCache(path)
+        if cache.fresh():
+            return cache
+        print(f"[CACHE] {path} périmée (JSON modifié) → JSON")
+    except OSError:
+        pass  # pas d'image
+    except Exception as e:
+        print(f"[CACHE] {path} illisible: {e} → JSON")
+    return None
+
+
+# -------------------- Écriture --------------------
+def write(path, entries):
+    """Écrit [(nom, valeur)] : fichier .tmp complet puis échange."""
+    head = bytearray(_HEADER_SIZE)
+    blobs = []
+    for name, value in entries:
+        raw = name.encode("utf-8")
+        blob = encode(value, bytearray())
+        head.append(len(raw))
+        head.extend(raw)
+        head.extend(bytes(_ENTRY_SIZE))  # rempli ci-dessous
+        blobs.append(blob)
+    struct.pack_into(_HEADER, head, 0, MAGIC, VERSION, 0, len(blobs))
+    pos = _HEADER_SIZE
+    offset = len(head)
+    for (name, _), blob in zip(entries, blobs):
+        pos += 1 + len(name.encode("utf-8"))
+        struct.pack_into(_ENTRY, head, pos, offset, len(blob), crc32(blob))
+        pos += _ENTRY_SIZE
+        offset += len(blob)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(head)
+        for blob in blobs:
+            f.write(blob)
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+    os.rename(tmp, path)
+    return offset
+
+
+def rebuild(path=CACHE, commands="/commands.json", macros_dir="/macros", profiles_dir="/profiles"):
+    """Compile commands.json, profiles/*.json et macros/*.json dans l'image ; retourne (nb macros, octets)."""
+    from config_compiler import (load_buttons_from_json, load_macro, load_profile_buttons, matrix_from_json,
+                                 profile_names, profile_switch_from_json, read_commands)
+
+    current = sources(commands, macros_dir, profiles_dir)
+    buf = bytearray(_CHUNK)
+    stamped = [(p, size, mtime, file_crc(p, buf)) for p, size, mtime in current]
+    data = read_commands(commands) or {}
+    try:
+        matrix = matrix_from_json(data)
+    except ValueError:
+        matrix = None  # déjà signalé par load_buttons_from_json
+    buttons = load_buttons_from_json(commands, data)
+    entries = [("sources", stamped), ("buttons", buttons), ("matrix", matrix),
+               ("profile_switch", profile_switch_from_json(data))]
+    names = []
+    for name in profile_names(profiles_dir):
+        btns = load_profile_buttons(name, data, buttons, profiles_dir)
+        if btns is not None:
+            names.append(name)
+            entries.append(("profile:" + name, btns))
+    entries.append(("profiles", names))
+    n = 0
+    for p, _size, _mtime in current:
+        if p.startswith(macros_dir + "/"):
+            name = p[len(macros_dir) + 1:-5]
+            steps = load_macro(name, macros_dir)
+            if steps is not None:
+                entries.append(("macro:" + name, steps))
+                n += 1
+    return n, write(path, entries)
@@ -0,0 +1,525 @@
+# config_compiler.py — commands.json et macros/*.json → étapes d'exécution
+# Partagé par code.py (repli JSON au boot, macros Python), setup.py et
+# tools/compile_config.py, qui écrivent le cache binaire (config_cache.py) :
+# c'est la même compilation, qu'elle ait lieu au boot ou à l'enregistrement.
+# Les boutons gardent le NOM de leur broche ("GP11") : l'objet board est
+# résolu par code.py, seul à en avoir besoin.
+# Les macros et profils pouvant être compilés en cours de boucle (premier
+# appui, changement de profil), tous les messages passent par logger
+# (tamponnés) et non par print().
+
+import board
+import json
+import os
+import logger
+from adafruit_hid.keycode import Keycode
+from adafruit_hid.keyboard_layout_win_fr import KeyboardLayout  # Layout FR
+
+from hid_stream import compile_keys, compile_text
+from gestures import CHORD_MS, DOUBLE_MS, HOLD_MS
+from executor import (OP_FILE, OP_INVOKE, OP_JUMP, OP_LABEL, OP_NEXT, OP_PACE, OP_REPEAT,
+                      OP_SECRET, OP_SEND, OP_SYNC, OP_TEMPLATE, OP_WAIT, PROFILE_NORMAL, assemble,
+                      called_macros, typing_profile)
+
+WIN_R = compile_keys((Keycode.WINDOWS, Keycode.R))
+
+
+def pin_from_name(name: str):
+    # Attend "GPxx"
+    try:
+        return getattr(board, name)
+    except AttributeError:
+        raise ValueError(f"Pin inconnu: {name}")
+
+
+# -------------------- Compilation en étapes d'exécution --------------------
+_SECRET_TAG = "{{secret:"
+
+
+def compile_command(text):
+    """Texte d'une commande → flux HID précompilé, ou modèle s'il contient {{secret:nom}}.
+
+    Le modèle est un tuple alternant flux HID (bytes, le texte autour) et noms
+    de secrets (str) : code.py le complète au passage OFF→ON avec les secrets
+    du coffre, déjà en bytearray, sans jamais reconstruire le texte en clair.
+    """
+    if _SECRET_TAG not in text:
+        return compile_text(KeyboardLayout, text)
+    parts = []
+    pos = 0
+    while True:
+        start = text.find(_SECRET_TAG, pos)
+        if start < 0:
+            break
+        end = text.find("}}", start)
+        if end < 0:
+            raise ValueError("{{secret: non fermé")
+        name = text[start + len(_SECRET_TAG):end].strip()
+        if not name:
+            raise ValueError("{{secret:}} sans nom")
+        if start > pos:
+            parts.append(bytes(compile_text(KeyboardLayout, text[pos:start])))
+        parts.append(name)
+        pos = end + 2
+    if pos < len(text):
+        parts.append(bytes(compile_text(KeyboardLayout, text[pos:])))
+    return tuple(parts)
+
+
+def command_steps(winsearch, command, password_key=None, delay_ms=1000, sync=False):
+    """Étapes d'une commande : [Win+R, délai], texte, [attente, secret]. Mêmes temps qu'avant.
+
+    Avec `sync` (wait_for_host), l'attente avant le secret se termine dès que
+    l'hôte bascule Scroll Lock ; les 2 s d'avant ne servent plus que de délai max.
+    """
+    steps = []
+    if winsearch:
+        steps.append((OP_SEND, WIN_R))
+        steps.append((OP_WAIT, max(0, delay_ms)))
+    if isinstance(command, str):
+        command = compile_command(command)
+    if command:
+        steps.append((OP_TEMPLATE if isinstance(command, tuple) else OP_SEND, command))
+    steps.append((OP_WAIT, 200))
+    if password_key:
+        steps.append((OP_SYNC if sync else OP_WAIT, 2000))  # laisser l'appli se connecter
+        steps.append((OP_SECRET, password_key))
+        steps.append((OP_WAIT, 500))
+    return steps
+
+
+def action_steps(a):
+    """Étapes d'UNE action normalisée (texte OU combo de touches) + pause de fin."""
+    sync = a["wait_for_host"]
+    # Priorité aux combos de touches si présents
+    if a["keys"]:
+        steps = [(OP_SEND, a["keys"])]  # press + release
+    elif a["type_file"]:
+        steps = [(OP_FILE, a["type_file"])]  # lu et tapé par blocs à l'exécution
+    elif sync and not (a["command"] or a["password_key"] or a["winsearch"]):
+        steps = [(OP_SYNC, a["timeout_ms"])]  # action seule : { "wait_for_host": true, "timeout_ms": 5000 }
+    else:
+        steps = command_steps(a["winsearch"], a["command"], a["password_key"] or None,
+                              a["delay_ms"], sync)
+    if a["sleep_ms"] > 0:
+        steps.append((OP_SYNC if sync else OP_WAIT, a["sleep_ms"]))
+    return steps
+
+
+def _profile_or_default(name, where):
+    """typing_profile validé ; profil normal (avec avertissement) s'il est inconnu."""
+    try:
+        return typing_profile(name)
+    except ValueError as e:
+        logger.warn("[WARN] %s: %s → normal", where, e)
+        return PROFILE_NORMAL
+
+
+def read_commands(path="/commands.json"):
+    """Contenu de commands.json (dict), ou None si aucune copie n'est lisible."""
+    return read_json_copies(path, "/commands.back")
+
+
+def read_json_copies(path, back):
+    """Contenu JSON de path, sinon de path.tmp puis de `back` ; None si aucune copie n'est lisible."""
+    # setup.py écrit path.tmp puis l'échange (`back` = version précédente) :
+    # après une coupure pendant l'échange, l'une des copies est complète
+    for candidate in (path, path + ".tmp", back):
+        try:
+            with open(candidate, "r") as f:
+                data = json.load(f)
+            if candidate != path:
+                logger.warn("[WARN] %s illisible: configuration lue dans %s", path, candidate)
+            return data
+        except Exception as e:
+            logger.warn("[WARN] Impossible de lire %s: %s", candidate, e)
+    return None
+
+
+# -------------------- Matrice de touches --------------------
+# "matrix": { "rows": ["GP2", "GP3", ...], "cols": ["GP6", ...],
+#             "columns_to_anodes": true, "diodes": false }
+# Un bouton de la matrice a "row" / "col" (indices) au lieu de "pin". Sans
+# diodes, les appuis fantômes (3 coins d'un rectangle tenus) sont filtrés par
+# scanner.py. Les broches des rangs et colonnes ne servent à rien d'autre.
+RESERVED_PINS = ("GP8", "GP9", "GP15", "GP16", "GP17", "GP20")  # switch, LEDs, faux GND, buzzer
+
+
+def _pin_name(name, where):
+    name = str(name).strip().upper()
+    pin_from_name(name)
+    if name in RESERVED_PINS:
+        raise ValueError(f"{where}: {name} réservée (switch, LEDs, buzzer)")
+    return name
+
+
+def matrix_from_json(data):
+    """Matrice validée {rows, cols, columns_to_anodes, diodes} ; None si absente, ValueError si invalide."""
+    m = (data or {}).get("matrix")
+    if not m:
+        return None
+    rows = [_pin_name(p, "matrix") for p in m.get("rows", [])]
+    cols = [_pin_name(p, "matrix") for p in m.get("cols", [])]
+    if not rows or not cols:
+        raise ValueError("matrix: 'rows' et 'cols' requis")
+    if len(set(rows + cols)) != len(rows) + len(cols):
+        raise ValueError("matrix: broche utilisée deux fois")
+    return {
+        "rows": rows,
+        "cols": cols,
+        "columns_to_anodes": bool(m.get("columns_to_anodes", True)),
+        "diodes": bool(m.get("diodes", False)),
+    }
+
+
+def load_buttons_from_json(path="/commands.json", data=None):
+    if data is None:
+        data = read_commands(path)
+    if data is None:
+        return []
+    try:
+        matrix = matrix_from_json(data)
+    except ValueError as e:
+        logger.warn("[WARN] %s : boutons de la matrice ignorés", e)
+        matrix = None
+    used = set(matrix["rows"] + matrix["cols"]) if matrix else set()  # broches et cases prises
+
+    btns = []
+    seen_ids = set()
+    for entry in data.get("buttons", []):
+        try:
+            bid = int(entry["id"])
+            if bid in seen_ids:
+                logger.warn("[WARN] id %s dupliqué: ignoré", bid)
+                continue
+            seen_ids.add(bid)
+            if "row" in entry or "col" in entry:
+                if matrix is None:
+                    raise ValueError("row/col sans 'matrix' valide")
+                row, col = int(entry["row"]), int(entry["col"])
+                if not (0 <= row < len(matrix["rows"]) and 0 <= col < len(matrix["cols"])):
+                    raise ValueError(f"case ({row}, {col}) hors de la matrice")
+                pin, slot = "", (row, col)
+            else:
+                # validé ici ; code.py résout l'objet board au boot
+                pin = _pin_name(entry["pin"], f"bouton {bid}")
+                slot, row, col = pin, -1, -1
+            if slot in used:
+                raise ValueError(f"{slot} déjà utilisé")
+            used.add(slot)
+            color = entry.get("color", "")
+            macro = entry.get("macro", "")
+            cmd = compile_command(entry.get("command", ""))
+            pass_key = entry.get("pass_key", "")
+            winsearch = bool(entry.get("winsearch", True))
+            delay_ms = int(entry.get("delay_ms", 500))
+            debounce_ms = int(entry.get("debounce_ms", 20))
+            cancel = bool(entry.get("cancel", False))
+            profile = _profile_or_default(entry.get("typing_profile", ""), f"bouton {bid}")
+            sync = bool(entry.get("wait_for_host", False))
+            double = str(entry.get("double", "")).strip()
+            hold = str(entry.get("hold", "")).strip()
+            chord = str(entry.get("chord", "")).strip()
+            chord_with = int(entry.get("chord_with", 0) or 0) if chord else 0
+
+            btns.append({
+                "id": bid,
+                "couleur": color,
+                "pin": pin,              # "" pour une touche de la matrice
+                "row": row,              # -1 hors matrice
+                "col": col,
+                "macro": macro,          # ex: "demeter"
+                "command": cmd,          # fallback direct si macro vide (flux HID précompilé ou modèle)
+                "pass_key": pass_key,
+                "winsearch": winsearch,
+                "delay_ms": delay_ms,
+                "debounce_ms": debounce_ms,
+                "cancel": cancel,        # bouton dédié à l'annulation de la macro en cours
+                "profile": profile,      # typing_profile : (écart_µs, batch)
+                "steps": assemble(command_steps(winsearch, cmd, pass_key, delay_ms, sync)),
+                "double": double,        # gestes (gestures.py) : macros, "" = non lié
+                "hold": hold,
+                "chord": chord,          # accord avec le bouton chord_with (id)
+                "chord_with": chord_with,
+                "double_ms": max(0, int(entry.get("double_ms", DOUBLE_MS))),
+                "hold_ms": max(0, int(entry.get("hold_ms", HOLD_MS))),
+                "chord_ms": max(0, int(entry.get("chord_ms", CHORD_MS))),
+            })
+        except Exception as e:
+            logger.warn("[WARN] bouton ignoré (entrée invalide): %s ; err=%s", entry, e)
+            continue
+    ids = set(b["id"] for b in btns)
+    for b in btns:
+        if b["chord"] and (b["chord_with"] not in ids or b["chord_with"] == b["id"]):
+            logger.warn("[WARN] bouton %s: accord avec un bouton inconnu (%s) ignoré", b["id"], b["chord_with"])
+            b["chord"], b["chord_with"] = "", 0
+    return btns
+
+
+# -------------------- Profils (profiles/<name>.json) --------------------
+# Un profil redéfinit ce que font les boutons de commands.json, identifiés par
+# leur id : { "buttons": [ { "id": 1, "macro": "deploy", "hold": "@next" }, ... ] }.
+# Les champs absents gardent la valeur de commands.json ; le câblage (pin,
+# row, col, debounce_ms) reste celui de commands.json. commands.json lui-même
+# est le profil "default".
+# Un nom de macro "@next" passe au profil suivant, "@<nom>" à ce profil ;
+# "profile_switch": {"button": id, "gesture": "hold"} dans commands.json
+# réserve ce geste à "@next" dans tous les profils.
+DEFAULT_PROFILE = "default"
+PROFILE_NEXT = "@next"
+PHYSICAL_FIELDS = ("pin", "pin_name", "row", "col", "debounce_ms")
+
+
+def valid_profile_name(name):
+    return (0 < len(name) <= 24 and name != DEFAULT_PROFILE
+            and all(c.isalpha() or c.isdigit() or c in "-_" for c in name))
+
+
+def profile_files(name, profiles_dir="/profiles"):
+    """(fichier du profil, version précédente gardée par setup.py)."""
+    return f"{profiles_dir}/{name}.json", f"{profiles_dir}/{name}.back"
+
+
+def profile_names(profiles_dir="/profiles"):
+    """Noms des profils de profiles/ (triés), sans "default"."""
+    try:
+        files = os.listdir(profiles_dir)
+    except OSError:
+        return []
+    names = set()
+    for fn in files:
+        if fn.endswith(".json.tmp"):
+            fn = fn[:-4]  # échange interrompu : le .tmp complet fait foi (read_json_copies)
+        if fn.endswith(".json") and valid_profile_name(fn[:-5]):
+            names.add(fn[:-5])
+    return sorted(names)
+
+
+def load_profile_buttons(name, data, base_btns, profiles_dir="/profiles"):
+    """Boutons compilés du profil, dans l'ordre de base_btns : la config du
+    bouton si le profil le redéfinit, None s'il garde celle de commands.json
+    (partagée, ni recompilée ni stockée deux fois). None si le profil est illisible."""
+    profile = read_json_copies(*profile_files(name, profiles_dir))
+    over = profile.get("buttons", []) if isinstance(profile, dict) else None
+    if not isinstance(over, list):
+        logger.warn("[WARN] profil %s illisible", name)
+        return None
+    raw = {}
+    for entry in data.get("buttons", []):
+        try:
+            raw.setdefault(int(entry["id"]), entry)
+        except Exception:
+            continue
+    patches = {}
+    for entry in over:
+        try:
+            bid = int(entry["id"])
+        except Exception:
+            logger.warn("[WARN] profil %s: bouton sans id ignoré: %s", name, entry)
+            continue
+        if bid not in raw:
+            logger.warn("[WARN] profil %s: bouton %s absent de commands.json, ignoré", name, bid)
+            continue
+        patches[bid] = {k: v for k, v in entry.items() if k not in PHYSICAL_FIELDS}
+    merged = []
+    for b in base_btns:  # tous les boutons : les accords peuvent viser un bouton non redéfini
+        entry = dict(raw[b["id"]])
+        entry.update(patches.get(b["id"], {}))
+        merged.append(entry)
+    compiled = {b["id"]: b for b in load_buttons_from_json(data={"matrix": data.get("matrix"),
+                                                                 "buttons": merged})}
+    return [compiled.get(b["id"]) if b["id"] in patches else None for b in base_btns]
+
+
+def profile_switch_from_json(data):
+    """(id du bouton, geste) réservé au changement de profil, ou None."""
+    sw = (data or {}).get("profile_switch")
+    if not sw:
+        return None
+    try:
+        gesture = str(sw.get("gesture", "hold"))
+        if gesture not in ("tap", "double", "hold"):
+            raise ValueError(f"geste '{gesture}' (tap, double ou hold)")
+        return int(sw["button"]), gesture
+    except Exception as e:
+        logger.warn("[WARN] profile_switch ignoré: %s", e)
+        return None
+
+
+# -------------------- Macros JSON --------------------
+# Structure acceptée dans macros/<name>.json :
+# {
+#   "typing_profile": "turbo" | "safe" | "custom:<µs>"   (optionnel, remplace celui du bouton)
+#   "actions": [
+#     { "winsearch": true/false, "delay_ms": int, "command": "str", "password_key": "str", "sleep_ms": int },
+#     { "wait_for_host": true, "timeout_ms": int },
+#     { "type_file": "payloads/deploy.sh", "sleep_ms": int },
+#     { "repeat": 3, "actions": [ ... ] },       corps exécuté 3 fois
+#     { "call": "login" },                       macros/login.json puis retour
+#     { "label": "retry" },
+#     { "goto": "retry", "times": 2 },           2 sauts puis continue (sans times : toujours, jusqu'à annulation)
+#     ...
+#   ]
+# }
+# "command" et "keys" sont compilés au chargement en flux de rapports HID (hid_stream).
+# "command" peut contenir des {{secret:nom}} (ex. "ssh {{secret:user_pi}}@host\n") :
+# le secret est tapé à sa place, sans Entrée ni attente ajoutées (voir compile_command).
+# "wait_for_host": true sur une action transforme ses attentes (avant le secret,
+# sleep_ms) en attentes du signal hôte : la macro repart dès que l'hôte bascule
+# Scroll Lock (tools/host_sync.py), la durée fixe ne sert plus que de délai max.
+# "type_file" tape un fichier texte (UTF-8) de CIRCUITPY : il n'est pas compilé
+# ici mais lu et tapé par blocs pendant l'exécution (hid_stream.TextFileStream),
+# sa taille n'est donc limitée que par la flash.
+
+def _device_path(path):
+    """"payloads/x.sh" → "/payloads/x.sh" ; "" si absent."""
+    path = str(path or "").strip()
+    return "/" + path.lstrip("/") if path else ""
+
+
+def _norm_action(a):
+    """Normalise une action JSON en dict complet (texte OU combo de touches)."""
+    try:
+        # keys peut être une liste ["CTRL","D"] ou une string "CTRL+D"
+        raw_keys = a.get("keys")
+        if isinstance(raw_keys, str):
+            keys = [s.strip() for s in raw_keys.split("+") if s.strip()]
+        elif isinstance(raw_keys, list):
+            keys = [str(x).strip() for x in raw_keys if str(x).strip()]
+        else:
+            keys = []
+        kcs = _keycodes_from_names(keys)
+        if keys and not kcs:
+            logger.warn("[MACROS] aucune touche valide dans 'keys'")
+
+        return {
+            "winsearch": bool(a.get("winsearch", False)),
+            "delay_ms": int(a.get("delay_ms", 0)),
+            "command": compile_command(str(a.get("command", ""))),
+            "password_key": str(a.get("password_key", "")),
+            "sleep_ms": int(a.get("sleep_ms", 0)),
+            "keys": compile_keys(kcs) if kcs else b"",
+            "wait_for_host": bool(a.get("wait_for_host", False)),
+            "timeout_ms": int(a.get("timeout_ms", 2000)),
+            "type_file": _device_path(a.get("type_file")),
+        }
+    except Exception as e:
+        logger.warn("[MACROS] action invalide: %s ; err=%s", a, e)
+        return None
+
+def _keycodes_from_names(names):
+    """Convertit une liste de noms ['CTRL','D','ENTER'] en Keycodes."""
+    out = []
+    for n in (names or []):
+        u = n.upper()
+        if u in ("CTRL", "CONTROL", "LEFT_CTRL", "LCTRL"): out.append(Keycode.CONTROL)
+        elif u in ("ALT", "LEFT_ALT", "LALT"):             out.append(Keycode.ALT)
+        elif u in ("SHIFT", "LEFT_SHIFT", "LSHIFT"):       out.append(Keycode.SHIFT)
+        elif u in ("WIN", "WINDOWS", "GUI"):               out.append(Keycode.WINDOWS)
+        elif u in ("ENTER", "RETURN"):                     out.append(Keycode.ENTER)
+        elif u in ("TAB",):                                out.append(Keycode.TAB)
+        elif u in ("ESC", "ESCAPE"):                       out.append(Keycode.ESCAPE)
+        elif u in ("SPACE", "SPACEBAR"):                   out.append(Keycode.SPACE)
+        elif u in ("BKSP", "BACKSPACE"):                   out.append(Keycode.BACKSPACE)
+        elif u in ("UP", "ARROW_UP"):                      out.append(Keycode.UP_ARROW)
+        elif u in ("DOWN", "ARROW_DOWN"):                  out.append(Keycode.DOWN_ARROW)
+        elif u in ("LEFT", "ARROW_LEFT"):                  out.append(Keycode.LEFT_ARROW)
+        elif u in ("RIGHT", "ARROW_RIGHT"):                out.append(Keycode.RIGHT_ARROW)
+        elif len(u) == 1 and "A" <= u <= "Z":              out.append(getattr(Keycode, u))
+        else:
+            logger.warn("[KEYS] Ignoré: '%s' (non mappé)", n)
+    return out
+
+
+def load_macro(name, base="/macros"):
+    """Charge et compile macros/<name>.json en programme (code, consts) ; None si absent ou invalide."""
+    path = base + "/" + name + ".json"
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+    except OSError:
+        return None  # pas de fichier : peut-être une fonction macro_<name>
+    except Exception as e:
+        logger.warn("[MACROS] lecture échouée %s: %s", path, e)
+        return None
+
+    actions = data.get("actions")
+    # tolérance: certains pourraient écrire "action" (singulier)
+    if actions is None and "action" in data:
+        actions = data["action"]
+    if isinstance(actions, dict):
+        actions = [actions]
+    if not isinstance(actions, list):
+        logger.warn("[MACROS] format invalide dans %s (attendu 'actions' liste)", path)
+        return None
+
+    steps = []
+    if data.get("typing_profile"):
+        steps.append((OP_PACE, _profile_or_default(data["typing_profile"], f"macro {name}")))
+    try:
+        count = _compile_actions(actions, steps, [0], 0)
+        program = assemble(steps)
+    except (TypeError, ValueError) as e:  # macro mal formée : elle seule est écartée
+        logger.warn("[MACROS] %s: %s", path, e)
+        return None
+    logger.info("[MACROS] chargé %s (%d action(s))", name, count)
+    return program
+
+
+def _count_field(a, key, default=None):
+    """Nombre entier d'une action ("repeat", "times") ; ValueError si ce n'en est pas un."""
+    value = a.get(key, default)
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise ValueError(f"'{key}' doit être un nombre ({value})")
+    return int(value)
+
+
+def _compile_actions(actions, steps, blocks, block):
+    """Ajoute les étapes d'une liste d'actions ; retourne le nombre d'actions compilées.
+
+    Les labels sont propres à leur bloc (la macro, ou le corps d'un repeat) :
+    un goto ne peut pas sortir d'une boucle ni y entrer.
+    """
+    count = 0
+    for a in actions:
+        if not isinstance(a, dict):
+            continue
+        if "repeat" in a:
+            body = a.get("actions", [])
+            if isinstance(body, dict):
+                body = [body]
+            blocks[0] += 1
+            steps.append((OP_REPEAT, _count_field(a, "repeat")))
+            count += _compile_actions(body if isinstance(body, list) else [], steps, blocks, blocks[0])
+            steps.append((OP_NEXT, None))
+        elif "call" in a:
+            steps.append((OP_INVOKE, str(a["call"]).strip()))
+            count += 1
+        elif "label" in a:
+            steps.append((OP_LABEL, (block, str(a["label"]))))
+        elif "goto" in a:
+            steps.append((OP_JUMP, ((block, str(a["goto"])), _count_field(a, "times", -1))))
+            count += 1
+        else:
+            na = _norm_action(a)
+            if na is not None:
+                steps.extend(action_steps(na))
+                count += 1
+    return count
+
+
+def find_cycle(name, get_program, path=None):
+    """Chaîne d'appels circulaire partant de `name` (["a", "b", "a"]) ou None."""
+    path = path if path is not None else []
+    if name in path:
+        return path[path.index(name):] + [name]
+    program = get_program(name)
+    if program is None or isinstance(program, list):
+        return None  # inconnue, ou macro Python (pas d'appels)
+    path.append(name)
+    for callee in called_macros(program):
+        cycle = find_cycle(callee, get_program, path)
+        if cycle:
+            return cycle
+    path.pop()
+    return None
@@ -0,0 +1,408 @@
+# executor.py — Exécution coopérative des macros
+# Une macro est compilée en une liste d'étapes (op, arg), assemblée en un
+# programme compact (voir assemble()). La boucle principale appelle tick(now) à
+# chaque tour : l'exécuteur avance d'une tranche (quelques rapports HID ou la
+# fin d'une attente) puis rend la main, si bien que le scan des boutons, le
+# switch et les LEDs continuent de tourner pendant une macro, et qu'une macro
+# peut être annulée à tout moment (cancel()).
+
+import logger
+from stats import LATENCY, TOTAL, TYPING, WAIT
+
+OP_SEND = 0    # arg : flux HID précompilé (hid_stream)
+OP_WAIT = 1    # arg : durée en ms
+OP_SECRET = 2  # arg : nom du secret, résolu en flux HID au moment de l'exécution
+OP_CALL = 3    # arg : fonction Python courte, sans attente (buzzer, LED… des macros macro_<name>())
+OP_PACE = 4    # arg : profil de frappe (écart_µs, batch) pour les envois suivants
+OP_SYNC = 5    # arg : délai max en ms ; attend que l'hôte bascule son Scroll Lock
+OP_FILE = 6    # arg : chemin d'un fichier texte, tapé au fil de la lecture (type_file)
+OP_REPEAT = 7  # arg : (nb, pc après le OP_NEXT) ; ouvre une boucle
+OP_NEXT = 8    # arg : pc du début du corps ; reboucle tant qu'il reste des tours
+OP_JUMP = 9    # arg : (pc cible, nb de sauts ; -1 = toujours) ; "goto" vers un label
+OP_INVOKE = 10 # arg : nom d'une autre macro, exécutée puis retour ("call")
+OP_TEMPLATE = 11  # arg : modèle (flux HID et noms de secrets), voir resolve_template
+OP_DEFER = 12  # arg : fonction appelée à la fin de la macro, quelle qu'en soit l'issue (fin, annulation, erreur)
+OP_LABEL = 255 # pseudo-op de assemble() : arg = clé du label, pas d'instruction
+
+MAX_CALL_DEPTH = 8  # garde-fou des "call" imbriqués (les cycles sont refusés au chargement)
+
+# Programme compact : (code, consts). code = 3 octets par instruction : op puis
+# indice u16 (petit-boutiste) de l'argument dans consts, où les arguments
+# identiques (délais, flux WIN+R…) ne sont stockés qu'une fois. Les listes
+# d'étapes [(op, arg), …] restent le format de construction ; assemble() les
+# convertit (au chargement, ou à start() pour les macros Python).
+
+# Profils de frappe ("typing_profile" des boutons et des macros)
+#   normal        : un rapport appui + relâché par caractère, au rythme de l'USB
+#   turbo         : caractères consécutifs regroupés (jusqu'à 6 touches par rapport)
+#   safe          : 8 ms entre deux frappes, pour les hôtes qui perdent des caractères
+#   custom:<µs>   : écart minimal choisi entre deux frappes
+PROFILE_NORMAL = (0, False)
+PROFILES = {
+    "": PROFILE_NORMAL,
+    "normal": PROFILE_NORMAL,
+    "turbo": (0, True),
+    "safe": (8000, False),
+}
+
+
+def typing_profile(name):
+    """Profil (écart_µs, batch) d'un nom de typing_profile ; ValueError si inconnu."""
+    name = (name or "").strip().lower()
+    if name in PROFILES:
+        return PROFILES[name]
+    if name.startswith("custom:"):
+        gap_us = int(name[7:])
+        if gap_us < 0:
+            raise ValueError(f"typing_profile négatif: {name}")
+        return (gap_us, False)
+    raise ValueError(f"typing_profile inconnu: {name}")
+
+
+def assemble(steps):
+    """Liste d'étapes (op, arg) → programme (code, consts) ; ValueError si label/boucle invalide."""
+    code = bytearray()
+    consts = []
+    index = {}   # argument → indice dans consts (dédoublonnage)
+    labels = {}  # clé du label → pc
+    jumps = []   # (pc du OP_JUMP, clé du label, nb) : résolus à la fin (sauts en avant)
+    opened = []  # (pc du OP_REPEAT, nb) en attente de leur OP_NEXT
+
+    def const(arg):
+        key = bytes(arg) if isinstance(arg, bytearray) else arg
+        try:
+            i = index.get(key)
+        except TypeError:  # non hachable : pas de dédoublonnage
+            i = key = None
+        if i is None:
+            i = len(consts)
+            if i > 0xFFFF:
+                raise ValueError("macro trop grande")
+            consts.append(arg)
+            if key is not None:
+                index[key] = i
+        return i
+
+    def put(pc, op, arg):
+        i = const(arg)
+        code[pc] = op
+        code[pc + 1] = i & 0xFF
+        code[pc + 2] = i >> 8
+
+    for op, arg in steps:
+        if op == OP_LABEL:
+            if arg in labels:
+                raise ValueError(f"label en double: {arg[-1]}")
+            labels[arg] = len(code)
+            continue
+        pc = len(code)
+        code.extend(b"\0\0\0")
+        if op == OP_REPEAT:
+            opened.append((pc, arg))  # argument connu au OP_NEXT correspondant
+        elif op == OP_NEXT:
+            if not opened:
+                raise ValueError("fin de repeat sans début")
+            start, count = opened.pop()
+            put(pc, OP_NEXT, start + 3)
+            put(start, OP_REPEAT, (count, pc + 3))
+        elif op == OP_JUMP:
+            jumps.append((pc, arg[0], arg[1]))
+        else:
+            put(pc, op, arg)
+    if opened:
+        raise ValueError("repeat non fermé")
+    for pc, label, times in jumps:
+        if label not in labels:
+            raise ValueError(f"label inconnu: {label[-1]}")
+        put(pc, OP_JUMP, (labels[label], times))
+    return bytes(code), tuple(consts)
+
+
+def args_of(program, op):
+    """Arguments des instructions `op` d'un programme."""
+    code, consts = program
+    return [consts[code[i + 1] | code[i + 2] << 8]
+            for i in range(0, len(code), 3) if code[i] == op]
+
+
+def called_macros(program):
+    """Noms des macros appelées (OP_INVOKE) par un programme."""
+    return args_of(program, OP_INVOKE)
+
+
+class Executor:
+    """Exécute une macro à la fois, par tranches, sans jamais dormir."""
+
+    def __init__(self, writer, resolve_secret=None, on_error=None, records_per_tick=8,
+                 host_signal=None, open_file=None, resolve_macro=None, resolve_template=None,
+                 on_span=None, ops_per_tick=16):
+        self.writer = writer
+        self.resolve_secret = resolve_secret  # nom -> bytearray (flux HID) ; None si absent
+        self.on_error = on_error              # appelé avec (nom de macro, exception)
+        self.host_signal = host_signal        # () -> état du signal hôte (LED Scroll Lock)
+        self.open_file = open_file            # chemin -> lecteur (.next() : flux ou None, .close())
+        self.resolve_macro = resolve_macro    # nom -> programme ou étapes (OP_INVOKE) ; None si inconnue
+        # modèle -> flux HID avec les secrets, possédé (et effacé) par l'appelant ; None si indisponible
+        self.resolve_template = resolve_template
+        self.on_span = on_span                # (nom, type de span (stats), µs) : durées mesurées
+        # tranche d'un tick : rapports HID (tous flux confondus) et instructions au plus
+        self.records_per_tick = records_per_tick
+        self.ops_per_tick = ops_per_tick
+        self.name = ""
+        self._steps = None    # programme (code, consts) en cours
+        self._code = b""
+        self._consts = ()
+        self._pc = 0          # en octets dans _code (3 par instruction)
+        self._loops = []      # [tours restants, pc du corps] des repeat ouverts
+        self._jumps = None    # pc d'un OP_JUMP -> sauts déjà faits
+        self._frames = []     # appelants des OP_INVOKE en cours
+        self._wake = 0
+        self._stream = None
+        self._pos = 0
+        self._wipe = False
+        self._profile = PROFILE_NORMAL
+        self._stream_t0 = 0   # début de l'envoi du flux en cours (ms), pour le rythme
+        self._sent = 0        # rapports "appui" envoyés depuis _stream_t0
+        self._sync_state = None  # état de référence du signal hôte pendant une attente OP_SYNC
+        self._signal_mark = None  # état du signal au début du dernier envoi
+        self._reader = None   # OP_FILE en cours : fournit le flux du bloc suivant
+        self._t_start = 0     # début de la macro (ms), pour les spans latency/total
+        self._first = False   # premier rapport HID pas encore envoyé
+        self._wait_t0 = None  # début de l'attente en cours (ms)
+        self._deferred = []   # OP_DEFER rencontrés : appelés par _finish(), derniers d'abord
+
+    @property
+    def busy(self):
+        return self._steps is not None
+
+    def start(self, steps, name="", now=0, profile=PROFILE_NORMAL):
+        """Démarre une macro ; False si une autre est en cours.
+
+        `profile` est le profil de frappe de départ (celui du bouton) ; une
+        étape OP_PACE de la macro le remplace.
+        """
+        if self._steps is not None:
+            return False
+        if isinstance(steps, list):
+            steps = assemble(steps)
+        self.name = name
+        self._enter(steps)
+        self._frames = []
+        self._wake = now
+        self._profile = profile
+        self._signal_mark = None
+        self._t_start = now
+        self._first = True
+        self._wait_t0 = None
+        return True
+
+    def cancel(self):
+        """Abandonne la macro en cours (les rapports envoyés sont toujours appui + relâché)."""
+        if self._steps is None:
+            return False
+        logger.info("[MACROS] '%s' annulée (étape %d/%d)", self.name, self._pc // 3, len(self._code) // 3)
+        self._finish()
+        return True
+
+    def _enter(self, program):
+        self._steps = program
+        self._code, self._consts = program
+        self._pc = 0
+        self._loops = []
+        self._jumps = None
+
+    def _finish(self):
+        self._frames = []
+        self._sync_state = None
+        self._drop_stream()
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+        self._steps = None
+        while self._deferred:
+            try:
+                self._deferred.pop()()
+            except Exception as e:
+                logger.error("[MACROS] '%s' fin: %s", self.name, e)
+        self.name = ""
+
+    def _span(self, kind, ms):
+        if self.on_span is not None:
+            self.on_span(self.name, kind, ms * 1000)
+
+    def _drop_stream(self):
+        if self._wipe and self._stream is not None:
+            stream = self._stream
+            for i in range(len(stream)):
+                stream[i] = 0
+        self._stream = None
+        self._pos = 0
+        self._wipe = False
+
+    def _start_stream(self, stream, now):
+        self._stream = stream
+        self._pos = 0
+        self._stream_t0 = now
+        self._sent = 0
+        if self.host_signal is not None:
+            # l'hôte réagit à ce qu'on tape : une bascule pendant l'envoi compte déjà
+            self._signal_mark = self.host_signal()
+
+    def tick(self, now):
+        """Avance la macro d'une tranche ; retourne True tant qu'elle est en cours.
+
+        Une tranche s'arrête à la première attente, ou une fois envoyés
+        records_per_tick rapports ou exécutées ops_per_tick instructions : une
+        boucle de petits envois rend la main comme un long flux.
+        """
+        records = self.records_per_tick
+        ops = self.ops_per_tick
+        while self._steps is not None:
+            if self._sync_state is not None:
+                if self.host_signal() != self._sync_state:
+                    self._sync_state = None  # l'hôte est prêt : on n'attend pas la fin du délai
+                    self._wake = now
+                elif now < self._wake:
+                    return True
+                else:
+                    logger.info("[MACROS] '%s' wait_for_host: délai écoulé", self.name)
+                    self._sync_state = None
+            if now < self._wake:
+                return True
+            if self._wait_t0 is not None:
+                self._span(WAIT, now - self._wait_t0)
+                self._wait_t0 = None
+            try:
+                if self._stream is not None:
+                    if records <= 0:
+                        return True
+                    gap_us, batch = self._profile
+                    budget = records
+                    if gap_us:
+                        # frappes dues depuis le début du flux, au rythme demandé
+                        due = (now - self._stream_t0) * 1000 // gap_us + 1 - self._sent
+                        if due <= 0:
+                            return True
+                        budget = min(budget, due)
+                    self._pos = self.writer.send(self._stream, self._pos,
+                                                 max_records=budget, batch=batch)
+                    self._sent += self.writer.count
+                    records -= self.writer.count
+                    if self._first and self.writer.count:
+                        self._first = False
+                        self._span(LATENCY, now - self._t_start)
+                    if self._pos < len(self._stream):
+                        return True
+                    if self._reader is not None:
+                        stream = self._reader.next()
+                        if stream is not None:
+                            # bloc suivant du fichier : même flux pour le rythme (_stream_t0, _sent)
+                            self._stream = stream
+                            self._pos = 0
+                            return True
+                        self._reader = None
+                    self._span(TYPING, now - self._stream_t0)
+                    self._drop_stream()
+                    continue
+                if ops <= 0:
+                    return True  # suite au prochain tour de boucle
+                ops -= 1
+                pc = self._pc
+                code = self._code
+                if pc >= len(code):
+                    if self._frames:  # fin d'une macro appelée : retour à l'appelante
+                        program, pc, loops, jumps = self._frames.pop()
+                        self._enter(program)
+                        self._pc, self._loops, self._jumps = pc, loops, jumps
+                        continue
+                    self._span(TOTAL, now - self._t_start)
+                    self._finish()
+                    return False
+                op = code[pc]
+                arg = self._consts[code[pc + 1] | code[pc + 2] << 8]
+                self._pc = pc + 3
+                if op == OP_SEND:
+                    self._start_stream(arg, now)
+                elif op == OP_WAIT:
+                    self._wake = now + arg
+                    self._wait_t0 = now
+                elif op == OP_SYNC:
+                    # sans signal hôte, équivaut à une attente fixe
+                    self._wake = now + arg
+                    self._wait_t0 = now
+                    if self.host_signal is not None:
+                        mark = self._signal_mark
+                        self._sync_state = self.host_signal() if mark is None else mark
+                        self._signal_mark = None
+                elif op == OP_SECRET:
+                    stream = self.resolve_secret(arg) if self.resolve_secret else None
+                    if stream is None:
+                        raise KeyError(f"secret '{arg}' indisponible")
+                    self._start_stream(stream, now)
+                    self._wipe = True
+                elif op == OP_TEMPLATE:
+                    stream = self.resolve_template(arg) if self.resolve_template else None
+                    if stream is None:
+                        raise KeyError("secret du modèle indisponible")
+                    self._start_stream(stream, now)
+                elif op == OP_FILE:
+                    if self.open_file is None:
+                        raise OSError(f"type_file indisponible: {arg}")
+                    reader = self.open_file(arg)
+                    stream = reader.next()
+                    if stream is not None:
+                        self._reader = reader
+                        self._start_stream(stream, now)
+                elif op == OP_PACE:
+                    self._profile = arg
+                elif op == OP_REPEAT:
+                    count, end = arg
+                    if count > 0:
+                        self._loops.append([count, self._pc])
+                    else:
+                        self._pc = end
+                elif op == OP_NEXT:
+                    loop = self._loops[-1]
+                    loop[0] -= 1
+                    if loop[0] > 0:
+                        self._pc = arg
+                        return True  # un tour de boucle par tick au plus
+                    else:
+                        self._loops.pop()
+                elif op == OP_JUMP:
+                    target, times = arg
+                    if times < 0:
+                        self._pc = target
+                    else:
+                        if self._jumps is None:
+                            self._jumps = {}
+                        done = self._jumps.get(pc, 0)
+                        if done < times:
+                            self._jumps[pc] = done + 1
+                            self._pc = target
+                        else:
+                            self._jumps[pc] = 0  # repassage ultérieur : à nouveau `times` sauts
+                    if self._pc <= pc:
+                        return True  # saut arrière : un "goto" sans fin reste annulable
+                elif op == OP_INVOKE:
+                    program = self.resolve_macro(arg) if self.resolve_macro else None
+                    if program is None:
+                        raise KeyError(f"macro '{arg}' inconnue")
+                    if len(self._frames) >= MAX_CALL_DEPTH:
+                        raise RuntimeError(f"appels imbriqués > {MAX_CALL_DEPTH}")
+                    if isinstance(program, list):
+                        program = assemble(program)
+                    self._frames.append((self._steps, self._pc, self._loops, self._jumps))
+                    self._enter(program)
+                elif op == OP_CALL:
+                    arg()
+                elif op == OP_DEFER:
+                    self._deferred.append(arg)
+            except Exception as e:
+                name = self.name
+                logger.error("[MACROS] '%s' étape #%d échouée: %s", name, self._pc, e)
+                self._finish()
+                if self.on_error:
+                    self.on_error(name, e)
+                return False
+        return False
@@ -0,0 +1,117 @@
+# gestures.py — Reconnaissance des gestes par bouton : tap, double tap, appui long, accord
+# Construit sur les fronts appui/relâchement horodatés du scanner (ms, horloge
+# time.monotonic_ns() commune, voir scanner.now_ms). Chaque bouton attend
+# seulement ce que sa configuration rend ambigu :
+#   - rien d'autre que le tap lié : tap émis dès l'appui (aucune latence ajoutée) ;
+#   - double tap lié : tap émis au relâchement + double_ms sans second appui,
+#     double émis dès le second appui ;
+#   - appui long lié : émis dès que l'appui dure hold_ms (sans attendre le
+#     relâchement), tap émis au relâchement avant ce délai ;
+#   - accord lié (deux boutons) : émis au second appui s'il suit le premier de
+#     moins de chord_ms ; sans double ni appui long, le tap du premier part à
+#     l'expiration de cette fenêtre même s'il est encore tenu.
+# Un geste émis « consomme » l'appui : rien d'autre jusqu'au relâchement.
+
+TAP, DOUBLE, HOLD, CHORD = range(4)
+KINDS = ("tap", "double", "hold", "chord")
+
+DOUBLE_MS = 250
+HOLD_MS = 500
+CHORD_MS = 60
+
+_IDLE = 0
+_DOWN = 1      # appui en cours, geste pas encore tranché
+_UP = 2        # relâché après un premier appui, attente d'un second (double)
+_CONSUMED = 3  # geste émis, attente du relâchement
+
+
+class GestureRecognizer:
+    """`buttons` : configs compilées (clés double, hold, chord_with, *_ms) ;
+    `fire(key, kind, ts)` est appelé pour chaque geste (key = indice du bouton,
+    pour un accord celui qui porte la liaison)."""
+
+    def __init__(self, buttons, fire):
+        n = len(buttons)
+        self._fire = fire
+        index = {b["id"]: i for i, b in enumerate(buttons)}
+        self._double_ms = [b["double_ms"] if b["double"] else -1 for b in buttons]
+        self._hold_ms = [b["hold_ms"] if b["hold"] else -1 for b in buttons]
+        self._chord_ms = [b["chord_ms"] for b in buttons]
+        self._partner = [-1] * n
+        self._owner = bytearray(n)  # 1 : porte la liaison de l'accord
+        for i, b in enumerate(buttons):
+            j = index.get(b["chord_with"], -1) if b["chord"] else -1
+            if j < 0 or j == i or self._partner[i] >= 0 or self._partner[j] >= 0:
+                continue  # partenaire absent, ou déjà pris par un autre accord
+            self._partner[i], self._partner[j] = j, i
+            self._owner[i] = 1
+        self._phase = bytearray(n)
+        self._t = [0] * n   # instant du dernier front (ms)
+        self._waiting = 0   # boutons en _DOWN ou _UP : update() n'a rien à faire sinon
+
+    def _set(self, key, phase):
+        was = self._phase[key] in (_DOWN, _UP)
+        now = phase in (_DOWN, _UP)
+        self._waiting += now - was
+        self._phase[key] = phase
+
+    def _emit(self, key, kind, ts, phase):
+        self._set(key, phase)
+        self._fire(key, kind, ts)
+
+    def feed(self, key, pressed, ts):
+        """Front publié par le scanner (après anti-rebond)."""
+        phase = self._phase[key]
+        if pressed:
+            if phase == _UP:
+                if ts - self._t[key] <= self._double_ms[key]:
+                    self._emit(key, DOUBLE, ts, _CONSUMED)
+                    return
+                self._emit(key, TAP, self._t[key] + self._double_ms[key], _IDLE)  # update() en retard
+            other = self._partner[key]
+            if (other >= 0 and self._phase[other] == _DOWN
+                    and ts - self._t[other] <= max(self._chord_ms[key], self._chord_ms[other])):
+                self._set(other, _CONSUMED)
+                self._emit(key if self._owner[key] else other, CHORD, ts, _CONSUMED)
+                self._set(key, _CONSUMED)
+                return
+            self._t[key] = ts
+            if self._double_ms[key] < 0 and self._hold_ms[key] < 0 and other < 0:
+                self._emit(key, TAP, ts, _CONSUMED)  # geste sans ambiguïté : tout de suite
+            else:
+                self._set(key, _DOWN)
+        elif phase == _DOWN:
+            if self._double_ms[key] >= 0:
+                self._t[key] = ts
+                self._set(key, _UP)
+            else:
+                self._emit(key, TAP, ts, _IDLE)
+        elif phase == _CONSUMED:
+            self._set(key, _IDLE)
+
+    def update(self, now):
+        """Tranche les gestes dont la fenêtre a expiré (appui long, tap différé)."""
+        if not self._waiting:
+            return
+        for key in range(len(self._phase)):
+            phase = self._phase[key]
+            if phase == _DOWN:
+                hold = self._hold_ms[key]
+                t = self._t[key]
+                if hold >= 0:
+                    if now - t >= hold:
+                        self._emit(key, HOLD, t + hold, _CONSUMED)
+                elif self._double_ms[key] < 0 and now - t > self._chord_ms[key]:
+                    self._emit(key, TAP, t + self._chord_ms[key], _CONSUMED)  # pas d'accord
+            elif phase == _UP and now - self._t[key] > self._double_ms[key]:
+                self._emit(key, TAP, self._t[key] + self._double_ms[key], _IDLE)
+
+    def pending(self):
+        """Vrai si un geste attend encore sa fenêtre (la boucle reste réactive)."""
+        return self._waiting > 0
+
+    def reset(self):
+        """Oublie tout geste en cours (changement de mode du switch)."""
+        for key in range(len(self._phase)):
+            self._phase[key] = _IDLE
+        self._waiting = 0
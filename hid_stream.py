@@ -0,0 +1,249 @@
+# hid_stream.py — Flux de rapports HID précompilés (texte et combos de touches)
+# Un flux est un bytearray d'enregistrements [modificateurs, n, k1..kn] (n <= 6).
+# Le bit _ALONE de n marque une touche morte et sa touche de base : chacune a
+# son propre rapport, même en turbo (la composition ne dépend alors pas de
+# l'ordre de lecture des touches d'un rapport par l'hôte).
+# Chaque enregistrement est envoyé comme un rapport clavier "appui" de 8 octets,
+# suivi d'un rapport "tout relâché" : c'est exactement ce que fait
+# KeyboardLayout.write(), mais la résolution caractère → touches est faite une
+# seule fois (au boot) au lieu d'à chaque appui.
+
+_MOD_FIRST = 0xE0  # Keycode.LEFT_CONTROL
+_MOD_LAST = 0xE7   # Keycode.RIGHT_GUI
+_ALONE = 0x80      # bit de n : enregistrement jamais regroupé (touches mortes)
+_COUNT = 0x07      # n sans _ALONE
+
+
+def _mod_bit(keycode):
+    return 1 << (keycode - _MOD_FIRST)
+
+
+def _char_keycode(layout, cp):
+    """Comme KeyboardLayoutBase._char_to_keycode, sur un code point."""
+    table = layout.ASCII_TO_KEYCODE
+    if cp < len(table):
+        return table[cp]
+    return layout.HIGHER_ASCII.get(cp, 0)
+
+
+def _append_key(out, layout, keycode, altgr, alone=False):
+    """Comme KeyboardLayoutBase._write : AltGr / Shift éventuels + la touche."""
+    if keycode == 0:
+        raise ValueError("No keycode available for character.")
+    mods = _mod_bit(layout.RIGHT_ALT_CODE) if altgr else 0
+    if keycode & layout.SHIFT_FLAG:
+        keycode &= ~layout.SHIFT_FLAG
+        mods |= _mod_bit(layout.SHIFT_CODE)
+    out.append(mods)
+    out.append(1 | _ALONE if alone else 1)
+    out.append(keycode)
+
+
+def _codepoints(text):
+    """Code points d'un str, ou d'un bytes/bytearray UTF-8 (décodé sans créer de str)."""
+    if isinstance(text, str):
+        for char in text:
+            yield ord(char)
+        return
+    i, n = 0, len(text)
+    while i < n:
+        b = text[i]
+        if b < 0x80:
+            cp, extra = b, 0
+        elif b < 0xE0:
+            cp, extra = b & 0x1F, 1
+        elif b < 0xF0:
+            cp, extra = b & 0x0F, 2
+        else:
+            cp, extra = b & 0x07, 3
+        if i + extra >= n:
+            raise ValueError("UTF-8 tronqué")
+        for j in range(i + 1, i + 1 + extra):
+            cp = (cp << 6) | (text[j] & 0x3F)
+        yield cp
+        i += 1 + extra
+
+
+def compile_text(layout, text, out=None):
+    """Compile `text` (str, ou bytes UTF-8) pour `layout` (classe ou instance de KeyboardLayout).
+
+    Mêmes règles que KeyboardLayout.write() (AltGr, Shift, touches mortes) ;
+    lève ValueError sur un caractère non tapable, comme write().
+    """
+    if out is None:
+        out = bytearray()
+    need_altgr = layout.NEED_ALTGR
+    combined = layout.COMBINED_KEYS
+    altgr_flag = layout.ALTGR_FLAG
+    for cp in _codepoints(text):
+        keycode = _char_keycode(layout, cp)
+        if keycode > 0:
+            _append_key(out, layout, keycode, chr(cp) in need_altgr)
+        elif cp in combined:
+            # touche morte (Shift/AltGr compris) puis la touche de base
+            cchar = combined[cp]
+            _append_key(out, layout, cchar >> 8, cchar & altgr_flag, True)
+            second = cchar & 0xFF & ~altgr_flag
+            _append_key(out, layout, _char_keycode(layout, second), False, True)
+        else:
+            raise ValueError(f"No keycode available for character ({cp}/0x{cp:02x}).")
+    return out
+
+
+def compile_keys(keycodes, out=None):
+    """Compile un combo (ex. [Keycode.CONTROL, Keycode.D]) en un seul enregistrement."""
+    if out is None:
+        out = bytearray()
+    mods = 0
+    keys = []
+    for kc in keycodes:
+        if _MOD_FIRST <= kc <= _MOD_LAST:
+            mods |= _mod_bit(kc)
+        elif kc not in keys:
+            keys.append(kc)
+    if len(keys) > 6:
+        raise ValueError("6 touches maximum par combo")
+    out.append(mods)
+    out.append(len(keys))
+    out.extend(bytes(keys))
+    return out
+
+
+def _utf8_cut(buf, end):
+    """Fin du dernier caractère UTF-8 complet de buf[:end] (le reste attend le bloc suivant)."""
+    i = end - 1
+    while i > 0 and end - i < 4 and (buf[i] & 0xC0) == 0x80:
+        i -= 1
+    lead = buf[i] if end else 0
+    if lead < 0x80:
+        return end
+    size = 2 if lead < 0xE0 else 3 if lead < 0xF0 else 4
+    return end if i + size <= end else i
+
+
+class _Records:
+    """Sortie de compile_text() dans un tampon fixe, remise à zéro à chaque bloc."""
+
+    def __init__(self, size):
+        self.buf = bytearray(size)
+        self.view = memoryview(self.buf)
+        self.n = 0
+
+    def append(self, byte):
+        self.buf[self.n] = byte
+        self.n += 1
+
+
+class TextFileStream:
+    """Texte UTF-8 d'un fichier, compilé bloc par bloc (action "type_file").
+
+    Le fichier est lu par `chunk` octets dans un tampon réutilisé, et chaque
+    bloc compilé dans un même tampon de sortie : la mémoire ne dépend pas de
+    sa taille. Les \r sont ignorés (fichiers CRLF : \n suffit pour Entrée) ;
+    un caractère coupé en fin de bloc est reporté au suivant.
+    """
+
+    def __init__(self, layout, chunk=256):
+        self._layout = layout
+        self._buf = bytearray(chunk)
+        self._view = memoryview(self._buf)
+        # au plus 2 enregistrements de 3 octets par caractère (touche morte + base)
+        self._out = _Records(6 * chunk)
+        self._file = None
+        self._keep = 0
+
+    def open(self, path):
+        self.close()
+        self._file = open(path, "rb")
+        self._keep = 0
+        return self
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def next(self):
+        """Flux HID du bloc suivant (vue valable jusqu'à l'appel suivant), ou None à la fin du fichier."""
+        buf = self._buf
+        while self._file is not None:
+            n = self._file.readinto(self._view[self._keep:])
+            if not n:
+                self.close()
+                if self._keep:
+                    raise ValueError("UTF-8 tronqué")
+                return None
+            end = 0
+            for r in range(self._keep + n):
+                c = buf[r]
+                if c != 0x0D:
+                    buf[end] = c
+                    end += 1
+            cut = _utf8_cut(buf, end)
+            out = self._out
+            out.n = 0  # bloc précédent entièrement envoyé : le tampon est libre
+            compile_text(self._layout, self._view[:cut], out)
+            self._keep = end - cut
+            for j in range(self._keep):
+                buf[j] = buf[cut + j]
+            if out.n:
+                return out.view[:out.n]
+        return None
+
+
+class ReportWriter:
+    """Envoie un flux précompilé directement au périphérique HID clavier."""
+
+    def __init__(self, keyboard):
+        self._device = keyboard._keyboard_device
+        self._report = bytearray(8)
+        self._release = bytes(8)
+        self.count = 0  # rapports "appui" envoyés par le dernier send()
+
+    def send(self, stream, start=0, end=None, max_records=None, batch=False):
+        """Envoie les enregistrements de stream[start:end] ; retourne l'index atteint.
+
+        `max_records` borne le nombre de rapports "appui" par appel (exécution
+        coopérative par tranches). Avec `batch`, les enregistrements d'une touche
+        qui suivent avec les mêmes modificateurs et des touches différentes
+        partagent le même rapport (jusqu'à 6 touches) : une seule paire
+        appui/relâché pour plusieurs caractères. Une touche morte et sa touche
+        de base (bit _ALONE) restent seules dans leur rapport.
+        """
+        if end is None:
+            end = len(stream)
+        report = self._report
+        release = self._release
+        send_report = self._device.send_report
+        budget = max_records if max_records is not None else -1
+        count = 0
+        i = start
+        while i < end and budget:
+            budget -= 1
+            mods = stream[i]
+            n = stream[i + 1]
+            alone = n & _ALONE
+            n &= _COUNT
+            report[0] = mods
+            for j in range(n):
+                report[2 + j] = stream[i + 2 + j]
+            i += 2 + n
+            if batch and n and not alone:
+                while n < 6 and i < end and stream[i] == mods and stream[i + 1] == 1:
+                    keycode = stream[i + 2]
+                    for j in range(2, 2 + n):
+                        if report[j] == keycode:
+                            break
+                    else:
+                        report[2 + n] = keycode
+                        n += 1
+                        i += 3
+                        continue
+                    break  # même touche : il faut un relâché entre les deux
+            send_report(report)
+            send_report(release)
+            for j in range(n):
+                report[2 + j] = 0
+            count += 1
+        self.count = count
+        return i
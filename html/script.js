@@ -80,9 +80,13 @@ document.querySelectorAll('.btn').forEach(b=>{
 });
 
 /* ========= Données boutons ========= */
-const DEFAULT_BUTTON = id => ({ id, color:"", pin:"", macro:"", command:"", pass_key:"", winsearch:false, delay_ms:0 });
+const DEFAULT_BUTTON = id => ({ id, color:"", pin:"", row:"", col:"", macro:"", command:"", pass_key:"", winsearch:false, delay_ms:0, cancel:false, typing_profile:"", wait_for_host:false,
+  double:"", hold:"", chord:"", chord_with:0, double_ms:250, hold_ms:500, chord_ms:60 });
 let buttons = [];
+let matrix = null;         // {rows, cols, columns_to_anodes, diodes} de commands.json, ou null
 let byId = new Map();
+const dirty = new Set();   // ids modifiés via la popin depuis le dernier enregistrement
+let replaceAll = false;    // setButtonsFromJSON() : remplacement complet (POST /config)
 
 async function loadCommands(){
   try{
@@ -90,10 +94,12 @@ async function loadCommands(){
     const data = await res.json();
     const arr = Array.isArray(data.buttons) ? data.buttons : [];
     buttons = structuredClone(arr);
+    matrix = data.matrix || null;
     rebuildIndex();
   }catch(e){
     console.warn('Config introuvable/invalid → états vides.', e);
     buttons = [];
+    matrix = null;
     rebuildIndex();
   }
 }
@@ -124,11 +130,23 @@ function openPopin(forBtn){
   popinBtnId.textContent = rec.id;
   form.f_color.value = rec.color ?? "";
   form.f_pin.value = rec.pin ?? "";
+  form.f_row.value = rec.row ?? "";
+  form.f_col.value = rec.col ?? "";
   form.f_macro.value = rec.macro ?? "";
   form.f_command.value = rec.command ?? "";
   form.f_pass_key.value = rec.pass_key ?? "";
   form.f_winsearch.checked = !!rec.winsearch;
+  form.f_cancel.checked = !!rec.cancel;
+  form.f_wait_for_host.checked = !!rec.wait_for_host;
   form.f_delay_ms.value = rec.delay_ms ?? 0;
+  form.f_typing_profile.value = rec.typing_profile ?? "";
+  form.f_double.value = rec.double ?? "";
+  form.f_hold.value = rec.hold ?? "";
+  form.f_chord.value = rec.chord ?? "";
+  form.f_chord_with.value = rec.chord_with || "";
+  form.f_double_ms.value = rec.double_ms ?? 250;
+  form.f_hold_ms.value = rec.hold_ms ?? 500;
+  form.f_chord_ms.value = rec.chord_ms ?? 60;
 
   popinBackdrop.setAttribute('aria-hidden','false');
   setTimeout(()=> popinClose.focus(), 0);
@@ -173,47 +191,77 @@ popinSave.addEventListener('click', ()=>{
     id,
     color: (form.f_color.value || "").trim(),
     pin: (form.f_pin.value || "").trim(),
+    // case de la matrice : row + col ; vides → broche directe (pin)
+    row: form.f_row.value === "" ? "" : Number(form.f_row.value),
+    col: form.f_col.value === "" ? "" : Number(form.f_col.value),
     macro: (form.f_macro.value || "").trim(),
     command: form.f_command.value || "",
     pass_key: (form.f_pass_key.value || "").trim(),
     winsearch: !!form.f_winsearch.checked,
-    delay_ms: Number(form.f_delay_ms.value || 0)
+    cancel: !!form.f_cancel.checked,
+    wait_for_host: !!form.f_wait_for_host.checked,
+    delay_ms: Number(form.f_delay_ms.value || 0),
+    typing_profile: (form.f_typing_profile.value || "").trim().toLowerCase(),
+    // gestes : macros liées (vides = non liées) et fenêtres propres au bouton
+    double: (form.f_double.value || "").trim(),
+    hold: (form.f_hold.value || "").trim(),
+    chord: (form.f_chord.value || "").trim(),
+    chord_with: Number(form.f_chord_with.value || 0),
+    double_ms: Number(form.f_double_ms.value || 250),
+    hold_ms: Number(form.f_hold_ms.value || 500),
+    chord_ms: Number(form.f_chord_ms.value || 60)
   };
   const existing = byId.get(id);
   if(existing){
     const idx = buttons.findIndex(b => Number(b.id) === id);
-    if(idx > -1) buttons[idx] = payload;
+    // conserve les champs non édités dans la popin (debounce_ms…)
+    if(idx > -1) buttons[idx] = { ...existing, ...payload, couleur: payload.color };
   }else{
     buttons.push(payload);
   }
+  dirty.add(id);
   rebuildIndex();
   closePopin();
 });
 
 /* ========= API util ========= */
-window.getButtonsJSON = () => JSON.stringify({ buttons }, null, 2);
+window.getButtonsJSON = () => JSON.stringify(matrix ? { buttons, matrix } : { buttons }, null, 2);
 window.setButtonsFromJSON = (jsonStr) => {
   try{
     const obj = JSON.parse(jsonStr);
-    if(Array.isArray(obj.buttons)){ buttons = obj.buttons; rebuildIndex(); return true; }
+    if(Array.isArray(obj.buttons)){ buttons = obj.buttons; matrix = obj.matrix || null; replaceAll = true; rebuildIndex(); return true; }
   }catch(e){ console.error(e); }
   return false;
 };
 
-/* ========= POST /config ========= */
+/* ========= Enregistrement : PATCH des seuls boutons modifiés ========= */
 document.querySelector('.save-config').addEventListener('click', async ()=>{
   try{
-    const payload = { buttons };
-    const res = await fetch('/config', {
-      method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
-      body: JSON.stringify(payload)
-    });
+    let res;
+    if(replaceAll){
+      res = await fetch('/config', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ buttons, matrix })
+      });
+    }else if(dirty.size){
+      res = await fetch('/config/buttons', {
+        method: 'PATCH',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ buttons: [...dirty].map(id => byId.get(id)).filter(Boolean) })
+      });
+    }else{
+      alert('Aucune modification à enregistrer');
+      return;
+    }
     const data = await res.json();
     if(data.ok){
+      dirty.clear();
+      replaceAll = false;
       alert('Configuration enregistrée');
     }else{
-      alert('Erreur: ' + (data.error || 'inconnue'));
+      const details = data.errors ? '\n' + Object.entries(data.errors).map(([id, err]) => `bouton ${id} : ${err}`).join('\n') : '';
+      alert('Erreur: ' + (data.error || 'inconnue') + details);
     }
   }catch(e){
     alert('Erreur réseau : ' + e);
@@ -227,6 +275,8 @@ const btnSaveConfig= document.querySelector('.save-config');
 
 let keyBackdrop, keyNameEl, keyValueEl, keyCancelEl, keyContinueEl;
 let pendingKeyName = '', pendingKeyValue = '';
+let pendingBatch = null;   // [{name, value}] : import groupé via POST /savekeys
+let keyBatchEl, keyFileEl;
 
 function ensureKeyPopin(){
   if (document.getElementById('keyBackdrop')) {
@@ -236,6 +286,8 @@ function ensureKeyPopin(){
     keyValueEl   = document.getElementById('keyValue');
     keyCancelEl  = document.getElementById('keyCancel');
     keyContinueEl= document.getElementById('keyContinue');
+    keyBatchEl   = document.getElementById('keyBatch');
+    keyFileEl    = document.getElementById('keyFile');
     return;
   }
 
@@ -264,6 +316,11 @@ function ensureKeyPopin(){
           <label>Key value</label>
           <input type="text" id="keyValue" placeholder="password or token" autocomplete="off">
         </div>
+        <div class="f">
+          <label>Or several keys at once (one <code>name=value</code> per line, or a .txt/.json file)</label>
+          <textarea id="keyBatch" rows="4" placeholder="rpi=raspberry&#10;nas=s3cr3t" autocomplete="off" spellcheck="false"></textarea>
+          <input type="file" id="keyFile" accept=".txt,.json,.env,text/plain,application/json">
+        </div>
       </div>
       <div class="popin-actions">
         <button class="btn-hud secondary" id="keyCancel" type="button">Cancel</button>
@@ -278,6 +335,12 @@ function ensureKeyPopin(){
   keyValueEl   = document.getElementById('keyValue');
   keyCancelEl  = document.getElementById('keyCancel');
   keyContinueEl= document.getElementById('keyContinue');
+  keyBatchEl   = document.getElementById('keyBatch');
+  keyFileEl    = document.getElementById('keyFile');
+  keyFileEl.addEventListener('change', async ()=>{
+    const file = keyFileEl.files && keyFileEl.files[0];
+    if (file) keyBatchEl.value = await file.text();
+  });
 
   const keyClose = document.getElementById('keyClose');
   keyClose.addEventListener('click', closeKeyPopin);
@@ -296,10 +359,36 @@ function closeKeyPopin(){
   keyBackdrop.setAttribute('aria-hidden','true');
 }
 
+/* "name=value" par ligne (# = commentaire), ou JSON {nom: valeur} / [{name, value}] */
+function parseKeyBatch(text){
+  const trimmed = text.trim();
+  if (!trimmed) return [];
+  if (trimmed[0] === '{' || trimmed[0] === '['){
+    const obj = JSON.parse(trimmed);
+    return Array.isArray(obj)
+      ? obj.map(e => ({ name: String(e.name ?? '').trim(), value: String(e.value ?? '') }))
+      : Object.entries(obj).map(([name, value]) => ({ name: name.trim(), value: String(value) }));
+  }
+  const out = [];
+  for (const line of trimmed.split(/\r?\n/)){
+    if (!line.trim() || line.trim().startsWith('#')) continue;
+    const eq = line.indexOf('=');
+    if (eq < 1) throw new Error(`Invalid line (name=value expected): ${line}`);
+    out.push({ name: line.slice(0, eq).trim(), value: line.slice(eq + 1) });
+  }
+  return out;
+}
+
 function onKeyContinue(){
   pendingKeyName  = (keyNameEl?.value || '').trim();
   pendingKeyValue = (keyValueEl?.value || '').trim();
-  if (!pendingKeyName){ alert('Key name is required.'); return; }
+  pendingBatch = null;
+  if (keyBatchEl && keyBatchEl.value.trim()){
+    try{ pendingBatch = parseKeyBatch(keyBatchEl.value); }
+    catch(e){ alert('Batch: ' + e.message); return; }
+    if (pendingKeyName) pendingBatch.unshift({ name: pendingKeyName, value: pendingKeyValue });
+    if (!pendingBatch.length){ alert('No key in batch.'); return; }
+  }else if (!pendingKeyName){ alert('Key name is required.'); return; }
 
   closeKeyPopin();
 
@@ -376,14 +465,28 @@ btnSendKey?.addEventListener('click', async ()=>{
     return;
   }
   try{
-    const res = await fetch('/savekey', {
-      method:'POST',
-      headers:{'Content-Type':'application/json'},
-      body: JSON.stringify({ aes_key, "key_name": pendingKeyName, "key_value": pendingKeyValue })
-    });
-    const data = await res.json();
-    if (!data.ok){ throw new Error(data.error || 'Unknown error'); }
-    alert(`Key saved: ${pendingKeyName}`);
+    if (pendingBatch){
+      const res = await fetch('/savekeys', {
+        method:'POST',
+        headers:{'Content-Type':'application/json'},
+        body: JSON.stringify({ aes_key, secrets: pendingBatch })
+      });
+      const data = await res.json();
+      if (!data.results){ throw new Error(data.error || 'Unknown error'); }
+      const failed = data.results.filter(r => !r.ok).map(r => `${r.name || '(no name)'}: ${r.error}`);
+      alert(`Keys saved: ${data.stored}/${data.results.length}` + (failed.length ? '\n' + failed.join('\n') : ''));
+      if (keyBatchEl) keyBatchEl.value = '';
+      if (keyFileEl) keyFileEl.value = '';
+    }else{
+      const res = await fetch('/savekey', {
+        method:'POST',
+        headers:{'Content-Type':'application/json'},
+        body: JSON.stringify({ aes_key, "key_name": pendingKeyName, "key_value": pendingKeyValue })
+      });
+      const data = await res.json();
+      if (!data.ok){ throw new Error(data.error || 'Unknown error'); }
+      alert(`Key saved: ${pendingKeyName}`);
+    }
   }catch(e){
     alert('Save failed: ' + e.message);
   }finally{
@@ -397,8 +500,247 @@ btnSendKey?.addEventListener('click', async ()=>{
       if (btnSendKey)    btnSendKey.hidden = true;   // cacher Done
   if (btnSaveKey)    btnSaveKey.hidden = false;  // réafficher Save a key
   if (btnSaveConfig) btnSaveConfig.hidden = false;
-    pendingKeyName = ''; pendingKeyValue = '';
+    pendingKeyName = ''; pendingKeyValue = ''; pendingBatch = null;
+  }
+});
+
+/* ========= Statistiques des macros (GET /stats) ========= */
+const btnStats = document.querySelector('.show-stats');
+let statsBackdrop, statsBodyEl;
+const HIST_BARS = ' ▁▂▃▄▅▆▇█';
+
+function ensureStatsPopin(){
+  if (document.getElementById('statsBackdrop')) return;
+  const wrap = document.createElement('div');
+  wrap.className = 'popin-backdrop';
+  wrap.id = 'statsBackdrop';
+  wrap.setAttribute('role','dialog');
+  wrap.setAttribute('aria-modal','true');
+  wrap.setAttribute('aria-hidden','true');
+  wrap.setAttribute('aria-labelledby','statsTitle');
+  wrap.innerHTML = `
+    <div class="popin" role="document">
+      <button class="btn-close" id="statsClose" aria-label="Fermer">✕</button>
+      <header class="popin-header">
+        <span class="chip" aria-hidden="true"></span>
+        <h2 class="popin-title" id="statsTitle">Macro timings</h2>
+        <div class="popin-meta">since last reset</div>
+      </header>
+      <div class="popin-body stats-body" id="statsBody">Loading…</div>
+      <div class="popin-actions">
+        <button class="btn-hud secondary" id="statsReset" type="button">Reset</button>
+        <button class="btn-hud" id="statsDone" type="button">Close</button>
+      </div>
+    </div>
+  `;
+  document.body.appendChild(wrap);
+  statsBackdrop = wrap;
+  statsBodyEl = document.getElementById('statsBody');
+  document.getElementById('statsClose').addEventListener('click', closeStatsPopin);
+  document.getElementById('statsDone').addEventListener('click', closeStatsPopin);
+  statsBackdrop.addEventListener('click', e=>{ if(e.target===statsBackdrop) closeStatsPopin(); });
+  document.getElementById('statsReset').addEventListener('click', async ()=>{
+    if (!confirm('Reset all macro timings?')) return;
+    try { await fetch('/stats', { method:'DELETE' }); } catch(_) {}
+    loadStats();
+  });
+}
+
+function closeStatsPopin(){
+  if (statsBackdrop) statsBackdrop.setAttribute('aria-hidden','true');
+}
+
+/* Histogramme log2 compact : une barre par case, de la plus petite à la plus grande non vide */
+function histBars(buckets){
+  let lo = buckets.findIndex(n=> n > 0);
+  let hi = buckets.length - 1;
+  while (hi > lo && !buckets[hi]) hi--;
+  const max = Math.max(...buckets);
+  return buckets.slice(lo, hi + 1)
+    .map(n=> HIST_BARS[n ? Math.max(1, Math.round(n / max * (HIST_BARS.length - 1))) : 0]).join('');
+}
+
+function fmtMs(ms){ return ms >= 1000 ? (ms / 1000).toFixed(2) + ' s' : ms.toFixed(ms < 10 ? 2 : 0) + ' ms'; }
+
+async function loadStats(){
+  statsBodyEl.textContent = 'Loading…';
+  let data;
+  try {
+    const res = await fetch('/stats', { cache:'no-store' });
+    data = await res.json();
+  } catch(e) {
+    statsBodyEl.textContent = 'Unable to load /stats';
+    return;
+  }
+  const names = Object.keys(data.macros || {});
+  if (!names.length) {
+    statsBodyEl.textContent = 'No timings yet: run some macros (switch ON), then flip the switch OFF to record them.';
+    return;
   }
+  const esc = t=> String(t).replace(/[&<>"]/g, c=> ({'&':'&amp;','<':'&lt;','>':'&gt;','"':'&quot;'}[c]));
+  const rows = [];
+  names.sort().forEach(name=>{
+    let first = true;
+    data.kinds.forEach(kind=>{
+      const s = data.macros[name][kind];
+      if (!s) return;
+      rows.push(`<tr><td>${first ? esc(name) : ''}</td><td>${kind}</td>`
+        + `<td>${s.n}</td><td>${fmtMs(s.mean_ms)}</td><td>${fmtMs(s.max_ms)}</td>`
+        + `<td class="hist" title="log2 buckets from 64 µs">${histBars(s.buckets)}</td></tr>`);
+      first = false;
+    });
+  });
+  statsBodyEl.innerHTML = `<table class="stats-table"><thead><tr><th>Macro</th><th>Span</th><th>n</th>`
+    + `<th>Mean</th><th>Max</th><th>Distribution</th></tr></thead><tbody>${rows.join('')}</tbody></table>`;
+}
+
+btnStats?.addEventListener('click', ()=>{
+  ensureStatsPopin();
+  statsBackdrop.setAttribute('aria-hidden','false');
+  loadStats();
+});
+
+/* ========= Profils (profiles/<name>.json, GET/POST/DELETE /profiles) ========= */
+const btnProfiles = document.querySelector('.show-profiles');
+let profilesBackdrop;
+const PROFILE_EXAMPLE = '[\n  { "id": 1, "macro": "deploy" },\n  { "id": 2, "command": "git pull\\n", "hold": "@default" }\n]';
+
+function ensureProfilesPopin(){
+  if (document.getElementById('profilesBackdrop')) return;
+  const wrap = document.createElement('div');
+  wrap.className = 'popin-backdrop';
+  wrap.id = 'profilesBackdrop';
+  wrap.setAttribute('role','dialog');
+  wrap.setAttribute('aria-modal','true');
+  wrap.setAttribute('aria-hidden','true');
+  wrap.setAttribute('aria-labelledby','profilesTitle');
+  wrap.innerHTML = `
+    <div class="popin" role="document">
+      <button class="btn-close" id="profilesClose" aria-label="Fermer">✕</button>
+      <header class="popin-header">
+        <span class="chip" aria-hidden="true"></span>
+        <h2 class="popin-title" id="profilesTitle">Profiles</h2>
+        <div class="popin-meta">commands.json = "default"</div>
+      </header>
+      <div class="popin-body">
+        <div class="row">
+          <div class="f">
+            <label>Profile</label>
+            <select id="p_select"></select>
+          </div>
+          <div class="f">
+            <label>Name</label>
+            <input type="text" id="p_name" maxlength="24" placeholder="ex: work">
+          </div>
+        </div>
+        <div class="f">
+          <label>Buttons redefined by this profile (JSON, by id; missing fields keep commands.json)</label>
+          <textarea id="p_buttons" rows="8" spellcheck="false" placeholder='${PROFILE_EXAMPLE}'></textarea>
+        </div>
+        <div class="row">
+          <div class="f">
+            <label>Switch: button ID</label>
+            <input type="number" id="p_switch_button" min="0" step="1" placeholder="—">
+          </div>
+          <div class="f">
+            <label>Switch: gesture</label>
+            <select id="p_switch_gesture">
+              <option value="hold">hold</option>
+              <option value="double">double</option>
+              <option value="tap">tap</option>
+            </select>
+          </div>
+          <div class="f f-inline">
+            <button class="btn-hud secondary" id="p_switch_save" type="button">Set switch</button>
+          </div>
+        </div>
+      </div>
+      <div class="popin-actions">
+        <button class="btn-hud secondary" id="p_delete" type="button">Delete</button>
+        <button class="btn-hud secondary" id="p_done" type="button">Close</button>
+        <button class="btn-hud" id="p_save" type="button">Save profile</button>
+      </div>
+    </div>
+  `;
+  document.body.appendChild(wrap);
+  profilesBackdrop = wrap;
+  const close = ()=> profilesBackdrop.setAttribute('aria-hidden','true');
+  document.getElementById('profilesClose').addEventListener('click', close);
+  document.getElementById('p_done').addEventListener('click', close);
+  profilesBackdrop.addEventListener('click', e=>{ if(e.target===profilesBackdrop) close(); });
+  document.getElementById('p_select').addEventListener('change', e=> loadProfile(e.target.value));
+  document.getElementById('p_save').addEventListener('click', saveProfile);
+  document.getElementById('p_delete').addEventListener('click', deleteProfile);
+  document.getElementById('p_switch_save').addEventListener('click', saveProfileSwitch);
+}
+
+function profileError(data){
+  const details = data.errors ? '\n' + Object.entries(data.errors).map(([id, err]) => `bouton ${id} : ${err}`).join('\n') : '';
+  alert('Erreur: ' + (data.error || 'inconnue') + details);
+}
+
+async function loadProfiles(selected){
+  let data = { profiles: [], switch: null };
+  try { data = await (await fetch('/profiles', { cache:'no-store' })).json(); } catch(_) {}
+  const sel = document.getElementById('p_select');
+  sel.innerHTML = '<option value="">— new profile —</option>'
+    + data.profiles.map(n=> `<option value="${n}">${n}</option>`).join('');
+  sel.value = data.profiles.includes(selected) ? selected : '';
+  document.getElementById('p_switch_button').value = data.switch ? data.switch.button : '';
+  document.getElementById('p_switch_gesture').value = data.switch ? data.switch.gesture : 'hold';
+  loadProfile(sel.value);
+}
+
+async function loadProfile(name){
+  document.getElementById('p_name').value = name;
+  document.getElementById('p_name').readOnly = !!name;
+  const area = document.getElementById('p_buttons');
+  area.value = '';
+  if (!name) return;
+  try {
+    const data = await (await fetch('/profiles/' + encodeURIComponent(name), { cache:'no-store' })).json();
+    area.value = JSON.stringify(data.buttons || [], null, 2);
+  } catch(_) { area.value = ''; }
+}
+
+async function saveProfile(){
+  const name = (document.getElementById('p_name').value || '').trim();
+  let buttons;
+  try { buttons = JSON.parse(document.getElementById('p_buttons').value || '[]'); }
+  catch(e) { alert('JSON invalide : ' + e.message); return; }
+  if (!Array.isArray(buttons)) { alert('Une liste de boutons est attendue'); return; }
+  const res = await fetch('/profiles/' + encodeURIComponent(name), {
+    method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ buttons })
+  });
+  const data = await res.json();
+  if (!data.ok) return profileError(data);
+  loadProfiles(name);
+}
+
+async function deleteProfile(){
+  const name = document.getElementById('p_select').value;
+  if (!name || !confirm(`Delete profile "${name}"?`)) return;
+  const data = await (await fetch('/profiles/' + encodeURIComponent(name), { method:'DELETE' })).json();
+  if (!data.ok) return profileError(data);
+  loadProfiles('');
+}
+
+async function saveProfileSwitch(){
+  const button = Number(document.getElementById('p_switch_button').value || 0);
+  const gesture = document.getElementById('p_switch_gesture').value;
+  const res = await fetch('/profiles', {
+    method: 'POST', headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ switch: button ? { button, gesture } : null })
+  });
+  const data = await res.json();
+  if (!data.ok) return profileError(data);
+  alert(button ? `Profil suivant : ${gesture} sur le bouton ${button}` : 'Geste de changement de profil retiré');
+}
+
+btnProfiles?.addEventListener('click', ()=>{
+  ensureProfilesPopin();
+  profilesBackdrop.setAttribute('aria-hidden','false');
+  loadProfiles(document.getElementById('p_select').value);
 });
 
 /* ========= Boot ========= */
@@ -0,0 +1,109 @@
+# leds.py — Motifs LED non bloquants (clignotements en file, avancés par tick())
+# Chaque LED a un niveau "de repos" (.value, comme un DigitalInOut) et une petite
+# file de motifs (n clignotements, pauses) qui passent devant ce niveau tant
+# qu'ils durent. Rien ne dort : la boucle principale (ou la boucle HTTP du mode
+# setup) appelle tick() à chaque tour.
+
+import time
+
+
+def _now_ms():
+    return time.monotonic_ns() // 1000000
+
+
+class LedChannel:
+    """Une LED : niveau de repos + file de motifs (n, on_ms, off_ms)."""
+
+    def __init__(self, io, max_patterns=4):
+        self._io = io
+        self._base = False
+        self._shown = None
+        self._queue = []
+        self._max = max_patterns
+        self._pattern = None  # motif en cours
+        self._phase = 0       # pair = allumée, impair = éteinte
+        self._until = 0
+        self._show(False)
+
+    def _show(self, on):
+        if on != self._shown:
+            self._io.value = on
+            self._shown = on
+
+    @property
+    def value(self):
+        return self._base
+
+    @value.setter
+    def value(self, on):
+        self._base = bool(on)
+        if self._pattern is None:
+            self._show(self._base)
+
+    @property
+    def busy(self):
+        return self._pattern is not None or bool(self._queue)
+
+    def blink(self, n, on_ms=200, off_ms=200):
+        """Met en file n clignotements ; ignoré si la file est pleine."""
+        if n > 0:
+            self._enqueue((n, on_ms, off_ms))
+
+    def pause(self, ms):
+        """Met en file une pause (LED éteinte) : enchaîner des motifs sur plusieurs LEDs."""
+        if ms > 0:
+            self._enqueue((0, 0, ms))
+
+    def _enqueue(self, pattern):
+        if len(self._queue) < self._max:
+            self._queue.append(pattern)
+
+    def clear(self):
+        self._queue = []
+        self._pattern = None
+        self._show(self._base)
+
+    def tick(self, now):
+        if self._pattern is None:
+            if not self._queue:
+                return
+            self._pattern = self._queue.pop(0)
+            n, on_ms, off_ms = self._pattern
+            self._phase = 0 if n else 1
+            self._until = now + (on_ms if n else off_ms)
+            self._show(bool(n))
+            return
+        while now >= self._until:
+            n, on_ms, off_ms = self._pattern
+            self._phase += 1
+            if self._phase >= 2 * n:
+                self._pattern = None
+                if self._queue:
+                    self.tick(now)  # motif suivant sans attendre un tour
+                else:
+                    self._show(self._base)
+                return
+            on = self._phase % 2 == 0
+            self._until += on_ms if on else off_ms
+            self._show(on)
+
+
+class LedPatterns:
+    """Ensemble des LEDs de la carte, avancées ensemble."""
+
+    def __init__(self):
+        self._channels = {}
+
+    def add(self, name, io, max_patterns=4):
+        channel = LedChannel(io, max_patterns)
+        self._channels[name] = channel
+        return channel
+
+    def __getitem__(self, name):
+        return self._channels[name]
+
+    def tick(self, now=None):
+        if now is None:
+            now = _now_ms()
+        for channel in self._channels.values():
+            channel.tick(now)
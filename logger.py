@@ -0,0 +1,111 @@
+# logger.py — Journal à niveaux, tamponné dans un anneau de taille fixe
+# Un appel de log ne fait que ranger (niveau, format, arguments) dans des
+# emplacements préalloués : ni formatage ni écriture sur le port série, si
+# bien qu'un appui de bouton n'attend jamais la console. Le texte n'est
+# produit qu'au vidage, `format % args` :
+#   - au repos : tick(now, active) vide quelques lignes par tour une fois la
+#     box inactive depuis IDLE_MS (pas de macro en cours, pas d'appui) ;
+#   - sur erreur : error() vide tout immédiatement ;
+#   - à la demande : flush().
+# Sans terminal (supervisor.runtime.serial_connected faux), rien n'est écrit :
+# les plus anciennes lignes sont écrasées et comptées comme perdues.
+# Compilé sans __debug__ (mpy-cross -O), debug() est une fonction vide et le
+# niveau par défaut passe à INFO. Les messages gardent leurs étiquettes
+# ([MACROS], [VAULT]…) comme les print() qu'ils remplacent.
+
+DEBUG = 10
+INFO = 20
+WARN = 30
+ERROR = 40
+
+SIZE = 64          # lignes gardées entre deux vidages
+IDLE_MS = 250      # inactivité avant de vider au repos
+IDLE_LINES = 2     # lignes par tour de boucle au repos
+
+level = DEBUG if __debug__ else INFO
+
+_formats = [None] * SIZE
+_args = [None] * SIZE
+_head = 0          # prochain emplacement écrit
+_count = 0
+_dropped = 0
+_quiet_at = 0      # instant (ms) à partir duquel le vidage au repos est permis
+
+try:
+    from supervisor import runtime as _runtime
+except ImportError:
+    _runtime = None
+
+
+def _connected():
+    return _runtime is None or _runtime.serial_connected
+
+
+def log(lvl, fmt, *args):
+    global _head, _count, _dropped
+    if lvl < level:
+        return
+    i = _head
+    _formats[i] = fmt
+    _args[i] = args
+    _head = (i + 1) % SIZE
+    if _count < SIZE:
+        _count += 1
+    else:
+        _dropped += 1
+
+
+if __debug__:
+    def debug(fmt, *args):
+        log(DEBUG, fmt, *args)
+else:
+    def debug(fmt, *args):
+        pass
+
+
+def info(fmt, *args):
+    log(INFO, fmt, *args)
+
+
+def warn(fmt, *args):
+    log(WARN, fmt, *args)
+
+
+def error(fmt, *args):
+    log(ERROR, fmt, *args)
+    flush()
+
+
+def pending():
+    return _count
+
+
+def flush(max_lines=None):
+    """Écrit les lignes en attente (au plus `max_lines`), les plus anciennes d'abord."""
+    global _count, _dropped
+    if not _connected():
+        return 0
+    if _dropped:
+        print(f"[LOG] {_dropped} ligne(s) perdue(s)")
+        _dropped = 0
+    n = _count if max_lines is None else min(max_lines, _count)
+    for _ in range(n):
+        i = (_head - _count) % SIZE
+        fmt, args = _formats[i], _args[i]
+        _formats[i] = _args[i] = None
+        _count -= 1
+        try:
+            text = fmt % args if args else fmt
+        except Exception as e:
+            text = f"{fmt} {args} ({e})"
+        print(text)
+    return n
+
+
+def tick(now, active=False):
+    """Vidage au repos ; `active` (macro en cours, appui traité) le repousse de IDLE_MS."""
+    global _quiet_at
+    if active:
+        _quiet_at = now + IDLE_MS
+    elif _count and now >= _quiet_at:
+        flush(IDLE_LINES)
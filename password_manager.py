@@ -1,14 +1,47 @@
 import os
 import aesio
-from binascii import hexlify, unhexlify
+from secret_store import SecretStore
+
+# Bloc connu dont le chiffré, dans l'en-tête du coffre, identifie la clé AES
+_KEY_CHECK = b"BiduleBox/keychk"
+
+
+def valid_utf8(buf):
+    """Contrôle UTF-8 sans créer de str (une mauvaise clé AES donne des octets aléatoires)."""
+    i, n = 0, len(buf)
+    while i < n:
+        b = buf[i]
+        if b < 0x80:
+            i += 1
+            continue
+        if 0xC2 <= b <= 0xDF:
+            extra = 1
+        elif 0xE0 <= b <= 0xEF:
+            extra = 2
+        elif 0xF0 <= b <= 0xF4:
+            extra = 3
+        else:
+            return False
+        if i + extra >= n:
+            return False
+        for j in range(i + 1, i + 1 + extra):
+            if buf[j] & 0xC0 != 0x80:
+                return False
+        i += 1 + extra
+    return True
+
 
 class PasswordManager:
-    def __init__(self, aes_key):
+    def __init__(self, aes_key, create_dir=True, keys_dir="/.keys"):
         self.aes_key = aes_key
         if len(self.aes_key) not in [16, 24, 32]:
             raise ValueError("La clé doit comporter 16, 24 ou 32 octets")
-        self.keys_dir = "/.keys"
-        self._create_keys_dir()
+        self.keys_dir = keys_dir
+        self._cipher = None
+        if create_dir:
+            self._create_keys_dir()
+        # Un seul fichier binaire ; les anciens <nom>.key y sont migrés au premier accès
+        self.store = SecretStore(f"{self.keys_dir}/secrets.bin", self.keys_dir)
 
     def _create_keys_dir(self):
         try:
@@ -18,42 +51,125 @@ class PasswordManager:
 
     def _pad_password(self, password):
         """
-        Ajoute des espaces à la fin du mot de passe pour garantir une longueur multiple de 16.
+        Ajoute des espaces à la fin du mot de passe (encodé UTF-8) pour garantir une longueur multiple de 16.
         """
-        padding_length = 16 - (len(password) % 16)
-        return password + ' ' * padding_length
+        data = password.encode('utf-8')
+        padding_length = 16 - (len(data) % 16)
+        return data + b' ' * padding_length
+
+    def _get_cipher(self):
+        # ECB : pas d'état entre blocs, une seule instance suffit
+        if self._cipher is None:
+            self._cipher = aesio.AES(self.aes_key, aesio.MODE_ECB)
+        return self._cipher
 
     def _encrypt_password(self, password):
-        cipher = aesio.AES(self.aes_key, aesio.MODE_ECB)
+        cipher = self._get_cipher()
         password_padded = self._pad_password(password)  # Padding du mot de passe
         encrypted = bytearray(len(password_padded))
-        cipher.encrypt_into(password_padded.encode('utf-8'), encrypted)
-        return hexlify(encrypted).decode('utf-8')
+        cipher.encrypt_into(password_padded, encrypted)
+        return encrypted
 
-    def _decrypt_password(self, encrypted_password):
-        cipher = aesio.AES(self.aes_key, aesio.MODE_ECB)
-        encrypted_bytes = unhexlify(encrypted_password)
+    def _decrypt_bytes(self, encrypted_bytes):
+        """Déchiffre vers un bytearray (padding d'espaces retiré), sans passer par str."""
         decrypted = bytearray(len(encrypted_bytes))
-        cipher.decrypt_into(encrypted_bytes, decrypted)
-        return decrypted.decode('utf-8').rstrip()  # Supprime les espaces ajoutés lors du padding
+        self._get_cipher().decrypt_into(encrypted_bytes, decrypted)
+        end = len(decrypted)
+        while end and decrypted[end - 1] in (0x20, 0x09, 0x0D, 0x0A):
+            end -= 1
+        if end == len(decrypted):
+            return decrypted
+        out = decrypted[:end]
+        for i in range(len(decrypted)):
+            decrypted[i] = 0
+        return out
+
+    def _decrypt_password(self, encrypted_password):
+        decrypted = self._decrypt_bytes(encrypted_password)
+        return decrypted.decode('utf-8')  # padding déjà retiré
+
+    def _key_check(self):
+        check = bytearray(16)
+        self._get_cipher().encrypt_into(_KEY_CHECK, check)
+        return check
+
+    def verify_key(self):
+        """True si la clé est celle du coffre (un seul bloc AES), False sinon ;
+        None si le coffre n'a pas (encore) de contrôle de clé."""
+        try:
+            check = self.store.key_check()
+        except OSError:
+            return None
+        if check is None:
+            return None
+        return self._key_check() == check
+
+    def _claim_key(self):
+        """Avant une écriture : refuse une clé autre que celle du coffre, pose le contrôle s'il manque."""
+        ok = self.verify_key()
+        if ok is False:
+            raise ValueError("clé AES différente de celle du coffre")
+        if ok is None:
+            # coffre d'avant le contrôle : un secret existant doit se déchiffrer avec cette clé
+            for name, secret in self.iter_passwords():
+                valid = valid_utf8(secret)
+                for i in range(len(secret)):
+                    secret[i] = 0
+                if not valid:
+                    raise ValueError("clé AES différente de celle du coffre")
+                break
+            self.store.set_check(self._key_check())
 
     def store_password(self, service_name, password):
-        encrypted_password = self._encrypt_password(password)
-        with open(f"{self.keys_dir}/{service_name}.key", "w",encoding='utf-8') as key_file:
-            key_file.write(encrypted_password)
+        ciphertext = self._encrypt_password(password)
+        self._claim_key()
+        self.store.write(service_name, ciphertext)
+
+    def store_passwords(self, items):
+        """Chiffre et écrit plusieurs (nom, secret) en un seul ajout au coffre.
+
+        Les entrées invalides sont écartées une à une, les autres écrites
+        ensemble ; retourne [(nom, erreur ou None)] dans l'ordre reçu.
+        """
+        self._claim_key()
+        results = []
+        batch = []
+        for service_name, password in items:
+            try:
+                if not 0 < len(service_name.encode('utf-8')) < 256:
+                    raise ValueError("nom de 1 à 255 octets")
+                batch.append((service_name, self._encrypt_password(password)))
+                results.append((service_name, None))
+            except Exception as e:
+                results.append((service_name, str(e)))
+        self.store.write_many(batch)
+        return results
 
     def load_password(self, service_name):
         try:
-            with open(f"{self.keys_dir}/{service_name}.key", "r",encoding='utf-8') as key_file:
-                encrypted_password = key_file.read()
-                return self._decrypt_password(encrypted_password)
+            encrypted_password = self.store.read(service_name)
         except OSError:
             return None
+        if encrypted_password is None:
+            return None
+        return self._decrypt_password(encrypted_password)
+
+    def list_names(self):
+        """Noms des secrets stockés."""
+        try:
+            return self.store.names()
+        except OSError:
+            return []
+
+    def iter_passwords(self):
+        """Génère (nom, secret en bytearray) pour chaque secret : une lecture, un chiffreur AES."""
+        for name, encrypted_password in self.store.read_all():
+            yield name, self._decrypt_bytes(encrypted_password)
 
     def delete_password(self, service_name):
         try:
-            os.remove(f"{self.keys_dir}/{service_name}.key")
+            self.store.delete(service_name)
         except OSError:
-            pass  # Gérer l'erreur si le fichier n'existe pas
+            pass  # FS en lecture seule
 
 
@@ -0,0 +1,303 @@
+# scanner.py — Scan des boutons par file d'événements (appui / relâchement horodatés)
+# Deux backends, même interface :
+#   - KeypadScanner  : keypad.Keys et/ou keypad.KeyMatrix (scan en tâche de fond par
+#                      CircuitPython : coût constant par tour, quel que soit le nombre de touches)
+#   - PollingScanner : lecture Python d'objets exposant .value (DigitalInOut, simulateur…)
+# L'anti-rebond (fenêtre par bouton) est appliqué au-dessus des deux backends.
+
+import time
+
+try:
+    from supervisor import ticks_ms
+except ImportError:
+    ticks_ms = None
+
+_TICKS_PERIOD = 1 << 29  # supervisor.ticks_ms() reboucle à 2**29 ms
+
+
+def now_ms():
+    """Horloge commune des événements (ms, monotone, sans rebouclage)."""
+    return time.monotonic_ns() // 1000000
+
+
+class Event:
+    """Événement bouton : index du bouton, appui ou relâchement, horodatage (ms)."""
+
+    def __init__(self, key_number=0, pressed=False, timestamp=0):
+        self.key_number = key_number
+        self.pressed = pressed
+        self.timestamp = timestamp
+
+    @property
+    def released(self):
+        return not self.pressed
+
+    def __repr__(self):
+        kind = "pressed" if self.pressed else "released"
+        return f"<Event: key_number {self.key_number} {kind} @{self.timestamp}ms>"
+
+
+class EventQueue:
+    """File circulaire préallouée. Si elle est pleine, l'événement est perdu (overflowed)."""
+
+    def __init__(self, max_events=64):
+        self._size = max_events
+        self._keys = bytearray(max_events)
+        self._pressed = bytearray(max_events)
+        self._stamps = [0] * max_events
+        self._head = 0
+        self._count = 0
+        self.overflowed = False
+
+    def __len__(self):
+        return self._count
+
+    def __bool__(self):
+        return self._count > 0
+
+    def append(self, key_number, pressed, timestamp):
+        if self._count >= self._size:
+            self.overflowed = True
+            return False
+        i = (self._head + self._count) % self._size
+        self._keys[i] = key_number
+        self._pressed[i] = 1 if pressed else 0
+        self._stamps[i] = timestamp
+        self._count += 1
+        return True
+
+    def get_into(self, event):
+        """Remplit `event` avec le plus ancien événement ; False si la file est vide."""
+        if not self._count:
+            return False
+        i = self._head
+        event.key_number = self._keys[i]
+        event.pressed = bool(self._pressed[i])
+        event.timestamp = self._stamps[i]
+        self._head = (i + 1) % self._size
+        self._count -= 1
+        return True
+
+    def get(self):
+        event = Event()
+        return event if self.get_into(event) else None
+
+    def clear(self):
+        self._head = 0
+        self._count = 0
+        self.overflowed = False
+
+
+class _Scanner:
+    """Base commune : état anti-rebond par bouton + file d'événements."""
+
+    def __init__(self, key_count, debounce_ms=20, max_events=64):
+        if isinstance(debounce_ms, int):
+            debounce_ms = [debounce_ms] * key_count
+        if len(debounce_ms) != key_count:
+            raise ValueError("debounce_ms: une valeur par bouton attendue")
+        self.key_count = key_count
+        self.events = EventQueue(max_events)
+        self._windows = [max(0, int(d)) for d in debounce_ms]
+        self._state = bytearray(key_count)  # état publié (après anti-rebond)
+        self._raw = bytearray(key_count)    # dernier état brut vu
+        self._until = [0] * key_count       # fin de la fenêtre d'anti-rebond
+        self._pending = 0                   # nb de boutons avec brut != publié
+
+    def _feed(self, key, pressed, ts):
+        """Front brut : publié tout de suite, sauf pendant la fenêtre du dernier front publié."""
+        pressed = 1 if pressed else 0
+        if self._raw[key] == pressed:
+            return
+        self._raw[key] = pressed
+        if self._state[key] == pressed:
+            self._pending -= 1           # rebond revenu à l'état publié
+        elif ts >= self._until[key]:
+            self._publish(key, pressed, ts)
+        else:
+            self._pending += 1           # tranché à l'expiration de la fenêtre
+
+    def _publish(self, key, pressed, ts):
+        self._state[key] = pressed
+        self._until[key] = ts + self._windows[key]
+        self.events.append(key, pressed, ts)
+
+    def _settle(self, now):
+        """Publie les états bruts stables dont la fenêtre a expiré."""
+        if not self._pending:
+            return
+        for key in range(self.key_count):
+            raw = self._raw[key]
+            if raw != self._state[key] and now >= self._until[key]:
+                self._pending -= 1
+                self._publish(key, raw, self._until[key])
+
+    def is_pressed(self, key):
+        return bool(self._state[key])
+
+    def update(self, now=None):
+        raise NotImplementedError
+
+    def reset(self):
+        """Oublie les événements en attente (les boutons déjà tenus restent 'pressés')."""
+        self.events.clear()
+
+    def deinit(self):
+        pass
+
+
+class PollingScanner(_Scanner):
+    """Backend pur Python : échantillonne `.value` de chaque entrée à chaque update()."""
+
+    def __init__(self, pins, debounce_ms=20, value_when_pressed=False, max_events=64):
+        super().__init__(len(pins), debounce_ms, max_events)
+        self._pins = list(pins)
+        self._active = value_when_pressed
+
+    def update(self, now=None):
+        if now is None:
+            now = now_ms()
+        active = self._active
+        for key, pin in enumerate(self._pins):
+            self._feed(key, pin.value == active, now)
+        self._settle(now)
+
+
+class KeypadScanner(_Scanner):
+    """Backend keypad : le scan matériel tourne en fond, on ne fait que vider ses files.
+
+    `keys[i]` est la broche du bouton i (keypad.Keys), ou sa position (rang,
+    colonne) dans `matrix` = (broches rangs, broches colonnes,
+    columns_to_anodes, diodes) (keypad.KeyMatrix). Les deux peuvent coexister.
+    Une matrice sans diodes passe par un filtre anti-fantômes (voir _matrix_event).
+    """
+
+    def __init__(self, keys, debounce_ms=20, value_when_pressed=False, pull=True,
+                 interval=0.005, max_events=64, matrix=None):
+        import keypad
+
+        super().__init__(len(keys), debounce_ms, max_events)
+        self._kev = keypad.Event()
+        self._sources = []  # (objet keypad, numéro keypad -> indice bouton ou None, matrice ?)
+        self.ghosts = 0     # appuis écartés comme fantômes (matrice sans diodes)
+        direct = [i for i, k in enumerate(keys) if not isinstance(k, tuple)]
+        cells = [i for i, k in enumerate(keys) if isinstance(k, tuple)]
+        if direct:
+            pins = [keys[i] for i in direct]
+            self._sources.append((keypad.Keys(pins, value_when_pressed=value_when_pressed, pull=pull,
+                                              interval=interval, max_events=max_events), direct, False))
+        self._cols = 0
+        self._cells = None   # état brut de chaque case de la matrice (filtre anti-fantômes)
+        self._suspect = None  # cases tenues mais écartées comme fantômes
+        self._released = None  # instant du dernier relâchement à examiner (suspects)
+        if cells:
+            rows, cols, columns_to_anodes, diodes = matrix
+            self._cols = len(cols)
+            key_map = [None] * (len(rows) * len(cols))
+            for i in cells:
+                row, col = keys[i]
+                key_map[row * self._cols + col] = i
+            km = keypad.KeyMatrix(rows, cols, columns_to_anodes=columns_to_anodes,
+                                  interval=interval, max_events=max_events)
+            self._sources.append((km, key_map, not diodes))
+            if not diodes:
+                self._cells = bytearray(len(key_map))
+                self._suspect = bytearray(len(key_map))
+
+    def update(self, now=None):
+        if now is None:
+            now = now_ms()
+        kev = self._kev
+        for keys, key_map, ghosting in self._sources:
+            events = keys.events
+            while events.get_into(kev):
+                # timestamp keypad = supervisor.ticks_ms() → ramené sur l'horloge commune
+                age = (ticks_ms() - kev.timestamp) % _TICKS_PERIOD if ticks_ms else 0
+                if ghosting:
+                    self._matrix_event(key_map, kev.key_number, kev.pressed, now - age)
+                else:
+                    key = key_map[kev.key_number]
+                    if key is not None:
+                        self._feed(key, kev.pressed, now - age)
+            if ghosting and self._released is not None:
+                self._confirm(key_map)
+            if events.overflowed:
+                self.events.overflowed = True
+                events.overflowed = False
+        self._settle(now)
+
+    # ---------- Matrice sans diodes ----------
+    # Trois touches aux coins d'un rectangle (r,c2) (r2,c) (r2,c2) font lire la
+    # quatrième (r,c) comme appuyée. Un appui qui complète un tel rectangle est
+    # donc tenu à l'écart ; s'il est toujours là quand le rectangle se défait
+    # (file vidée), c'était un vrai appui et il est publié à ce moment.
+    def _rectangle(self, cell):
+        cells, cols = self._cells, self._cols
+        row, col = divmod(cell, cols)
+        for c2 in range(cols):
+            if c2 == col or not cells[row * cols + c2] or self._suspect[row * cols + c2]:
+                continue
+            for r2 in range(len(cells) // cols):
+                if (r2 != row and cells[r2 * cols + col] and cells[r2 * cols + c2]
+                        and not self._suspect[r2 * cols + col] and not self._suspect[r2 * cols + c2]):
+                    return True
+        return False
+
+    def _matrix_event(self, key_map, cell, pressed, ts):
+        self._cells[cell] = 1 if pressed else 0
+        if pressed:
+            if self._rectangle(cell):
+                self._suspect[cell] = 1
+                self.ghosts += 1
+                return
+        elif self._suspect[cell]:
+            self._suspect[cell] = 0  # fantôme disparu : rien n'avait été publié
+            return
+        key = key_map[cell]
+        if key is not None:
+            self._feed(key, pressed, ts)
+        if not pressed and any(self._suspect):
+            self._released = ts  # suspects revus une fois la file vidée (voir _confirm)
+
+    def _confirm(self, key_map):
+        """Publie les suspects dont le rectangle s'est défait. Appelé après la file entière :
+        les relâchements d'un même scan (vraie touche et fantôme) sont vus ensemble."""
+        ts, self._released = self._released, None
+        for cell in range(len(self._suspect)):
+            if self._suspect[cell] and not self._rectangle(cell):
+                self._suspect[cell] = 0
+                key = key_map[cell]
+                if key is not None:
+                    self._feed(key, True, ts)
+
+    def reset(self):
+        super().reset()
+        for keys, _, _ in self._sources:
+            keys.events.clear()
+
+    def deinit(self):
+        for keys, _, _ in self._sources:
+            keys.deinit()
+
+
+def make_scanner(keys, debounce_ms=20, value_when_pressed=False, pull=True, matrix=None):
+    """keypad si disponible, sinon DigitalInOut scannés en Python (boutons directs seulement).
+
+    `keys[i]` : broche du bouton i, ou (rang, colonne) dans `matrix` (voir KeypadScanner).
+    """
+    try:
+        return KeypadScanner(keys, debounce_ms, value_when_pressed, pull, matrix=matrix)
+    except ImportError:
+        if any(isinstance(k, tuple) for k in keys):
+            raise
+
+    import digitalio
+
+    ios = []
+    for pin in keys:
+        io = digitalio.DigitalInOut(pin)
+        io.direction = digitalio.Direction.INPUT
+        if pull:
+            io.pull = digitalio.Pull.DOWN if value_when_pressed else digitalio.Pull.UP
+        ios.append(io)
+    return PollingScanner(ios, debounce_ms, value_when_pressed)
@@ -0,0 +1,288 @@
+# secret_store.py — Stockage des secrets chiffrés dans un seul fichier binaire
+#
+#   en-tête : magic "BBKS" | u8 version | u8 flags | u16 nb | u32 data_offset | u32 journal_offset
+#             | 16 octets de contrôle de la clé AES (version 2, valide si flags & 1)
+#   index   : nb × (u8 len | nom | u32 offset | u16 longueur)       → nom → chiffré
+#   données : chiffrés AES bruts (plus de hexlify : 2× moins de flash)
+#   journal : ajouts depuis le dernier compactage,
+#             (u8 len | nom | u16 longueur | chiffré), longueur 0 = suppression
+#
+# Les écritures ne font qu'ajouter au journal ; compact() réécrit un fichier
+# propre (fichier .tmp puis échange). Une fin de journal tronquée (coupure
+# pendant un ajout) est ignorée à la lecture et effacée par un compactage
+# avant l'ajout suivant. Au premier accès, les anciens fichiers
+# /.keys/<nom>.key (hex) sont migrés une fois dans le nouveau fichier.
+# Le contrôle de clé (un bloc connu chiffré, voir PasswordManager) est opaque
+# ici ; un coffre version 1 est lu tel quel et passe en version 2 au
+# compactage suivant.
+
+import os
+import struct
+from binascii import unhexlify
+
+MAGIC = b"BBKS"
+VERSION = 2
+_HEADER = "<4sBBHII"
+_HEADER_SIZE = 16
+_CHECK_SIZE = 16    # contrôle de clé, après l'en-tête (version 2)
+_FLAG_CHECK = 0x01
+_ENTRY = "<IH"      # offset, longueur (après u8 len + nom)
+_ENTRY_SIZE = 6
+_DELETED = 0
+_COMPACT_MIN_DEAD = 512  # octets morts avant compactage automatique
+
+
+def _exists(path):
+    try:
+        os.stat(path)
+        return True
+    except OSError:
+        return False
+
+
+class SecretStore:
+    """Secrets chiffrés (bytes opaques) indexés par nom, dans un seul fichier."""
+
+    def __init__(self, path="/.keys/secrets.bin", legacy_dir="/.keys"):
+        self.path = path
+        self.legacy_dir = legacy_dir
+        self._index = None    # nom -> (offset, longueur)
+        self._legacy = None   # nom -> chiffré, si la migration n'a pas pu écrire (FS en lecture seule)
+        self._journal_end = 0
+        self._torn = False    # fin de journal tronquée après _journal_end (voir _append)
+        self._dead = 0
+        self.check = None     # contrôle de clé (16 octets) ou None
+
+    # ---------- Lecture ----------
+    def _load(self):
+        self._index = {}
+        self._legacy = None
+        self._torn = False
+        self._dead = 0
+        self.check = None
+        if not _exists(self.path):
+            tmp = self.path + ".tmp"
+            if _exists(tmp):
+                # coupure entre remove() et rename() d'un compactage : le .tmp est complet
+                try:
+                    os.rename(tmp, self.path)
+                except OSError:
+                    self.path = tmp
+            else:
+                self._migrate()
+                return
+        with open(self.path, "rb") as f:
+            magic, version, flags, count, data_offset, journal_offset = struct.unpack(
+                _HEADER, f.read(_HEADER_SIZE))
+            if magic != MAGIC or version > VERSION:
+                raise ValueError(f"{self.path}: format de coffre inconnu")
+            start = _HEADER_SIZE
+            if version >= 2:
+                check = f.read(_CHECK_SIZE)
+                if flags & _FLAG_CHECK:
+                    self.check = check
+                start += _CHECK_SIZE
+            index = f.read(data_offset - start)
+            f.seek(journal_offset)
+            journal = f.read()
+        pos = 0
+        for _ in range(count):
+            n = index[pos]
+            name = index[pos + 1:pos + 1 + n].decode("utf-8")
+            self._index[name] = struct.unpack_from(_ENTRY, index, pos + 1 + n)
+            pos += 1 + n + _ENTRY_SIZE
+        pos, end = 0, len(journal)
+        while pos < end:
+            n = journal[pos]
+            head = pos + 1 + n + 2
+            if head > end:
+                break  # entrée tronquée (coupure pendant un ajout) : ignorée
+            name = journal[pos + 1:pos + 1 + n].decode("utf-8")
+            (length,) = struct.unpack_from("<H", journal, pos + 1 + n)
+            if head + length > end:
+                break
+            self._forget(name)
+            if length != _DELETED:
+                self._index[name] = (journal_offset + head, length)
+            pos = head + length
+        self._journal_end = journal_offset + pos
+        self._torn = pos < end
+
+    def _ensure_loaded(self):
+        if self._index is None:
+            self._load()
+
+    def _forget(self, name):
+        old = self._index.pop(name, None)
+        if old is not None:
+            self._dead += old[1]
+
+    def key_check(self):
+        """Contrôle de clé du coffre (16 octets), ou None s'il n'en a pas encore."""
+        self._ensure_loaded()
+        return self.check
+
+    def names(self):
+        self._ensure_loaded()
+        if self._legacy is not None:
+            return list(self._legacy)
+        return list(self._index)
+
+    def __contains__(self, name):
+        self._ensure_loaded()
+        if self._legacy is not None:
+            return name in self._legacy
+        return name in self._index
+
+    def read(self, name):
+        """Chiffré de `name` (bytes) ou None : un seek + une lecture."""
+        self._ensure_loaded()
+        if self._legacy is not None:
+            return self._legacy.get(name)
+        entry = self._index.get(name)
+        if entry is None:
+            return None
+        with open(self.path, "rb") as f:
+            f.seek(entry[0])
+            return f.read(entry[1])
+
+    def read_all(self):
+        """Génère (nom, chiffré) pour tous les secrets, en une seule lecture séquentielle."""
+        self._ensure_loaded()
+        if self._legacy is not None:
+            for item in self._legacy.items():
+                yield item
+            return
+        if not self._index:
+            return
+        with open(self.path, "rb") as f:
+            data = f.read()
+        for name, (offset, length) in self._index.items():
+            yield name, data[offset:offset + length]
+
+    # ---------- Écriture ----------
+    def _append(self, entries):
+        """Ajoute des entrées (nom, chiffré | None) au journal, en une seule écriture."""
+        self._ensure_loaded()
+        if self._legacy is not None:
+            self._commit_migration(self._legacy)
+        elif self._torn or not _exists(self.path):
+            # ajout en "ab" : il irait après la fin tronquée, loin de _journal_end
+            self.compact()
+        buf = bytearray()
+        offsets = []
+        for name, ct in entries:
+            raw = name.encode("utf-8")
+            if not 0 < len(raw) < 256:
+                raise ValueError(f"nom de secret invalide: {name!r}")
+            ct = ct or b""
+            if len(ct) > 0xFFFF:
+                raise ValueError(f"secret trop long: {name!r}")
+            buf.append(len(raw))
+            buf.extend(raw)
+            buf.extend(struct.pack("<H", len(ct)))
+            offsets.append((name, self._journal_end + len(buf), len(ct)))
+            buf.extend(ct)
+        with open(self.path, "ab") as f:
+            f.write(buf)
+        self._journal_end += len(buf)
+        for name, offset, length in offsets:
+            self._forget(name)
+            if length != _DELETED:
+                self._index[name] = (offset, length)
+        if self._dead > _COMPACT_MIN_DEAD and self._dead > self._journal_end // 2:
+            self.compact()
+
+    def write(self, name, ciphertext):
+        if not ciphertext:
+            raise ValueError("chiffré vide")
+        self._append(((name, ciphertext),))
+
+    def write_many(self, items):
+        """Écrit plusieurs (nom, chiffré) en un seul ajout au fichier."""
+        items = list(items)
+        for _, ct in items:
+            if not ct:
+                raise ValueError("chiffré vide")
+        if items:
+            self._append(items)
+
+    def set_check(self, check):
+        """Enregistre le contrôle de clé dans l'en-tête (par un compactage)."""
+        if len(check) != _CHECK_SIZE:
+            raise ValueError("contrôle de clé: 16 octets attendus")
+        self._ensure_loaded()
+        self.check = bytes(check)
+        self.compact()
+
+    def delete(self, name):
+        if name in self:
+            self._append(((name, None),))
+
+    def compact(self):
+        """Réécrit un fichier sans journal ni entrées mortes (écriture .tmp puis échange)."""
+        records = list(self.read_all())
+        head = bytearray(_HEADER_SIZE)
+        head.extend(self.check or bytes(_CHECK_SIZE))
+        offsets = []
+        data_offset = _HEADER_SIZE + _CHECK_SIZE + sum(1 + len(n.encode("utf-8")) + _ENTRY_SIZE for n, _ in records)
+        offset = data_offset
+        for name, ct in records:
+            raw = name.encode("utf-8")
+            head.append(len(raw))
+            head.extend(raw)
+            head.extend(struct.pack(_ENTRY, offset, len(ct)))
+            offsets.append((name, offset, len(ct)))
+            offset += len(ct)
+        flags = _FLAG_CHECK if self.check else 0
+        struct.pack_into(_HEADER, head, 0, MAGIC, VERSION, flags, len(records), data_offset, offset)
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(head)
+            for _, ct in records:
+                f.write(ct)
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+        os.rename(tmp, self.path)
+        self._index = {name: (o, ln) for name, o, ln in offsets}
+        self._legacy = None
+        self._journal_end = offset
+        self._torn = False
+        self._dead = 0
+
+    # ---------- Migration des anciens .key ----------
+    def _legacy_files(self):
+        try:
+            files = os.listdir(self.legacy_dir)
+        except OSError:
+            return []
+        return [fn for fn in files if fn.endswith(".key")]
+
+    def _migrate(self):
+        legacy = {}
+        for fn in self._legacy_files():
+            try:
+                with open(self.legacy_dir + "/" + fn, "r") as f:
+                    legacy[fn[:-4]] = unhexlify(f.read().strip())
+            except (OSError, ValueError) as e:
+                print(f"[KEYS] {fn} illisible: {e}")
+        if not legacy:
+            return
+        try:
+            self._commit_migration(legacy)
+        except OSError:
+            # FS en lecture seule (mode normal) : on sert les .key depuis la RAM
+            self._index = {}
+            self._legacy = legacy
+
+    def _commit_migration(self, legacy):
+        self._legacy = legacy
+        self.compact()
+        for name in legacy:
+            try:
+                os.remove(f"{self.legacy_dir}/{name}.key")
+            except OSError:
+                pass
+        print(f"[KEYS] migration: {len(legacy)} secret(s) → {self.path}")
@@ -3,10 +3,18 @@
 
 import sys, os, json, time, supervisor, gc
 import storage
+import logger
 from password_manager import PasswordManager
+from executor import typing_profile
+from config_compiler import (PHYSICAL_FIELDS, matrix_from_json, profile_files, profile_names,
+                             profile_switch_from_json, valid_profile_name)
+from gestures import CHORD_MS, DOUBLE_MS, HOLD_MS
 
 SSID = "BiduleBox"
 PASS = "Bidule1234"
+COMMANDS = "/commands.json"
+COMMANDS_BACK = "/commands.back"
+PROFILES_DIR = "/profiles"
 
 # ---------- FS helpers ----------
 def ensure_rw():
@@ -28,10 +36,8 @@ def _read_json(path, default):
     except Exception:
         return default
 
-def _write_json(path, obj):
-    ensure_rw()
-    with open(path, "w") as f:
-        json.dump(obj, f)
+def _write_json(path, obj, back=None):
+    _commit_text(path, json.dumps(obj), back)
 
 def _read_text(path):
     try:
@@ -41,9 +47,68 @@ def _read_text(path):
         return ""
 
 def _write_text(path, s):
+    _commit_text(path, s)
+
+def _commit_text(path, s, back=None):
+    """Écriture atomique : <path>.tmp complet puis échange (l'ancien devient `back`).
+
+    FAT : rename() n'écrase pas, d'où remove() avant. À tout instant, path ou
+    path.tmp contient une version complète ; _recover() termine l'échange.
+    """
     ensure_rw()
-    with open(path, "w") as f:
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
         f.write(s)
+    if back:
+        try:
+            os.remove(back)
+        except OSError:
+            pass
+        try:
+            os.rename(path, back)
+        except OSError:
+            pass
+    else:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    os.rename(tmp, path)
+
+def _recover(path, back=None):
+    """Coupure au milieu d'un _commit_text() : remet path.tmp (ou `back`) en place."""
+    if _exists(path):
+        return
+    for cand in (path + ".tmp", back):
+        if cand and _exists(cand):
+            try:
+                if path.endswith(".json"):
+                    with open(cand, "r") as f:
+                        json.load(f)  # .tmp tronqué → on passe au suivant
+                ensure_rw()
+                os.rename(cand, path)
+                print(f"[SETUP] {path} restauré depuis {cand}")
+                return
+            except Exception as e:
+                print(f"[SETUP] {cand} inutilisable: {e}")
+
+def _rebuild_cache():
+    """Recompile config.bin (boutons + macros) ; en cas d'échec code.py relit le JSON."""
+    try:
+        import config_cache
+        ensure_rw()
+        n, size = config_cache.rebuild()
+        print(f"[SETUP] config.bin: boutons + {n} macro(s), {size} octets")
+    except Exception as e:
+        print(f"[SETUP] config.bin non écrit: {e}")
+    logger.flush()  # messages de compilation des macros
+
+def _typing_profile(value):
+    """"", "turbo", "safe" ou "custom:<µs>" ; ValueError sinon (bouton rejeté)."""
+    value = str(value or "").strip().lower()
+    typing_profile(value)
+    return value
+
 
 def _validate_buttons(btns):
     out, seen = [], set()
@@ -53,10 +118,17 @@ def _validate_buttons(btns):
             if bid <= 0 or bid in seen:
                 continue
             seen.add(bid)
-            pin = str(b.get("pin", b.get("pin_name", "GP11"))).upper()
-            if not pin.startswith("GP"):
-                continue
-            out.append({
+            row, col = b.get("row"), b.get("col")
+            if row in (None, "", -1) and col in (None, "", -1):
+                row = col = None  # bouton direct
+                pin = str(b.get("pin", b.get("pin_name", "GP11"))).upper()
+                if not pin.startswith("GP"):
+                    continue
+            else:
+                row, col, pin = int(row), int(col), ""  # case de la matrice
+                if row < 0 or col < 0:
+                    continue
+            btn = {
                 "id": bid,
                 "couleur": str(b.get("couleur", b.get("color", ""))),
                 "pin": pin,
@@ -66,13 +138,164 @@ def _validate_buttons(btns):
                 "pass_key": str(b.get("pass_key", "")),
                 "winsearch": bool(b.get("winsearch", True)),
                 "delay_ms": int(b.get("delay_ms", 1000)),
-            })
+                "debounce_ms": int(b.get("debounce_ms", 20)),
+                "cancel": bool(b.get("cancel", False)),
+                "typing_profile": _typing_profile(b.get("typing_profile", "")),
+                "wait_for_host": bool(b.get("wait_for_host", False)),
+                "double": str(b.get("double", "")).strip(),
+                "hold": str(b.get("hold", "")).strip(),
+                "chord": str(b.get("chord", "")).strip(),
+                "chord_with": int(b.get("chord_with") or 0),
+                "double_ms": int(b.get("double_ms", DOUBLE_MS)),
+                "hold_ms": int(b.get("hold_ms", HOLD_MS)),
+                "chord_ms": int(b.get("chord_ms", CHORD_MS)),
+            }
+            if row is not None:
+                btn["row"], btn["col"] = row, col
+            out.append(btn)
+        except Exception:
+            continue
+    return out
+
+
+def _merge_patches(btns, patches):
+    """Applique les patches (champs partiels + id) à une copie de `btns`.
+
+    Retourne (boutons, ids modifiés, {id: erreur}, ids inconnus). Créer un
+    bouton demande sa broche ("pin") ou sa case ("row"/"col") : sans, l'id
+    est inconnu (404).
+    """
+    btns = list(btns)
+    index = {}
+    for i, b in enumerate(btns):
+        try:
+            index[int(b.get("id", 0))] = i
+        except Exception:
+            pass
+    changed, errors, unknown = [], {}, []
+    for patch in patches:
+        try:
+            bid = int(patch.get("id", 0))
         except Exception:
+            bid = 0
+        if bid <= 0:
+            errors[str(patch.get("id"))] = "id invalide"
+            continue
+        i = index.get(bid)
+        if i is None and not (patch.get("pin") or patch.get("pin_name")
+                              or patch.get("row") not in (None, "", -1)):
+            errors[str(bid)] = "bouton inconnu (pin ou row/col requis pour le créer)"
+            unknown.append(bid)
+            continue
+        merged = dict(btns[i]) if i is not None else {}
+        merged.update(patch)
+        # l'UI envoie color/pin : ils priment sur couleur/pin_name déjà stockés
+        if "color" in patch and "couleur" not in patch:
+            merged["couleur"] = patch["color"]
+        if "pin_name" in patch and "pin" not in patch:
+            merged["pin"] = patch["pin_name"]
+        if patch.get("pin") or patch.get("pin_name"):
+            if "row" not in patch:  # passage sur une broche directe
+                merged.pop("row", None)
+                merged.pop("col", None)
+        try:
+            merged["typing_profile"] = _typing_profile(merged.get("typing_profile", ""))
+        except ValueError as e:
+            errors[str(bid)] = str(e)
+            continue
+        valid = _validate_buttons([merged])
+        if not valid:
+            errors[str(bid)] = "bouton invalide"
+            continue
+        if i is None:
+            index[bid] = len(btns)
+            btns.append(valid[0])
+        elif valid[0] != btns[i]:
+            btns[i] = valid[0]
+        else:
+            continue  # inchangé : pas d'écriture
+        changed.append(bid)
+    return btns, changed, errors, unknown
+
+
+def _slot(b):
+    if b.get("row") not in (None, "", -1):
+        return (int(b["row"]), int(b["col"]))
+    return str(b.get("pin", b.get("pin_name", ""))).upper()
+
+
+def _slot_errors(btns, matrix, ids=None):
+    """{id: erreur} des boutons (parmi `ids`, tous si None) dont la broche ou la
+    case de matrice est aussi celle d'un autre bouton ou une broche de la matrice."""
+    owners = {}
+    for p in (matrix or {}).get("rows", []) + (matrix or {}).get("cols", []):
+        owners.setdefault(str(p).upper(), []).append("matrix")
+    for b in btns:
+        owners.setdefault(_slot(b), []).append(f"bouton {b.get('id')}")
+    errors = {}
+    for b in btns:
+        if ids is not None and b.get("id") not in ids:
             continue
+        slot = _slot(b)
+        others = [o for o in owners[slot] if o != f"bouton {b.get('id')}"]
+        if others:
+            errors[str(b.get("id"))] = f"{slot} déjà utilisé ({', '.join(others)})"
+    return errors
+
+
+def _commands(btns, raw):
+    """Contenu de commands.json : les boutons, plus "matrix" et "profile_switch" de `raw` s'ils sont définis."""
+    out = {"buttons": btns}
+    for key in ("matrix", "profile_switch"):
+        if raw.get(key):
+            out[key] = raw[key]
     return out
 
 
-def run(blink_ok=None, blink_ko=None, led=None, led_red=None):
+def _switch(value):
+    """"profile_switch" validé ({"button", "gesture"}), ou None."""
+    sw = profile_switch_from_json({"profile_switch": value})
+    return {"button": sw[0], "gesture": sw[1]} if sw else None
+
+
+def _validate_profile(entries, base):
+    """Redéfinitions d'un profil, chacune validée fusionnée avec le bouton de
+    commands.json ; retourne (redéfinitions, {id: erreur})."""
+    raw = {}
+    for b in base:
+        try:
+            raw.setdefault(int(b.get("id", 0)), b)
+        except Exception:
+            pass
+    out, errors = [], {}
+    for entry in entries:
+        try:
+            bid = int(entry.get("id", 0))
+        except Exception:
+            bid = 0
+        if bid not in raw:
+            errors[str(entry.get("id"))] = "bouton absent de commands.json"
+            continue
+        patch = {k: v for k, v in entry.items() if k not in PHYSICAL_FIELDS}
+        if "color" in patch:
+            patch["couleur"] = patch.pop("color")
+        merged = dict(raw[bid])
+        merged.update(patch)
+        try:
+            merged["typing_profile"] = _typing_profile(merged.get("typing_profile", ""))
+        except ValueError as e:
+            errors[str(bid)] = str(e)
+            continue
+        valid = _validate_buttons([merged])
+        if not valid:
+            errors[str(bid)] = "bouton invalide"
+            continue
+        out.append({k: valid[0][k] for k in patch if k in valid[0]})
+    return out, errors
+
+
+def run(blink_ok=None, blink_ko=None, led=None, led_red=None, tick=None):
+    # blink_ok / blink_ko ne font que mettre un motif en file : tick() les joue depuis la boucle poll
     def _ok(n):
         if blink_ok: blink_ok(n)
     def _ko(n):
@@ -82,10 +305,22 @@ def run(blink_ok=None, blink_ko=None, led=None, led_red=None):
         print("[SETUP] Pas de /setup → sortie.")
         return
 
+    # Termine un échange interrompu par une coupure (voir _commit_text)
+    _recover(COMMANDS, COMMANDS_BACK)
+    _recover("/aes.key")
+    for name in profile_names(PROFILES_DIR):
+        _recover(*profile_files(name, PROFILES_DIR))
+    # macros/ ou commands.json modifiés par le lecteur USB depuis la dernière image
+    import config_cache
+    if config_cache.load() is None:
+        _rebuild_cache()
+
     # Import réseau/HTTP uniquement en mode setup
     import wifi
     import socketpool
-    from adafruit_httpserver import Server, Request, Response, JSONResponse, FileResponse, GET, POST
+    from adafruit_httpserver import (Server, Request, Response, JSONResponse, FileResponse,
+                                     GET, POST, PATCH, DELETE, OK_200, BAD_REQUEST_400,
+                                     NOT_FOUND_404)
 
     print("[SETUP] Démarrage AP…")
     wifi.radio.start_ap(SSID, PASS)
@@ -101,12 +336,43 @@ def run(blink_ok=None, blink_ko=None, led=None, led_red=None):
     # Sécurisé: ne sert que /html
     server = Server(pool, root_path="/html")  # DO NOT expose publicly
 
+    # ---------- Fichiers statiques (précompressés par tools/build_html.py) ----------
+    # manifest.json : chemin → {size, mime, etag, gzip}. Une seule route "/...."
+    # résout chaque requête dans ce dictionnaire : rien n'est parcouru au boot
+    # et la mémoire ne dépend pas du nombre de fichiers.
+    manifest = _read_json("/html/manifest.json", {})
+    if not manifest:
+        print("[SETUP] /html/manifest.json absent : fichiers servis non compressés, sans cache")
+
+    def _static(req, rel):
+        """Sert /html<rel> : <rel>.gz + ETag/304 + cache d'après le manifeste, sinon le fichier brut."""
+        entry = manifest.get(rel)
+        if entry is None:
+            if manifest:
+                return Response(req, "Not found", status=NOT_FOUND_404)  # le manifeste fait foi
+            return FileResponse(req, rel)  # pas de build : fichier brut, stat à la demande
+        etag = entry["etag"]
+        headers = {
+            "ETag": etag,
+            # index.html toujours revalidé ; CSS/JS versionnés par ?v=<etag> → cache long
+            "Cache-Control": "no-cache" if rel.endswith(".html") else "public, max-age=31536000, immutable",
+            "Vary": "Accept-Encoding",
+        }
+        if req.headers.get("If-None-Match") == etag:
+            return Response(req, "", status=(304, "Not Modified"), headers=headers)
+        if not entry.get("gzip"):
+            return FileResponse(req, rel, headers=headers, content_type=entry["mime"])
+        if "gzip" not in (req.headers.get("Accept-Encoding") or ""):
+            return FileResponse(req, rel)  # client sans gzip (rare) : fichier source, sans cache
+        headers["Content-Encoding"] = "gzip"
+        return FileResponse(req, rel + ".gz", headers=headers, content_type=entry["mime"])
+
     # ---------- Routes API & système ----------
     @server.route("/", [GET])
     def index(req: Request):
-        if _exists("/html/index.html"):
+        if "/index.html" in manifest or _exists("/html/index.html"):
             # Chemin relatif à root_path (/html)
-            return FileResponse(req, "/index.html")
+            return _static(req, "/index.html")
         return Response(req, "index.html manquant (placer dans /html/)", content_type="text/plain")
 
     @server.route("/ping", [GET])
@@ -115,7 +381,7 @@ def run(blink_ok=None, blink_ko=None, led=None, led_red=None):
 
     @server.route("/config", [GET])
     def get_config(req: Request):
-        raw = _read_json("/commands.json", {"buttons": []})
+        raw = _read_json(COMMANDS, {"buttons": []})
         btns = []
         for b in raw.get("buttons", []):
             b = dict(b)
@@ -123,27 +389,23 @@ def run(blink_ok=None, blink_ko=None, led=None, led_red=None):
                 b["pin_name"] = str(b["pin"])
             btns.append(b)
         aes_key = _read_text("/aes.key").strip()
-        return JSONResponse(req, {"buttons": btns, "aes_key": aes_key})
+        return JSONResponse(req, {"buttons": btns, "matrix": raw.get("matrix"), "aes_key": aes_key})
 
     @server.route("/config", [POST])
     def post_config(req: Request):
         try:
             data = req.json() or {}
             btns = _validate_buttons(data.get("buttons", []))
-
-            # rotation sauvegarde
-            try:
-                if _exists("/commands.back"):
-                    os.remove("/commands.back")
-            except Exception:
-                pass
-            try:
-                if _exists("/commands.json"):
-                    os.rename("/commands.json", "/commands.back")
-            except Exception:
-                pass
-
-            _write_json("/commands.json", {"buttons": btns})
+            old = _read_json(COMMANDS, {})
+            extra = {"matrix": matrix_from_json(data),  # ValueError → 400, rien d'écrit
+                     "profile_switch": _switch(data.get("profile_switch", old.get("profile_switch")))}
+            errors = _slot_errors(btns, extra["matrix"])
+            if errors:
+                _ko(1)
+                return JSONResponse(req, {"ok": False, "error": "boutons rejetés", "errors": errors},
+                                    status=BAD_REQUEST_400)
+            _write_json(COMMANDS, _commands(btns, extra), back=COMMANDS_BACK)
+            _rebuild_cache()
 
             ak = (data.get("aes_key") or "").strip()
             if ak:
@@ -154,14 +416,64 @@ def run(blink_ok=None, blink_ko=None, led=None, led_red=None):
             return JSONResponse(req, {"ok": True})
         except Exception as e:
             _ko(1)
-            return JSONResponse(req, {"ok": False, "error": str(e)}, status=400)
+            return JSONResponse(req, {"ok": False, "error": str(e)}, status=BAD_REQUEST_400)
+
+    # ---------- PATCH incrémental : seuls les boutons modifiés ----------
+    def _patch_buttons(req, patches):
+        """Fusionne chaque patch (champs partiels + id) dans commands.json ; tout ou rien."""
+        raw = _read_json(COMMANDS, {"buttons": []})
+        btns, changed, errors, unknown = _merge_patches(raw.get("buttons", []), patches)
+        if not errors:
+            errors = _slot_errors(btns, raw.get("matrix"), changed)
+        if errors:
+            _ko(1)
+            # 404 : seulement des ids inconnus sans broche ni case pour les créer
+            status = NOT_FOUND_404 if len(unknown) == len(errors) else BAD_REQUEST_400
+            return JSONResponse(req, {"ok": False, "error": "boutons rejetés", "errors": errors},
+                                status=status)
+        if changed:
+            _write_json(COMMANDS, _commands(btns, raw), back=COMMANDS_BACK)
+            _rebuild_cache()
+            _ok(1)
+        return JSONResponse(req, {"ok": True, "changed": changed})
+
+    @server.route("/config/buttons/<bid>", [PATCH])
+    def patch_button(req: Request, bid: str):
+        try:
+            patch = req.json() or {}
+        except Exception:
+            return JSONResponse(req, {"ok": False, "error": "Invalid JSON"}, status=BAD_REQUEST_400)
+        if not isinstance(patch, dict):
+            return JSONResponse(req, {"ok": False, "error": "objet attendu"}, status=BAD_REQUEST_400)
+        patch["id"] = bid
+        try:
+            return _patch_buttons(req, [patch])
+        except Exception as e:
+            _ko(1)
+            return JSONResponse(req, {"ok": False, "error": str(e)}, status=BAD_REQUEST_400)
+
+    @server.route("/config/buttons", [PATCH])
+    def patch_buttons(req: Request):
+        try:
+            data = req.json() or {}
+        except Exception:
+            return JSONResponse(req, {"ok": False, "error": "Invalid JSON"}, status=BAD_REQUEST_400)
+        patches = data.get("buttons") if isinstance(data, dict) else None
+        if not isinstance(patches, list) or not all(isinstance(p, dict) for p in patches):
+            return JSONResponse(req, {"ok": False, "error": "buttons: liste d'objets attendue"},
+                                status=BAD_REQUEST_400)
+        try:
+            return _patch_buttons(req, patches)
+        except Exception as e:
+            _ko(1)
+            return JSONResponse(req, {"ok": False, "error": str(e)}, status=BAD_REQUEST_400)
 
     @server.route("/savekey", [POST])
     def savekey(req: Request):
         try:
             data = req.json() or {}
         except Exception:
-            return JSONResponse(req, {"ok": False, "error": "Invalid JSON"}, status=400)
+            return JSONResponse(req, {"ok": False, "error": "Invalid JSON"}, status=BAD_REQUEST_400)
 
         aes_key   = (str(data.get("aes_key", "")).strip()
                      or _read_text("/aes.key").strip())
@@ -169,9 +481,9 @@ def run(blink_ok=None, blink_ko=None, led=None, led_red=None):
         key_value = str(data.get("key_value", data.get("key value", "")))
 
         if not aes_key:
-            return JSONResponse(req, {"ok": False, "error": "Missing aes_key"}, status=400)
+            return JSONResponse(req, {"ok": False, "error": "Missing aes_key"}, status=BAD_REQUEST_400)
         if not key_name:
-            return JSONResponse(req, {"ok": False, "error": "Missing key_name"}, status=400)
+            return JSONResponse(req, {"ok": False, "error": "Missing key_name"}, status=BAD_REQUEST_400)
 
         try:
             ensure_rw()
@@ -181,7 +493,144 @@ def run(blink_ok=None, blink_ko=None, led=None, led_red=None):
             return JSONResponse(req, {"ok": True, "key_name": key_name})
         except Exception as e:
             _ko(1)
-            return JSONResponse(req, {"ok": False, "error": str(e)}, status=400)
+            return JSONResponse(req, {"ok": False, "error": str(e)}, status=BAD_REQUEST_400)
+
+    @server.route("/savekeys", [POST])
+    def savekeys(req: Request):
+        """Import groupé : {"aes_key", "secrets": [{"name", "value"}] ou {nom: valeur}}."""
+        try:
+            data = req.json() or {}
+        except Exception:
+            return JSONResponse(req, {"ok": False, "error": "Invalid JSON"}, status=BAD_REQUEST_400)
+
+        aes_key = (str(data.get("aes_key", "")).strip()
+                   or _read_text("/aes.key").strip())
+        secrets = data.get("secrets", [])
+        if isinstance(secrets, dict):
+            secrets = [{"name": k, "value": v} for k, v in secrets.items()]
+        if not aes_key:
+            return JSONResponse(req, {"ok": False, "error": "Missing aes_key"}, status=BAD_REQUEST_400)
+        if not isinstance(secrets, list) or not secrets:
+            return JSONResponse(req, {"ok": False, "error": "Missing secrets"}, status=BAD_REQUEST_400)
+
+        items = []
+        for entry in secrets:
+            if isinstance(entry, dict):
+                items.append((str(entry.get("name", entry.get("key_name", ""))).strip(),
+                              str(entry.get("value", entry.get("key_value", "")))))
+            else:
+                items.append(("", ""))
+        try:
+            ensure_rw()
+            manager = PasswordManager(aes_key)  # un seul chiffreur AES pour tout le lot
+            results = manager.store_passwords(items)
+        except Exception as e:
+            _ko(1)
+            return JSONResponse(req, {"ok": False, "error": str(e)}, status=BAD_REQUEST_400)
+        stored = sum(1 for _, err in results if err is None)
+        if stored:
+            _ok(1)
+        else:
+            _ko(1)
+        out = []
+        for name, err in results:
+            out.append({"name": name, "ok": False, "error": err} if err else {"name": name, "ok": True})
+        return JSONResponse(req, {"ok": stored == len(results), "stored": stored, "results": out},
+                            status=OK_200 if stored else BAD_REQUEST_400)
+
+    @server.route("/stats", [GET])
+    def get_stats(req: Request):
+        """Histogrammes de durée par macro, tels que code.py les a laissés en NVM."""
+        import microcontroller
+        from stats import MacroStats
+        macro_stats = MacroStats()
+        macro_stats.load(microcontroller.nvm)
+        return JSONResponse(req, macro_stats.to_dict())
+
+    @server.route("/stats", [DELETE])
+    def reset_stats(req: Request):
+        import microcontroller
+        from stats import MacroStats
+        MacroStats().save(microcontroller.nvm)
+        _ok(1)
+        return JSONResponse(req, {"ok": True})
+
+    # ---------- Profils (profiles/<name>.json, voir config_compiler.py) ----------
+    @server.route("/profiles", [GET])
+    def get_profiles(req: Request):
+        raw = _read_json(COMMANDS, {})
+        return JSONResponse(req, {"profiles": profile_names(PROFILES_DIR),
+                                  "switch": raw.get("profile_switch")})
+
+    @server.route("/profiles", [POST])
+    def set_profile_switch(req: Request):
+        """{"switch": {"button": id, "gesture": "hold"}} ou {"switch": null} : geste réservé."""
+        try:
+            data = req.json() or {}
+            raw = _read_json(COMMANDS, {"buttons": []})
+            raw["profile_switch"] = _switch(data.get("switch"))
+            if data.get("switch") and raw["profile_switch"] is None:
+                raise ValueError("switch: {\"button\": id, \"gesture\": tap|double|hold} attendu")
+            _write_json(COMMANDS, _commands(raw.get("buttons", []), raw), back=COMMANDS_BACK)
+            _rebuild_cache()
+            _ok(1)
+            return JSONResponse(req, {"ok": True})
+        except Exception as e:
+            _ko(1)
+            return JSONResponse(req, {"ok": False, "error": str(e)}, status=BAD_REQUEST_400)
+
+    @server.route("/profiles/<name>", [GET])
+    def get_profile(req: Request, name: str):
+        data = _read_json(f"{PROFILES_DIR}/{name}.json", None) if valid_profile_name(name) else None
+        if data is None:
+            return JSONResponse(req, {"ok": False, "error": "profil inconnu"}, status=NOT_FOUND_404)
+        return JSONResponse(req, {"name": name, "buttons": data.get("buttons", [])})
+
+    @server.route("/profiles/<name>", [POST])
+    def save_profile(req: Request, name: str):
+        """Remplace le profil : {"buttons": [redéfinitions par id]} ; tout ou rien."""
+        if not valid_profile_name(name):
+            return JSONResponse(req, {"ok": False, "error": "nom invalide (lettres, chiffres, - et _)"},
+                                status=BAD_REQUEST_400)
+        try:
+            data = req.json() or {}
+            entries = data.get("buttons") if isinstance(data, dict) else None
+            if not isinstance(entries, list) or not all(isinstance(e, dict) for e in entries):
+                raise ValueError("buttons: liste d'objets attendue")
+            btns, errors = _validate_profile(entries, _read_json(COMMANDS, {}).get("buttons", []))
+            if errors:
+                _ko(1)
+                return JSONResponse(req, {"ok": False, "error": "boutons rejetés", "errors": errors},
+                                    status=BAD_REQUEST_400)
+            ensure_rw()
+            try:
+                os.mkdir(PROFILES_DIR)
+            except OSError:
+                pass  # existe déjà
+            path, back = profile_files(name, PROFILES_DIR)
+            _write_json(path, {"buttons": btns}, back=back)
+            _rebuild_cache()
+            _ok(1)
+            return JSONResponse(req, {"ok": True, "buttons": btns})
+        except Exception as e:
+            _ko(1)
+            return JSONResponse(req, {"ok": False, "error": str(e)}, status=BAD_REQUEST_400)
+
+    @server.route("/profiles/<name>", [DELETE])
+    def delete_profile(req: Request, name: str):
+        path, back = profile_files(name, PROFILES_DIR)
+        if not valid_profile_name(name) or not _exists(path):
+            return JSONResponse(req, {"ok": False, "error": "profil inconnu"}, status=NOT_FOUND_404)
+        ensure_rw()
+        for old in (back, path + ".tmp"):  # d'abord : _recover() ne doit pas le ressusciter
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+        os.remove(path)
+        _rebuild_cache()
+        _ok(1)
+        return JSONResponse(req, {"ok": True})
 
     nonlocal_want_reload = [False]
 
@@ -195,65 +644,24 @@ def run(blink_ok=None, blink_ko=None, led=None, led_red=None):
         nonlocal_want_reload[0] = True
         return JSONResponse(req, {"ok": True})
 
-    # ---------- Mappage STATIQUE sans wildcard ----------
-    def _iter_files(base="/html", prefix=""):
-        """Génère les chemins relatifs à /html pour tous les fichiers."""
+    # 404 propres pour requêtes courantes
+    @server.route("/favicon.ico", [GET])
+    def _fav(req: Request):
+        return Response(req, "", status=NOT_FOUND_404)
+
+    @server.route("/apple-touch-icon.png", [GET])
+    def _touch(req: Request):
+        return Response(req, "", status=NOT_FOUND_404)
+
+    # ---------- Route statique unique (EN DERNIER : les routes sont testées dans l'ordre) ----------
+    @server.route("/....", [GET])
+    def static_file(req: Request):
         try:
-            names = os.listdir(base)
+            return _static(req, req.path)  # req.path sans la query (?v=…), relatif à /html
         except OSError:
-            return
-        for name in names:
-            if name.startswith("."):
-                continue
-            full = base + "/" + name
-            rel = prefix + "/" + name if prefix else "/" + name
-            try:
-                st = os.stat(full)
-            except OSError:
-                continue
-            # CircuitPython: pas de S_ISDIR portable, on teste via listdir
-            is_dir = False
-            try:
-                _ = os.listdir(full)
-                is_dir = True
-            except OSError:
-                is_dir = False
-            if is_dir:
-                # descente récursive
-                for sub in _iter_files(full, rel):
-                    yield sub
-            else:
-                yield rel  # ex: "/style.css", "/img/logo.png"
+            return Response(req, "Not found", status=NOT_FOUND_404)
 
-    def _register_static_routes():
-        count = 0
-        for rel_url in _iter_files("/html", ""):
-            # on ignore /index.html (déjà route "/")
-            if rel_url == "/index.html":
-                continue
-            # handler factory
-            def make_handler(_rel):
-                def handler(req: Request):
-                    try:
-                        return FileResponse(req, _rel)  # chemin relatif à /html
-                    except OSError:
-                        return Response(req, "Not found", status=404)
-                return handler
-            try:
-                server.route(rel_url, [GET])(make_handler(rel_url))
-                count += 1
-            except Exception as e:
-                print(f"[SETUP] route statique skip {rel_url}: {e}")
-        # 404 propres pour requêtes courantes
-        @server.route("/favicon.ico", [GET])
-        def _fav(req: Request):
-            return Response(req, "", status=404)
-        @server.route("/apple-touch-icon.png", [GET])
-        def _touch(req: Request):
-            return Response(req, "", status=404)
-        print(f"[SETUP] Routes statiques enregistrées: {count}")
-
-    _register_static_routes()
+    print(f"[SETUP] Fichiers statiques: {len(manifest) or 'sans manifeste'}")
 
     # ---------- Démarrage serveur ----------
     try:
@@ -264,7 +672,7 @@ def run(blink_ok=None, blink_ko=None, led=None, led_red=None):
         server.start(str(ip_ap))
         print(f"[SETUP] HTTP bind: {ip_ap}:80")
 
-    print(f"[SETUP] HTTP: http://{ip_ap}/  (routes: /, /ping, /config [GET/POST], /savekey [POST], /reboot [GET/POST])")
+    print(f"[SETUP] HTTP: http://{ip_ap}/  (routes: /, /ping, /config [GET/POST], /config/buttons[/<id>] [PATCH], /savekey[s] [POST], /stats [GET/DELETE], /profiles[/<name>] [GET/POST/DELETE], /reboot [GET/POST])")
 
     # ---------- Boucle poll ----------
     while True:
@@ -281,6 +689,8 @@ def run(blink_ok=None, blink_ko=None, led=None, led_red=None):
             except Exception:
                 sys.print_exception(e)
             print(f"[SETUP] poll error type: {type(e).__name__} repr: {repr(e)}")
+        if tick:
+            tick()
         if nonlocal_want_reload[0]:
             time.sleep(0.5)
             supervisor.reload()
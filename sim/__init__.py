@@ -0,0 +1,9 @@
+# sim — Simulateur hôte de la BiduleBox
+# Exécute le vrai code.py (boucle principale, macros, mode setup) sur un PC :
+# GPIO pilotées par un scénario, rapports HID enregistrés et horodatés, AES
+# compatible aesio, serveur HTTP sur un socket de l'hôte. Voir README.md
+# (« Simulateur hôte ») et `python -m sim --help`.
+
+from sim.clock import SimulationComplete
+from sim.simulator import Simulator, make_root
+from sim.timeline import Timeline, load_events
@@ -0,0 +1,51 @@
+# python -m sim — lance code.py sur l'hôte et écrit un rapport JSON
+#
+#   python -m sim code --events scenario.json [--report out.json]
+#   python -m sim setup --port 8080            (mode setup, temps réel, Ctrl-C pour quitter)
+
+import argparse
+import json
+import sys
+
+from sim import Simulator
+from sim.timeline import load_events
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m sim", description="Simulateur hôte BiduleBox")
+    parser.add_argument("mode", choices=("code", "setup"),
+                        help="code : boucle principale ; setup : crée /setup (AP + serveur HTTP)")
+    parser.add_argument("--events", help="scénario JSON (liste d'événements, voir sim/timeline.py)")
+    parser.add_argument("--root", help="dossier servant de CIRCUITPY (défaut : copie temporaire du dépôt)")
+    parser.add_argument("--report", help="fichier du rapport JSON (défaut : sortie standard)")
+    parser.add_argument("--duration-ms", type=float, help="arrêt après cette durée (défaut : fin du scénario + --idle-ms)")
+    parser.add_argument("--idle-ms", type=float, default=2000)
+    parser.add_argument("--realtime", action="store_true", help="horloge réelle (implicite en mode setup)")
+    parser.add_argument("--cpu-scale", type=float, default=0.0,
+                        help="ajoute le temps CPU hôte × facteur à l'horloge virtuelle")
+    parser.add_argument("--report-interval-ms", type=float, default=1.0,
+                        help="intervalle de polling USB : un rapport HID par créneau (0 = illimité)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080, help="port hôte qui remplace le port 80")
+    args = parser.parse_args(argv)
+
+    setup = args.mode == "setup"
+    events = load_events(args.events) if args.events else ()
+    sim = Simulator(root=args.root, events=events, setup=setup, realtime=args.realtime or setup,
+                    cpu_scale=args.cpu_scale, report_interval_ms=args.report_interval_ms,
+                    idle_ms=args.idle_ms, duration_ms=args.duration_ms,
+                    http_host=args.host, http_port=args.port)
+    if setup and args.root:
+        open(f"{args.root}/setup", "w").close()
+    report = sim.run()
+    report["root"] = sim.fs.root
+    text = json.dumps(report, indent=1)
+    if args.report:
+        with open(args.report, "w") as f:
+            f.write(text)
+    else:
+        sys.stdout.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# sim/clock.py — Horloge du simulateur
+# Par défaut l'horloge est virtuelle : time.sleep() avance le temps sans
+# attendre, si bien qu'un scénario de 30 s tourne en quelques dixièmes de
+# seconde et donne les mêmes horodatages à chaque exécution. `cpu_scale`
+# ajoute le temps CPU réellement consommé par le firmware (multiplié, pour
+# approcher la lenteur du RP2040) ; `realtime` utilise l'horloge de l'hôte
+# (mode setup, où un navigateur parle au serveur HTTP).
+
+import time as _time
+
+_real_sleep = _time.sleep
+_real_monotonic = _time.monotonic
+_real_monotonic_ns = _time.monotonic_ns
+_perf_ns = _time.perf_counter_ns
+
+
+class SimulationComplete(BaseException):
+    """Fin du scénario. BaseException : traverse les `except Exception` du firmware."""
+
+
+class Clock:
+    def __init__(self, realtime=False, cpu_scale=0.0):
+        self.realtime = realtime
+        self.cpu_scale = cpu_scale
+        self.deadline_ns = None
+        self._virtual_ns = 0
+        self._t0 = _perf_ns()
+
+    def now_ns(self):
+        if self.realtime:
+            return _perf_ns() - self._t0
+        if self.cpu_scale:
+            return self._virtual_ns + int((_perf_ns() - self._t0) * self.cpu_scale)
+        return self._virtual_ns
+
+    def now_ms(self):
+        return self.now_ns() // 1000000
+
+    def advance_to(self, t_ns):
+        """Fait passer le temps jusqu'à t_ns (attente réelle en mode realtime)."""
+        delta = t_ns - self.now_ns()
+        if delta > 0:
+            if self.realtime:
+                _real_sleep(delta / 1e9)
+            else:
+                self._virtual_ns += delta
+        self.check()
+
+    def sleep(self, seconds):
+        self.advance_to(self.now_ns() + int(seconds * 1e9))
+
+    def check(self):
+        if self.deadline_ns is not None and self.now_ns() >= self.deadline_ns:
+            raise SimulationComplete()
+
+    def monotonic(self):
+        return self.now_ns() / 1e9
+
+    # ---------- Remplacement du module time ----------
+    def install(self):
+        global _active
+        _active = self
+        self._t0 = _perf_ns()
+        _time.sleep = _sleep
+        _time.monotonic = _monotonic
+        _time.monotonic_ns = _monotonic_ns
+
+    def uninstall(self):
+        global _active
+        if _active is self:
+            _active = None
+
+
+# Fonctions installées dans `time` : elles renvoient vers l'horloge active, ce
+# qui reste vrai pour les modules qui ont fait `from time import sleep`
+# (adafruit_httpserver) même d'une simulation à l'autre.
+_active = None
+
+
+def _sleep(seconds):
+    if _active is None:
+        return _real_sleep(seconds)
+    _active.sleep(seconds)
+
+
+def _monotonic():
+    if _active is None:
+        return _real_monotonic()
+    return _active.monotonic()
+
+
+def _monotonic_ns():
+    if _active is None:
+        return _real_monotonic_ns()
+    return _active.now_ns()
@@ -0,0 +1,86 @@
+# sim/fs.py — Système de fichiers de la carte
+# Le firmware utilise des chemins absolus ("/commands.json", "/.keys/…",
+# "/html/…"). Ces chemins sont redirigés vers un dossier hôte (`root`), sauf
+# ceux qui commencent par un dossier système de l'hôte (/usr, /tmp, …) dont
+# Python et les bibliothèques ont besoin. Comme sur la carte, le
+# FS est en lecture seule pour le firmware tant que storage.remount() ne l'a
+# pas ouvert en écriture.
+
+import builtins
+import errno
+import os
+
+_real_open = builtins.open
+_PATCHED = ("stat", "listdir", "mkdir", "rmdir", "remove", "unlink", "rename", "statvfs")
+_WRITERS = ("mkdir", "rmdir", "remove", "unlink", "rename")
+_HOST_DIRS = {
+    "bin", "boot", "dev", "etc", "home", "lib", "lib32", "lib64", "libx32", "media", "mnt",
+    "nix", "opt", "proc", "root", "run", "sbin", "snap", "srv", "sys", "tmp", "usr", "var",
+    "Applications", "Library", "System", "Users", "Volumes", "private",
+}
+
+
+class DeviceFS:
+    def __init__(self, root, readonly=True):
+        self.root = os.path.abspath(root)
+        self.readonly = readonly
+        self._saved = {}
+
+    def map(self, path):
+        if not isinstance(path, str) or not path.startswith("/"):
+            return path
+        top = path[1:].split("/", 1)[0]
+        if not top:
+            return self.root
+        if top in _HOST_DIRS and not os.path.lexists(os.path.join(self.root, top)):
+            return path
+        return self.root + path
+
+    def is_device(self, path):
+        return self.map(path) is not path
+
+    def _check_writable(self, path):
+        if self.readonly and self.is_device(path):
+            raise OSError(errno.EROFS, "Read-only filesystem")
+
+    # ---------- Remplacements ----------
+    def open(self, file, mode="r", *args, **kwargs):
+        if any(c in mode for c in "wax+"):
+            self._check_writable(file)
+        return _real_open(self.map(file), mode, *args, **kwargs)
+
+    def _wrap(self, name, real):
+        writer = name in _WRITERS
+
+        def call(path, *args, **kwargs):
+            if writer:
+                self._check_writable(path)
+            if name == "rename":
+                dst = args[0]
+                try:
+                    self._saved["stat"](self.map(dst))
+                    exists = True
+                except OSError:
+                    exists = False
+                if exists:
+                    # FAT (CircuitPython) : rename n'écrase pas la destination
+                    raise OSError(errno.EEXIST, "File exists")
+                return real(self.map(path), self.map(dst))
+            return real(self.map(path), *args, **kwargs)
+
+        return call
+
+    def install(self):
+        builtins.open = self.open
+        for name in _PATCHED:
+            real = getattr(os, name)
+            self._saved[name] = real
+            setattr(os, name, self._wrap(name, real))
+        if not hasattr(os, "sync"):
+            os.sync = lambda: None
+
+    def uninstall(self):
+        builtins.open = _real_open
+        for name, real in self._saved.items():
+            setattr(os, name, real)
+        self._saved = {}
@@ -0,0 +1,27 @@
+# sim/hid.py — Puits HID : enregistre chaque rapport envoyé, horodaté
+# Un vrai endpoint USB HID ne prend qu'un rapport par intervalle de polling de
+# l'hôte ; send_report() attend donc que le créneau suivant soit libre
+# (`report_interval_ms`, 1 ms par défaut, 0 = pas de limite).
+
+
+class HidSink:
+    def __init__(self, clock, timeline, report_interval_ms=1.0):
+        self.clock = clock
+        self.timeline = timeline
+        self.interval_ns = int(report_interval_ms * 1000000)
+        self.reports = []   # [(t_ns, nom du périphérique, bytes)]
+        self._next_slot = 0
+
+    def send(self, device, report):
+        t = max(self.clock.now_ns(), self._next_slot)
+        self.clock.advance_to(t)
+        self.reports.append((t, device.name, bytes(report)))
+        self._next_slot = t + self.interval_ns
+
+    def received(self, device):
+        if device.name != "keyboard":
+            return None
+        return self.timeline.host_report()
+
+    def keyboard_reports(self):
+        return [(t, r) for t, name, r in self.reports if name == "keyboard"]
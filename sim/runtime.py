@@ -0,0 +1,12 @@
+# sim/runtime.py — État partagé entre le simulateur et les modules de remplacement (sim/stubs)
+# Renseigné par Simulator.install() ; les stubs y lisent l'horloge, le
+# scénario, le puits HID et le FS de la carte au moment où le firmware les appelle.
+
+clock = None
+timeline = None
+hid = None
+fs = None
+http_host = "127.0.0.1"
+http_port = 8080
+ap = None  # (ssid, password) après wifi.radio.start_ap()
+nvm = None  # microcontroller.nvm (bytearray du Simulator)
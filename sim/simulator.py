@@ -0,0 +1,155 @@
+# sim/simulator.py — Exécute le vrai code.py (et setup.run) sur l'hôte
+# Les modules matériels de CircuitPython sont remplacés par sim/stubs, placés
+# en tête de sys.path ; adafruit_hid et adafruit_httpserver sont les versions
+# pur Python de PyPI (lib/ ne contient que des .mpy), complétées par le
+# layout FR de lib/adafruit_hid.
+
+import os
+import runpy
+import shutil
+import sys
+import tempfile
+
+from sim import runtime
+from sim.clock import Clock, SimulationComplete
+from sim.fs import DeviceFS
+from sim.hid import HidSink
+from sim.timeline import Timeline
+
+SIM_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO = os.path.dirname(SIM_DIR)
+STUBS = os.path.join(SIM_DIR, "stubs")
+
+# Fichiers de données copiés sur la "carte" simulée (les modules .py sont importés depuis le dépôt)
+DEVICE_FILES = ("commands.json", "config.bin", "macros", "html", ".keys", "aes.key")
+_LIBRARIES = ("adafruit_hid", "adafruit_httpserver", "adafruit_ble")
+
+
+def make_root(setup=False, path=None):
+    """Dossier hôte servant de CIRCUITPY : copie des fichiers de données du dépôt."""
+    root = path or tempfile.mkdtemp(prefix="bidulebox-")
+    os.makedirs(root, exist_ok=True)
+    for name in DEVICE_FILES:
+        src = os.path.join(REPO, name)
+        dst = os.path.join(root, name)
+        if os.path.isdir(src):
+            shutil.copytree(src, dst, dirs_exist_ok=True)
+        elif os.path.exists(src):
+            shutil.copy(src, dst)
+    flag = os.path.join(root, "setup")
+    if setup:
+        open(flag, "w").close()
+    elif os.path.exists(flag):
+        os.remove(flag)
+    return root
+
+
+def _firmware_module(module):
+    path = getattr(module, "__file__", None) or ""
+    return path.startswith(STUBS + os.sep) or os.path.dirname(path) == REPO
+
+
+class Simulator:
+    def __init__(self, root=None, events=(), setup=False, realtime=False, cpu_scale=0.0,
+                 report_interval_ms=1.0, idle_ms=2000, duration_ms=None,
+                 http_host="127.0.0.1", http_port=8080, nvm=None):
+        self.clock = Clock(realtime, cpu_scale)
+        self.timeline = Timeline(self.clock, events)
+        self.hid = HidSink(self.clock, self.timeline, report_interval_ms)
+        self.fs = DeviceFS(root or make_root(setup))
+        # microcontroller.nvm : survit aux rechargements, comme sur la carte ; passer celui
+        # d'un Simulator précédent pour enchaîner mode normal puis mode setup
+        self.nvm = bytearray(4096) if nvm is None else nvm
+        self.idle_ms = idle_ms
+        self.duration_ms = duration_ms
+        self.http_host = http_host
+        self.http_port = http_port
+        self.reloads = 0
+        self._saved_path = None
+
+    # ---------- Installation ----------
+    def install(self):
+        runtime.clock = self.clock
+        runtime.timeline = self.timeline
+        runtime.hid = self.hid
+        runtime.fs = self.fs
+        runtime.http_host = self.http_host
+        runtime.http_port = self.http_port
+        runtime.ap = None
+        runtime.nvm = self.nvm
+        self._saved_path = list(sys.path)
+        sys.path[:0] = [STUBS, REPO]
+        self._purge()
+        import adafruit_hid
+
+        fr = os.path.join(REPO, "lib", "adafruit_hid")
+        if fr not in adafruit_hid.__path__:
+            adafruit_hid.__path__.append(fr)
+        self.clock.install()
+        self.fs.install()
+
+    def uninstall(self):
+        self.fs.uninstall()
+        self.clock.uninstall()
+        if self._saved_path is not None:
+            sys.path[:] = self._saved_path
+            self._saved_path = None
+
+    def _purge(self):
+        """Oublie les modules du firmware et des stubs : chaque (re)démarrage repart de zéro."""
+        for name, module in list(sys.modules.items()):
+            if name.split(".")[0] in _LIBRARIES or _firmware_module(module):
+                del sys.modules[name]
+
+    # ---------- Exécution ----------
+    def run(self, entry="code.py"):
+        """Exécute `entry` jusqu'à la fin du scénario ; supervisor.reload() le relance."""
+        self.install()
+        try:
+            if self.duration_ms is not None:
+                self.clock.deadline_ns = int(self.duration_ms * 1000000)
+            elif not self.clock.realtime:
+                self.clock.deadline_ns = self.timeline.end_ns + int(self.idle_ms * 1000000)
+            while True:
+                import supervisor
+
+                try:
+                    runpy.run_path(os.path.join(REPO, entry), run_name="__main__")
+                    break
+                except supervisor.SimulationReload:
+                    self.reloads += 1
+                    print(f"[SIM] supervisor.reload() à {self.clock.now_ms()} ms")
+                    self._purge()
+                    self.timeline.release_all()
+        except (SimulationComplete, KeyboardInterrupt):
+            pass
+        finally:
+            self.uninstall()
+        return self.report()
+
+    # ---------- Résultats ----------
+    def latencies_ms(self):
+        """Pour chaque appui du scénario : délai jusqu'au premier rapport clavier non vide."""
+        reports = [(t, r) for t, r in self.hid.keyboard_reports() if any(r)]
+        out = []
+        i = 0
+        for t_press, pin in sorted(self.timeline.presses):
+            while i < len(reports) and reports[i][0] < t_press:
+                i += 1
+            if i < len(reports):
+                out.append({"pin": pin, "t_ms": t_press / 1e6,
+                            "latency_ms": (reports[i][0] - t_press) / 1e6})
+            else:
+                out.append({"pin": pin, "t_ms": t_press / 1e6, "latency_ms": None})
+        return out
+
+    def report(self):
+        return {
+            "duration_ms": self.clock.now_ns() / 1e6,
+            "reloads": self.reloads,
+            "hid_reports": [{"t_ms": t / 1e6, "device": name, "report": r.hex()}
+                            for t, name, r in self.hid.reports],
+            "outputs": [{"t_ms": t / 1e6, "pin": pin, "value": value}
+                        for t, pin, value in self.timeline.log],
+            "presses": self.latencies_ms(),
+        }
@@ -0,0 +1,13 @@
+# adafruit_ble — remplaçant hôte minimal (sim) : le firmware importe ces noms sans s'en servir
+
+
+class BLERadio:
+    advertising = False
+    connected = False
+    connections = ()
+
+    def start_advertising(self, *args, **kwargs):
+        self.advertising = True
+
+    def stop_advertising(self):
+        self.advertising = False
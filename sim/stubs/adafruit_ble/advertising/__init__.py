@@ -0,0 +1,7 @@
+# adafruit_ble.advertising — remplaçant hôte minimal (sim)
+
+
+class Advertisement:
+    def __init__(self, *args, **kwargs):
+        self.appearance = 0
+        self.complete_name = None
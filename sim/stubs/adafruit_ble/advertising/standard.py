@@ -0,0 +1,9 @@
+# adafruit_ble.advertising.standard — remplaçant hôte minimal (sim)
+
+from adafruit_ble.advertising import Advertisement
+
+
+class ProvideServicesAdvertisement(Advertisement):
+    def __init__(self, *services):
+        super().__init__()
+        self.services = services
@@ -0,0 +1,7 @@
+# adafruit_ble.services — remplaçant hôte minimal (sim)
+
+
+class Service:
+    def __init__(self, **kwargs):
+        for name, value in kwargs.items():
+            setattr(self, name, value)
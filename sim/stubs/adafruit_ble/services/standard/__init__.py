@@ -0,0 +1 @@
+# adafruit_ble.services.standard — remplaçant hôte minimal (sim)
@@ -0,0 +1,7 @@
+# adafruit_ble.services.standard.device_info — remplaçant hôte minimal (sim)
+
+from adafruit_ble.services import Service
+
+
+class DeviceInfoService(Service):
+    pass
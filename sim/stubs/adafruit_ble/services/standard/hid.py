@@ -0,0 +1,7 @@
+# adafruit_ble.services.standard.hid — remplaçant hôte minimal (sim)
+
+from adafruit_ble.services import Service
+
+
+class HIDService(Service):
+    devices = ()
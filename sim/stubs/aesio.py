@@ -0,0 +1,169 @@
+# aesio — remplaçant hôte (sim) : AES-128/192/256 en pur Python
+# Compatible bit à bit avec aesio en mode ECB (et CBC/CTR) : mêmes chiffrés que sur la carte.
+
+MODE_ECB = 1
+MODE_CBC = 2
+MODE_CTR = 6
+
+
+def _xtime(a):
+    a <<= 1
+    return (a ^ 0x11B) & 0xFF if a & 0x100 else a
+
+
+def _mul(a, b):
+    r = 0
+    while b:
+        if b & 1:
+            r ^= a
+        a = _xtime(a)
+        b >>= 1
+    return r
+
+
+def _build_sbox():
+    sbox = [0] * 256
+    p = q = 1
+    while True:
+        p = p ^ _xtime(p)                      # p *= 3
+        q ^= q << 1                            # q /= 3
+        q ^= q << 2
+        q ^= q << 4
+        q &= 0xFF
+        if q & 0x80:
+            q ^= 0x09
+        x = q ^ ((q << 1) | (q >> 7)) ^ ((q << 2) | (q >> 6)) ^ ((q << 3) | (q >> 5)) ^ ((q << 4) | (q >> 4))
+        sbox[p] = (x ^ 0x63) & 0xFF
+        if p == 1:
+            break
+    sbox[0] = 0x63
+    inv = [0] * 256
+    for i, v in enumerate(sbox):
+        inv[v] = i
+    return sbox, inv
+
+
+_SBOX, _INV_SBOX = _build_sbox()
+
+
+def _expand_key(key):
+    nk = len(key) // 4
+    rounds = nk + 6
+    words = [list(key[4 * i:4 * i + 4]) for i in range(nk)]
+    rcon = 1
+    for i in range(nk, 4 * (rounds + 1)):
+        t = list(words[i - 1])
+        if i % nk == 0:
+            t = t[1:] + t[:1]
+            t = [_SBOX[b] for b in t]
+            t[0] ^= rcon
+            rcon = _xtime(rcon)
+        elif nk > 6 and i % nk == 4:
+            t = [_SBOX[b] for b in t]
+        words.append([words[i - nk][j] ^ t[j] for j in range(4)])
+    return [sum(words[4 * r:4 * r + 4], []) for r in range(rounds + 1)]
+
+
+def _add(state, rk):
+    return [s ^ k for s, k in zip(state, rk)]
+
+
+def _shift_rows(s, inverse=False):
+    out = [0] * 16
+    for c in range(4):
+        for r in range(4):
+            src = (c + r) % 4 if not inverse else (c - r) % 4
+            out[4 * c + r] = s[4 * src + r]
+    return out
+
+
+def _mix_columns(s, inverse=False):
+    m = (14, 11, 13, 9) if inverse else (2, 3, 1, 1)
+    out = [0] * 16
+    for c in range(4):
+        col = s[4 * c:4 * c + 4]
+        for r in range(4):
+            v = 0
+            for k in range(4):
+                v ^= _mul(col[k], m[(k - r) % 4])
+            out[4 * c + r] = v
+    return out
+
+
+def _encrypt_block(rks, block):
+    s = _add(list(block), rks[0])
+    for rk in rks[1:-1]:
+        s = _mix_columns(_shift_rows([_SBOX[b] for b in s]))
+        s = _add(s, rk)
+    s = _shift_rows([_SBOX[b] for b in s])
+    return bytes(_add(s, rks[-1]))
+
+
+def _decrypt_block(rks, block):
+    s = _add(list(block), rks[-1])
+    for rk in reversed(rks[1:-1]):
+        s = [_INV_SBOX[b] for b in _shift_rows(s, True)]
+        s = _mix_columns(_add(s, rk), True)
+    s = [_INV_SBOX[b] for b in _shift_rows(s, True)]
+    return bytes(_add(s, rks[0]))
+
+
+class AES:
+    """Même interface que aesio.AES : encrypt_into / decrypt_into / rekey."""
+
+    def __init__(self, key, mode=MODE_ECB, IV=None, segment_size=8):
+        self.rekey(key, IV)
+        self.mode = mode
+
+    def rekey(self, key, IV=None):
+        if isinstance(key, str):
+            key = key.encode("utf-8")
+        if len(key) not in (16, 24, 32):
+            raise ValueError("Key must be 16, 24, or 32 bytes long")
+        self._rks = _expand_key(bytes(key))
+        self._iv = bytes(IV) if IV is not None else bytes(16)
+
+    def _check(self, src, dest):
+        if len(src) != len(dest):
+            raise ValueError("Source and dest must be the same length")
+        if self.mode in (MODE_ECB, MODE_CBC) and len(src) % 16:
+            raise ValueError("Buffer must be a multiple of 16 bytes")
+
+    def encrypt_into(self, src, dest):
+        self._check(src, dest)
+        if self.mode == MODE_CTR:
+            return self._ctr(src, dest)
+        prev = self._iv
+        for i in range(0, len(src), 16):
+            block = bytes(src[i:i + 16])
+            if self.mode == MODE_CBC:
+                block = bytes(a ^ b for a, b in zip(block, prev))
+            out = _encrypt_block(self._rks, block)
+            dest[i:i + 16] = out
+            prev = out
+        if self.mode == MODE_CBC:
+            self._iv = prev
+
+    def decrypt_into(self, src, dest):
+        self._check(src, dest)
+        if self.mode == MODE_CTR:
+            return self._ctr(src, dest)
+        prev = self._iv
+        for i in range(0, len(src), 16):
+            block = bytes(src[i:i + 16])
+            out = _decrypt_block(self._rks, block)
+            if self.mode == MODE_CBC:
+                out = bytes(a ^ b for a, b in zip(out, prev))
+                prev = block
+            dest[i:i + 16] = out
+        if self.mode == MODE_CBC:
+            self._iv = prev
+
+    def _ctr(self, src, dest):
+        counter = int.from_bytes(self._iv, "big")
+        for i in range(0, len(src), 16):
+            ks = _encrypt_block(self._rks, counter.to_bytes(16, "big"))
+            chunk = src[i:i + 16]
+            dest[i:i + len(chunk)] = bytes(a ^ b for a, b in zip(chunk, ks))
+            counter = (counter + 1) % (1 << 128)
+        self._iv = counter.to_bytes(16, "big")
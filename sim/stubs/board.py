@@ -0,0 +1,19 @@
+# board — remplaçant hôte (sim) : broches du Raspberry Pi Pico W
+
+board_id = "raspberry_pi_pico_w"
+
+
+class Pin:
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return f"board.{self.name}"
+
+
+for _i in range(29):
+    globals()[f"GP{_i}"] = Pin(f"GP{_i}")
+LED = Pin("LED")
+VBUS_SENSE = Pin("VBUS_SENSE")
+SMPS_MODE = Pin("SMPS_MODE")
+A0, A1, A2 = GP26, GP27, GP28  # noqa: F821
@@ -0,0 +1,81 @@
+# digitalio — remplaçant hôte (sim) : entrées lues dans le scénario, sorties journalisées
+
+from sim import runtime
+
+
+class Direction:
+    INPUT = "INPUT"
+    OUTPUT = "OUTPUT"
+
+
+class Pull:
+    UP = "UP"
+    DOWN = "DOWN"
+
+
+class DriveMode:
+    PUSH_PULL = "PUSH_PULL"
+    OPEN_DRAIN = "OPEN_DRAIN"
+
+
+class DigitalInOut:
+    def __init__(self, pin):
+        runtime.timeline.claim(pin.name)
+        self._name = pin.name
+        self._direction = Direction.INPUT
+        self._pull = None
+        self._value = False
+        self.drive_mode = DriveMode.PUSH_PULL
+
+    def deinit(self):
+        runtime.timeline.release(self._name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.deinit()
+
+    @property
+    def direction(self):
+        return self._direction
+
+    @direction.setter
+    def direction(self, direction):
+        self._direction = direction
+        if direction == Direction.OUTPUT:
+            self._pull = None
+            runtime.timeline.write(self._name, self._value)
+
+    def switch_to_output(self, value=False, drive_mode=DriveMode.PUSH_PULL):
+        self._value = bool(value)
+        self.drive_mode = drive_mode
+        self.direction = Direction.OUTPUT
+
+    def switch_to_input(self, pull=None):
+        self.direction = Direction.INPUT
+        self.pull = pull
+
+    @property
+    def pull(self):
+        return self._pull
+
+    @pull.setter
+    def pull(self, pull):
+        if self._direction == Direction.OUTPUT:
+            raise AttributeError("Pull not used when direction is output.")
+        self._pull = pull
+        runtime.timeline.pulls[self._name] = pull
+
+    @property
+    def value(self):
+        if self._direction == Direction.OUTPUT:
+            return self._value
+        return runtime.timeline.level(self._name)
+
+    @value.setter
+    def value(self, value):
+        if self._direction != Direction.OUTPUT:
+            raise AttributeError("Cannot set value when direction is input.")
+        self._value = bool(value)
+        runtime.timeline.write(self._name, self._value)
@@ -0,0 +1,190 @@
+# keypad — remplaçant hôte (sim)
+# Le scan "en tâche de fond" est rejoué à la demande : à chaque accès à la
+# file, les changements du scénario depuis le dernier scan sont convertis en
+# événements horodatés au premier instant de scan (multiple de `interval`)
+# qui les voit, comme le ferait le scan matériel de CircuitPython.
+
+from supervisor import ticks_ms
+from sim import runtime
+
+
+class Event:
+    def __init__(self, key_number=0, pressed=True, timestamp=None):
+        self.key_number = key_number
+        self.pressed = pressed
+        self.timestamp = ticks_ms() if timestamp is None else timestamp
+
+    @property
+    def released(self):
+        return not self.pressed
+
+    def __eq__(self, other):
+        return (isinstance(other, Event) and self.key_number == other.key_number
+                and self.pressed == other.pressed)
+
+    def __hash__(self):
+        return hash((self.key_number, self.pressed))
+
+    def __repr__(self):
+        return f"<Event: key_number {self.key_number} {'pressed' if self.pressed else 'released'}>"
+
+
+class EventQueue:
+    def __init__(self, scan, max_events):
+        self._scan = scan
+        self._max = max_events
+        self._events = []
+        self.overflowed = False
+
+    def _push(self, key_number, pressed, timestamp):
+        if len(self._events) >= self._max:
+            self.overflowed = True
+            return
+        self._events.append((key_number, pressed, timestamp))
+
+    def get(self):
+        self._scan()
+        if not self._events:
+            return None
+        return Event(*self._events.pop(0))
+
+    def get_into(self, event):
+        self._scan()
+        if not self._events:
+            return False
+        event.key_number, event.pressed, event.timestamp = self._events.pop(0)
+        return True
+
+    def clear(self):
+        self._scan()
+        self._events = []
+        self.overflowed = False
+
+    def __len__(self):
+        self._scan()
+        return len(self._events)
+
+    def __bool__(self):
+        return len(self) > 0
+
+
+class _Scanner:
+    def __init__(self, names, active, interval, max_events):
+        self._names = names
+        self._active = active
+        self._interval = max(1, int(interval * 1e9))
+        self._state = [False] * len(names)
+        self._recheck = False
+        self._scanned = runtime.clock.now_ns()
+        self.events = EventQueue(self._scan, max_events)
+        for name in names:
+            runtime.timeline.claim(name)
+
+    @property
+    def key_count(self):
+        return len(self._names)
+
+    def _scan(self):
+        timeline = runtime.timeline
+        now = runtime.clock.now_ns()
+        end = now - now % self._interval
+        if end <= self._scanned:
+            return
+        found = []
+        for key, name in enumerate(self._names):
+            for t in timeline.changes_between(name, self._scanned, end):
+                t += -t % self._interval  # premier scan qui voit le changement
+                found.append((t, key))
+        found.sort()
+        for t, key in self._affected(found):
+            pressed = self._level(key, t)
+            if pressed != self._state[key]:
+                self._state[key] = pressed
+                self.events._push(key, pressed, (t // 1000000) % (1 << 29))
+        if self._recheck:
+            # après reset() : une touche déjà enfoncée redonne un appui
+            self._recheck = False
+            for key in range(len(self._names)):
+                if self._level(key, end) != self._state[key]:
+                    self._state[key] = not self._state[key]
+                    self.events._push(key, self._state[key], (end // 1000000) % (1 << 29))
+        self._scanned = end
+
+    def _affected(self, found):
+        """(instant, touche) à réévaluer pour les changements `found` du scénario."""
+        return found
+
+    def _level(self, key, t):
+        return runtime.timeline.level_at(self._names[key], t) == self._active
+
+    def reset(self):
+        self._scan()
+        self._state = [False] * len(self._names)
+        self._recheck = True
+
+    def deinit(self):
+        for name in self._names:
+            runtime.timeline.release(name)
+
+
+class Keys(_Scanner):
+    def __init__(self, pins, *, value_when_pressed, pull=True, interval=0.02,
+                 max_events=64, debounce_threshold=1):
+        names = [pin.name for pin in pins]
+        if pull:
+            for name in names:
+                runtime.timeline.pulls[name] = "DOWN" if value_when_pressed else "UP"
+        super().__init__(names, bool(value_when_pressed), interval, max_events)
+
+
+class KeyMatrix(_Scanner):
+    """Matrice rangs × colonnes. Dans le scénario, chaque interrupteur est une
+    broche virtuelle "RANG/COLONNE" (ex. {"press": "GP2/GP6"}), numéro de touche
+    rang * nb_colonnes + colonne comme le vrai keypad.
+
+    `ghosting` (vrai par défaut) simule une matrice sans diodes : une case est
+    lue fermée dès qu'un chemin d'interrupteurs fermés relie son rang à sa
+    colonne, si bien que trois touches en coin d'un rectangle font apparaître
+    la quatrième."""
+
+    ghosting = True
+
+    def __init__(self, row_pins, column_pins, columns_to_anodes=True, interval=0.02, max_events=64):
+        self._rows = [pin.name for pin in row_pins]
+        self._cols = [pin.name for pin in column_pins]
+        names = [f"{r}/{c}" for r in self._rows for c in self._cols]
+        for name in names:
+            runtime.timeline.pulls[name] = "UP"
+        for name in self._rows + self._cols:
+            runtime.timeline.claim(name)
+        super().__init__(names, False, interval, max_events)
+
+    def _affected(self, found):
+        if not self.ghosting:
+            return found
+        out = []  # tout changement peut ouvrir ou fermer un chemin : toutes les cases
+        for t in sorted(set(t for t, _ in found)):
+            out.extend((t, key) for key in range(len(self._names)))
+        return out
+
+    def _level(self, key, t):
+        closed = super()._level
+        if not self.ghosting or closed(key, t):
+            return closed(key, t)
+        ncols = len(self._cols)
+        rows, cols = {key // ncols}, set()
+        grown = True
+        while grown:  # rangs et colonnes reliés au rang de la case
+            grown = False
+            for k in range(len(self._names)):
+                r, c = divmod(k, ncols)
+                if (r in rows) != (c in cols) and closed(k, t):
+                    rows.add(r)
+                    cols.add(c)
+                    grown = True
+        return key % ncols in cols
+
+    def deinit(self):
+        super().deinit()
+        for name in self._rows + self._cols:
+            runtime.timeline.release(name)
@@ -0,0 +1,20 @@
+# microcontroller — remplaçant hôte (sim)
+
+import sim.runtime as _sim
+from sim.clock import SimulationComplete
+
+
+class _Cpu:
+    frequency = 125000000
+    temperature = 27.0
+    voltage = 3.3
+    uid = bytearray(b"\x00\x00\x00\x00\x00\x00\x00\x01")
+
+
+cpu = _Cpu()
+nvm = _sim.nvm if _sim.nvm is not None else bytearray(4096)
+
+
+def reset():
+    print(f"[SIM] microcontroller.reset() à {_sim.clock.now_ms()} ms")
+    raise SimulationComplete()
@@ -0,0 +1,5 @@
+# micropython — remplaçant hôte (sim)
+
+
+def const(value):
+    return value
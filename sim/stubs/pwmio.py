@@ -0,0 +1,41 @@
+# pwmio — remplaçant hôte (sim) : fréquence et rapport cyclique journalisés
+
+from sim import runtime
+
+
+class PWMOut:
+    def __init__(self, pin, *, duty_cycle=0, frequency=500, variable_frequency=False):
+        runtime.timeline.claim(pin.name)
+        self._name = pin.name
+        self._frequency = frequency
+        self.variable_frequency = variable_frequency
+        self.duty_cycle = duty_cycle
+
+    def deinit(self):
+        runtime.timeline.write(self._name, None)
+        runtime.timeline.release(self._name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.deinit()
+
+    @property
+    def frequency(self):
+        return self._frequency
+
+    @frequency.setter
+    def frequency(self, frequency):
+        if not self.variable_frequency:
+            raise AttributeError("PWM frequency not writable when variable_frequency is False")
+        self._frequency = frequency
+
+    @property
+    def duty_cycle(self):
+        return self._duty_cycle
+
+    @duty_cycle.setter
+    def duty_cycle(self, duty_cycle):
+        self._duty_cycle = duty_cycle
+        runtime.timeline.write(self._name, (self._frequency, duty_cycle) if duty_cycle else 0)
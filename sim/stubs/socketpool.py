@@ -0,0 +1,38 @@
+# socketpool — remplaçant hôte (sim) : sockets CPython, port 80 redirigé vers runtime.http_port
+
+import socket as _socket
+
+from sim import runtime
+
+
+class _Socket(_socket.socket):
+    def bind(self, address):
+        host, port = address
+        if port == 80:
+            port = runtime.http_port
+        if host in ("", "0.0.0.0") or host == str(runtime.http_host):
+            host = runtime.http_host
+        super().bind((host, port))
+
+
+class SocketPool:
+    AF_INET = _socket.AF_INET
+    AF_INET6 = _socket.AF_INET6
+    SOCK_STREAM = _socket.SOCK_STREAM
+    SOCK_DGRAM = _socket.SOCK_DGRAM
+    SOCK_RAW = _socket.SOCK_RAW
+    SOL_SOCKET = _socket.SOL_SOCKET
+    SO_REUSEADDR = _socket.SO_REUSEADDR
+    IPPROTO_TCP = _socket.IPPROTO_TCP
+    TCP_NODELAY = _socket.TCP_NODELAY
+    EAI_NONAME = _socket.EAI_NONAME
+    gaierror = _socket.gaierror
+
+    def __init__(self, radio):
+        self.radio = radio
+
+    def socket(self, family=_socket.AF_INET, type=_socket.SOCK_STREAM, proto=0):
+        return _Socket(family, type, proto)
+
+    def getaddrinfo(self, host, port, family=0, type=0, proto=0, flags=0):
+        return _socket.getaddrinfo(host, port, family, type, proto, flags)
@@ -0,0 +1,17 @@
+# storage — remplaçant hôte (sim) : remount() bascule la lecture seule du FS simulé
+
+from sim import runtime
+
+
+def remount(mount_path, readonly=False, *, disable_concurrent_write_protection=False):
+    if mount_path != "/":
+        raise OSError(22, "Invalid argument")
+    runtime.fs.readonly = readonly
+
+
+def disable_usb_drive():
+    pass
+
+
+def enable_usb_drive():
+    pass
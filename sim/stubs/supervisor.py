@@ -0,0 +1,37 @@
+# supervisor — remplaçant hôte (sim)
+
+import sim.runtime as _sim
+
+
+class SimulationReload(BaseException):
+    """supervisor.reload() : le simulateur relance code.py."""
+
+
+class _Runtime:
+    usb_connected = True
+    serial_connected = True
+    serial_bytes_available = 0
+    autoreload = True
+
+
+runtime = _Runtime()
+
+
+def ticks_ms():
+    return _sim.clock.now_ms() % (1 << 29)
+
+
+def reload():
+    raise SimulationReload()
+
+
+def disable_autoreload():
+    runtime.autoreload = False
+
+
+def enable_autoreload():
+    runtime.autoreload = True
+
+
+def set_next_code_file(filename, **kwargs):
+    pass
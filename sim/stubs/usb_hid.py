@@ -0,0 +1,46 @@
+# usb_hid — remplaçant hôte (sim) : les rapports partent dans le puits HID du simulateur
+
+from sim import runtime
+
+
+class Device:
+    def __init__(self, *, report_descriptor=b"", usage_page, usage, report_ids=(0,),
+                 in_report_lengths=(8,), out_report_lengths=(0,), name="device"):
+        self.usage_page = usage_page
+        self.usage = usage
+        self.report_ids = tuple(report_ids)
+        self.in_report_lengths = tuple(in_report_lengths)
+        self.out_report_lengths = tuple(out_report_lengths)
+        self.name = name
+
+    def send_report(self, report, report_id=None):
+        if len(report) != self.in_report_lengths[0]:
+            raise ValueError(f"Buffer incorrect size. Should be {self.in_report_lengths[0]} bytes.")
+        runtime.hid.send(self, report)
+
+    def get_last_received_report(self, report_id=None):
+        return runtime.hid.received(self)
+
+
+Device.KEYBOARD = Device(usage_page=0x01, usage=0x06, report_ids=(1,),
+                         in_report_lengths=(8,), out_report_lengths=(1,), name="keyboard")
+Device.MOUSE = Device(usage_page=0x01, usage=0x02, report_ids=(2,),
+                      in_report_lengths=(4,), name="mouse")
+Device.CONSUMER_CONTROL = Device(usage_page=0x0C, usage=0x01, report_ids=(3,),
+                                 in_report_lengths=(2,), name="consumer_control")
+
+devices = (Device.KEYBOARD, Device.MOUSE, Device.CONSUMER_CONTROL)
+
+
+def enable(requested_devices, boot_device=0):
+    global devices
+    devices = tuple(requested_devices)
+
+
+def disable():
+    global devices
+    devices = ()
+
+
+def get_boot_device():
+    return 0
@@ -0,0 +1,30 @@
+# wifi — remplaçant hôte (sim) : le point d'accès est l'interface locale de l'hôte
+
+import ipaddress
+
+from sim import runtime
+
+
+class Radio:
+    enabled = True
+    hostname = "bidulebox"
+    mac_address = b"\x28\xcd\xc1\x00\x00\x01"
+    ipv4_address = None
+
+    def start_ap(self, ssid, password="", *, channel=1, authmode=(), max_connections=4):
+        runtime.ap = (ssid, password)
+        print(f"[SIM] AP '{ssid}' → http://{runtime.http_host}:{runtime.http_port}/")
+
+    def stop_ap(self):
+        runtime.ap = None
+
+    @property
+    def ap_active(self):
+        return runtime.ap is not None
+
+    @property
+    def ipv4_address_ap(self):
+        return ipaddress.ip_address(runtime.http_host) if runtime.ap else None
+
+
+radio = Radio()
@@ -0,0 +1,115 @@
+# sim/timeline.py — Scénario d'entrées (GPIO, LEDs clavier de l'hôte) et journal des sorties
+#
+# Un scénario est une liste JSON d'événements horodatés en ms :
+#   {"t_ms": 0,    "pin": "GP15", "value": false}     niveau imposé sur une entrée
+#   {"t_ms": 500,  "press": "GP11", "hold_ms": 80}    appui (niveau bas, boutons en pull-up)
+#   {"t_ms": 900,  "host_leds": 4}                    rapport LED envoyé par l'hôte (4 = Scroll Lock)
+# "press" accepte "active": true pour un bouton câblé vers le 3V3.
+# Une case de matrice (keypad.KeyMatrix) se nomme "RANG/COLONNE" : "GP2/GP6".
+# Le scénario est connu d'avance : le niveau d'une broche à un instant donné
+# est une simple recherche dans son historique, quel que soit le moment où le
+# firmware la lit (DigitalInOut.value ou scan keypad).
+
+import json
+from bisect import bisect_right
+
+_PULL_LEVEL = {"UP": True, "DOWN": False}
+
+
+def load_events(path):
+    """Événements d'un fichier scénario : liste JSON, ou objet {"events": [...]}."""
+    with open(path) as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get("events", [])
+    return data
+
+
+class Timeline:
+    def __init__(self, clock, events=()):
+        self.clock = clock
+        self._changes = {}    # nom de broche -> ([t_ns], [niveau])
+        self._host_leds = []  # [(t_ns, rapport)]
+        self._led_pos = 0
+        self.presses = []     # [(t_ns, broche)] : départs de mesure de latence
+        self.end_ns = 0
+        self.pulls = {}       # nom -> "UP" | "DOWN" | None, réglé par le firmware
+        self.outputs = {}     # nom -> dernier niveau écrit par le firmware
+        self.log = []         # [(t_ns, nom, valeur)] écritures du firmware
+        self._claimed = set()
+        for event in events:
+            self.add(event)
+
+    # ---------- Construction ----------
+    def add(self, event):
+        t = int(event.get("t_ms", 0) * 1000000)
+        if "press" in event:
+            pin = event["press"]
+            active = bool(event.get("active", False))
+            hold = int(event.get("hold_ms", 80) * 1000000)
+            self._set(pin, t, active)
+            self._set(pin, t + hold, not active)
+            self.presses.append((t, pin))
+            t += hold
+        elif "pin" in event:
+            self._set(event["pin"], t, bool(event["value"]))
+        elif "host_leds" in event:
+            self._host_leds.append((t, bytes((int(event["host_leds"]) & 0xFF,))))
+            self._host_leds.sort(key=lambda item: item[0])
+        else:
+            raise ValueError(f"événement de scénario inconnu: {event!r}")
+        self.end_ns = max(self.end_ns, t)
+
+    def _set(self, pin, t_ns, level):
+        times, levels = self._changes.setdefault(pin, ([], []))
+        i = bisect_right(times, t_ns)
+        times.insert(i, t_ns)
+        levels.insert(i, level)
+
+    # ---------- Entrées ----------
+    def level_at(self, pin, t_ns):
+        """Niveau d'une entrée à t_ns : dernier niveau imposé, sinon celui du pull."""
+        changes = self._changes.get(pin)
+        if changes:
+            i = bisect_right(changes[0], t_ns)
+            if i:
+                return changes[1][i - 1]
+        return _PULL_LEVEL.get(self.pulls.get(pin), False)
+
+    def level(self, pin):
+        return self.level_at(pin, self.clock.now_ns())
+
+    def changes_between(self, pin, start_ns, end_ns):
+        """Instants de changement imposés sur `pin` dans ]start_ns, end_ns]."""
+        changes = self._changes.get(pin)
+        if not changes:
+            return []
+        times = changes[0]
+        return times[bisect_right(times, start_ns):bisect_right(times, end_ns)]
+
+    def host_report(self):
+        """Dernier rapport LED de l'hôte pas encore lu (comme get_last_received_report)."""
+        now = self.clock.now_ns()
+        report = None
+        while self._led_pos < len(self._host_leds) and self._host_leds[self._led_pos][0] <= now:
+            report = self._host_leds[self._led_pos][1]
+            self._led_pos += 1
+        return report
+
+    # ---------- Sorties ----------
+    def write(self, pin, value):
+        if self.outputs.get(pin) != value:
+            self.outputs[pin] = value
+            self.log.append((self.clock.now_ns(), pin, value))
+
+    # ---------- Réservation des broches (comme CircuitPython : "GPxx in use") ----------
+    def claim(self, pin):
+        if pin in self._claimed:
+            raise ValueError(f"{pin} in use")
+        self._claimed.add(pin)
+
+    def release(self, pin):
+        self._claimed.discard(pin)
+
+    def release_all(self):
+        self._claimed.clear()
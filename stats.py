@@ -0,0 +1,146 @@
+# stats.py — Histogrammes de durée par macro, en mémoire fixe, gardés en NVM
+#
+# Pour chaque macro (ou bouton) et chaque type de span :
+#   latency : appui traité → premier rapport HID
+#   total   : début → fin de la macro (annulées exclues)
+#   typing  : envoi d'un flux (texte, combo, bloc de fichier), du premier au dernier rapport
+#   wait    : attente (delay_ms/sleep_ms, wait_for_host), durée réelle
+#   secret  : déchiffrement / préparation d'un secret au moment de l'exécution
+# on garde 20 cases log2 en µs (case 0 : < 64 µs, case k : [2^(k+5), 2^(k+6)),
+# la dernière ≥ 16,8 s), le total et le max en µs.
+#
+# Tout tient dans un bytearray de taille fixe, au format de la NVM : code.py
+# le copie dans microcontroller.nvm au passage ON→OFF (s'il a changé), le mode
+# setup le relit pour GET /stats. Au-delà de MAX_MACROS, les macros sont
+# comptées ensemble sous "*".
+#
+#   en-tête : magic "BBST" | u8 version | u8 nb | u16 réservé
+#   macro   : nom (16 octets, UTF-8 complété par des 0) + KINDS × (20 × u16 | u64 total_us | u32 max_us)
+
+import struct
+
+MAGIC = b"BBST"
+VERSION = 1
+KINDS = ("latency", "total", "typing", "wait", "secret")
+LATENCY, TOTAL, TYPING, WAIT, SECRET = range(len(KINDS))
+BUCKETS = 20
+MAX_MACROS = 12
+NVM_OFFSET = 0
+OTHERS = "*"
+
+_HEADER = "<4sBBH"
+_HEADER_SIZE = 8
+_NAME_SIZE = 16
+_KIND_SIZE = BUCKETS * 2 + 12
+_TAIL = "<QI"  # total_us, max_us
+_SLOT_SIZE = _NAME_SIZE + len(KINDS) * _KIND_SIZE
+SIZE = _HEADER_SIZE + MAX_MACROS * _SLOT_SIZE
+
+
+def bucket_of(us):
+    b = 0
+    us >>= 6
+    while us and b < BUCKETS - 1:
+        us >>= 1
+        b += 1
+    return b
+
+
+def bucket_limit_us(b):
+    """Borne haute (exclue) de la case `b` en µs ; None pour la dernière."""
+    return None if b >= BUCKETS - 1 else 1 << (b + 6)
+
+
+class MacroStats:
+    def __init__(self):
+        self.buf = bytearray(SIZE)
+        self._slots = {}   # nom -> indice
+        self.dirty = False
+        self.clear()
+
+    def clear(self):
+        for i in range(SIZE):
+            self.buf[i] = 0
+        struct.pack_into(_HEADER, self.buf, 0, MAGIC, VERSION, 0, 0)
+        self._slots = {}
+        self.dirty = True
+
+    def _slot(self, name):
+        i = self._slots.get(name)
+        if i is None:
+            i = len(self._slots)
+            if i >= MAX_MACROS - 1 and name != OTHERS:
+                return self._slot(OTHERS)  # dernière place : toutes les autres
+            raw = name.encode("utf-8")
+            if len(raw) > _NAME_SIZE:  # tronqué sans couper un caractère : même clé après relecture
+                end = _NAME_SIZE
+                while raw[end] & 0xC0 == 0x80:
+                    end -= 1
+                raw = raw[:end]
+                name = raw.decode("utf-8")
+                if name in self._slots:
+                    return self._slots[name]
+            base = _HEADER_SIZE + i * _SLOT_SIZE
+            self.buf[base:base + len(raw)] = raw
+            self._slots[name] = i
+            self.buf[5] = len(self._slots)
+        return i
+
+    def record(self, name, kind, us):
+        """Ajoute une durée (µs) : quelques struct.pack_into, aucune allocation durable."""
+        if us < 0:
+            return
+        base = _HEADER_SIZE + self._slot(name) * _SLOT_SIZE + _NAME_SIZE + kind * _KIND_SIZE
+        pos = base + 2 * bucket_of(us)
+        (n,) = struct.unpack_from("<H", self.buf, pos)
+        if n < 0xFFFF:
+            struct.pack_into("<H", self.buf, pos, n + 1)
+        pos = base + BUCKETS * 2
+        total_us, max_us = struct.unpack_from(_TAIL, self.buf, pos)
+        struct.pack_into(_TAIL, self.buf, pos, total_us + us, min(0xFFFFFFFF, max(max_us, us)))
+        self.dirty = True
+
+    # ---------- NVM ----------
+    def load(self, nvm, offset=NVM_OFFSET):
+        """Relit l'image gardée en NVM ; False (stats vides) si absente ou d'un autre format."""
+        self.clear()
+        self.dirty = False
+        if nvm is None or len(nvm) < offset + SIZE:
+            return False
+        data = nvm[offset:offset + SIZE]
+        magic, version, count, _ = struct.unpack_from(_HEADER, data, 0)
+        if magic != MAGIC or version != VERSION or count > MAX_MACROS:
+            return False
+        self.buf[:] = data
+        for i in range(count):
+            base = _HEADER_SIZE + i * _SLOT_SIZE
+            raw = bytes(self.buf[base:base + _NAME_SIZE])
+            end = raw.find(b"\0")
+            self._slots[raw[:end if end >= 0 else _NAME_SIZE].decode("utf-8")] = i
+        return True
+
+    def save(self, nvm, offset=NVM_OFFSET):
+        """Écrit l'image en NVM si elle a changé (une écriture flash par passage sur OFF)."""
+        if not self.dirty or nvm is None or len(nvm) < offset + SIZE:
+            return False
+        nvm[offset:offset + SIZE] = self.buf
+        self.dirty = False
+        return True
+
+    # ---------- Export (GET /stats) ----------
+    def to_dict(self):
+        limits = [bucket_limit_us(b) for b in range(BUCKETS)]
+        macros = {}
+        for name, i in self._slots.items():
+            spans = {}
+            for kind, label in enumerate(KINDS):
+                base = _HEADER_SIZE + i * _SLOT_SIZE + _NAME_SIZE + kind * _KIND_SIZE
+                counts = list(struct.unpack_from("<%dH" % BUCKETS, self.buf, base))
+                n = sum(counts)
+                if not n:
+                    continue
+                total_us, max_us = struct.unpack_from(_TAIL, self.buf, base + BUCKETS * 2)
+                spans[label] = {"n": n, "total_ms": total_us // 1000, "mean_ms": total_us / n / 1000,
+                                "max_ms": max_us / 1000, "buckets": counts}
+            macros[name] = spans
+        return {"bucket_limits_us": limits, "kinds": list(KINDS), "macros": macros}
@@ -0,0 +1,26 @@
+# tests/conftest.py — Tests hôte (pytest) : modules du dépôt importables, et
+# les scénarios complets passent par le simulateur (sim/), comme tools/bench.py.
+
+import os
+import sys
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO not in sys.path:
+    sys.path.insert(0, REPO)
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture
+def device(tmp_path):
+    """Simulateur installé sur une copie des fichiers de la carte : imports du
+    firmware (board, storage…) servis par sim/stubs, FS dans tmp_path."""
+    from sim import Simulator, make_root
+
+    sim = Simulator(root=make_root(path=str(tmp_path / "CIRCUITPY")))
+    sim.install()
+    sim.fs.readonly = False
+    try:
+        yield sim
+    finally:
+        sim.uninstall()
@@ -0,0 +1,70 @@
+# tests/test_config_compiler.py — Compilation des macros JSON : une macro mal formée est écartée seule
+
+import json
+import os
+
+import pytest
+
+from sim import Simulator, make_root
+
+BAD_MACROS = {
+    "repeat_null": {"actions": [{"repeat": None, "actions": [{"command": "a"}]}]},
+    "repeat_list": {"actions": [{"repeat": [3], "actions": [{"command": "a"}]}]},
+    "times_dict": {"actions": [{"label": "top"}, {"command": "a"}, {"goto": "top", "times": {}}]},
+    "repeat_text": {"actions": [{"repeat": "trois", "actions": [{"command": "a"}]}]},
+}
+
+
+def _write_macro(root, name, data):
+    with open(os.path.join(root, "macros", name + ".json"), "w") as f:
+        json.dump(data, f)
+
+
+@pytest.mark.parametrize("name", sorted(BAD_MACROS))
+def test_malformed_count_rejects_the_macro(device, name):
+    _write_macro(device.fs.root, name, BAD_MACROS[name])
+    from config_compiler import load_macro
+
+    assert load_macro(name) is None
+
+
+def test_well_formed_counts_compile(device):
+    _write_macro(device.fs.root, "ok", {"actions": [{"repeat": "2", "actions": [{"command": "a"}]},
+                                                    {"label": "top"}, {"goto": "top", "times": 1}]})
+    from config_compiler import load_macro
+
+    assert load_macro("ok") is not None
+
+
+def test_repeat_null_macro_keeps_the_loop_running(tmp_path):
+    root = make_root(path=str(tmp_path / "CIRCUITPY"))
+    if os.path.exists(os.path.join(root, "config.bin")):
+        os.remove(os.path.join(root, "config.bin"))
+    _write_macro(root, "bad", BAD_MACROS["repeat_null"])
+    with open(os.path.join(root, "commands.json"), "w") as f:
+        json.dump({"buttons": [
+            {"id": 1, "pin": "GP11", "macro": "bad", "winsearch": False, "delay_ms": 0},
+            {"id": 2, "pin": "GP2", "command": "b", "winsearch": False, "delay_ms": 0},
+        ]}, f)
+    events = [{"t_ms": 0, "pin": "GP15", "value": False},
+              {"t_ms": 500, "press": "GP11", "hold_ms": 30},
+              {"t_ms": 1000, "press": "GP2", "hold_ms": 30}]
+    sim = Simulator(root=root, events=events, duration_ms=2000)
+    sim.run()
+    keys = [r[2] for _, r in sim.hid.keyboard_reports() if any(r)]
+    assert keys == [0x05]  # "b" ; la macro rejetée n'a rien tapé
+
+
+def test_lazy_profile_load_logs_instead_of_printing(device, capfd):
+    os.makedirs(os.path.join(device.fs.root, "profiles"), exist_ok=True)
+    with open(os.path.join(device.fs.root, "profiles", "broken.json"), "w") as f:
+        f.write("{")
+    import logger
+    from config_compiler import load_profile_buttons
+
+    logger.flush()
+    capfd.readouterr()
+    assert load_profile_buttons("broken", {"buttons": []}, []) is None
+    assert capfd.readouterr().out == ""  # rien d'écrit pendant la boucle
+    logger.flush()
+    assert "[WARN] profil broken illisible" in capfd.readouterr().out
@@ -0,0 +1,129 @@
+# tests/test_executor.py — Exécuteur coopératif : chaque tick rend la main
+
+from executor import (OP_CALL, OP_DEFER, OP_JUMP, OP_LABEL, OP_NEXT, OP_PACE, OP_REPEAT, OP_SEND,
+                      OP_WAIT, Executor)
+from hid_stream import ReportWriter
+
+
+class _Device:
+    def __init__(self):
+        self.reports = []
+
+    def send_report(self, report):
+        self.reports.append(bytes(report))
+
+
+class _Keyboard:
+    def __init__(self):
+        self._keyboard_device = _Device()
+
+
+def _executor(**kwargs):
+    keyboard = _Keyboard()
+    return Executor(ReportWriter(keyboard), **kwargs), keyboard._keyboard_device
+
+
+def _presses(device):
+    return sum(1 for r in device.reports if any(r))
+
+
+KEY_A = bytes((0, 1, 4))  # un enregistrement : sans modificateur, touche A
+
+
+def test_short_sends_are_sliced():
+    ex, device = _executor(records_per_tick=8, ops_per_tick=16)
+    ex.start([(OP_SEND, KEY_A)] * 1000, "suite")
+    t = 0
+    busy = True
+    while busy:
+        before = _presses(device)
+        busy = ex.tick(t)
+        assert _presses(device) - before <= 8
+        t += 1
+    assert _presses(device) == 1000
+
+
+def test_steps_without_sends_are_sliced():
+    ex, _ = _executor(ops_per_tick=16)
+    ex.start([(OP_WAIT, 0)] * 500, "vide")
+    assert ex.tick(0) is True
+    ticks = 1
+    while ex.tick(ticks):
+        ticks += 1
+    assert ticks >= 500 // 16
+
+
+def test_cancel_mid_macro():
+    ex, device = _executor()
+    ex.start([(OP_SEND, KEY_A)] * 100, "annulée")
+    ex.tick(0)
+    assert ex.cancel() is True
+    assert ex.tick(1) is False
+    assert _presses(device) < 100
+
+
+def test_repeat_of_short_sends_is_sliced():
+    ex, device = _executor(records_per_tick=8, ops_per_tick=16)
+    ex.start([(OP_REPEAT, 1000), (OP_SEND, KEY_A), (OP_NEXT, None)], "boucle")
+    assert ex.tick(0) is True
+    assert _presses(device) <= 8
+    ticks = 1
+    while ex.tick(ticks):
+        ticks += 1
+        assert ticks < 10000
+    assert _presses(device) == 1000
+    assert ticks >= 1000 // 8
+
+
+def test_instructions_without_sends_are_sliced():
+    ex, _ = _executor(ops_per_tick=16)
+    ex.start([(OP_REPEAT, 500), (OP_PACE, (0, False)), (OP_NEXT, None)], "vide")
+    assert ex.tick(0) is True
+    ticks = 1
+    while ex.tick(ticks):
+        ticks += 1
+    assert ticks >= 1000 // 16
+
+
+def test_endless_goto_yields_and_cancels():
+    ex, device = _executor()
+    label = ("main", "top")
+    ex.start([(OP_LABEL, label), (OP_SEND, KEY_A), (OP_JUMP, (label, -1))], "sans fin")
+    for t in range(100):
+        before = _presses(device)
+        assert ex.tick(t) is True
+        assert _presses(device) - before <= 1  # un tour par tick
+    assert ex.cancel() is True
+    assert ex.tick(100) is False
+
+
+def test_empty_endless_goto_yields():
+    ex, _ = _executor()
+    label = ("main", "top")
+    ex.start([(OP_LABEL, label), (OP_JUMP, (label, -1))], "vide")
+    assert ex.tick(0) is True
+    assert ex.cancel() is True
+
+
+def test_counted_goto_runs_its_jumps():
+    ex, device = _executor()
+    label = ("main", "again")
+    ex.start([(OP_LABEL, label), (OP_SEND, KEY_A), (OP_JUMP, (label, 2)), (OP_SEND, KEY_A)], "deux")
+    t = 0
+    while ex.tick(t):
+        t += 1
+    assert _presses(device) == 4
+
+
+def test_deferred_calls_run_however_the_macro_ends():
+    done = []
+    ex, _ = _executor()
+    ex.start([(OP_DEFER, lambda: done.append("fin")), (OP_WAIT, 1000), (OP_SEND, KEY_A)], "annulée")
+    ex.tick(0)
+    assert ex.cancel() is True and done == ["fin"]
+
+    def boom():
+        raise RuntimeError("boom")
+
+    ex.start([(OP_DEFER, lambda: done.append("erreur")), (OP_CALL, boom)], "échouée")
+    assert ex.tick(0) is False and done == ["fin", "erreur"]
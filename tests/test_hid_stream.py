@@ -0,0 +1,68 @@
+# tests/test_hid_stream.py — Flux HID : regroupement turbo et touches mortes
+
+import pytest
+
+from hid_stream import ReportWriter, compile_text
+
+
+@pytest.fixture
+def layout(device):
+    from adafruit_hid.keyboard_layout_win_fr import KeyboardLayout  # lib/ du dépôt, via sim
+
+    return KeyboardLayout
+
+
+class _Device:
+    def __init__(self):
+        self.reports = []
+
+    def send_report(self, report):
+        self.reports.append(bytes(report))
+
+
+class _Keyboard:
+    def __init__(self):
+        self._keyboard_device = _Device()
+
+
+def _presses(layout, text, batch):
+    keyboard = _Keyboard()
+    ReportWriter(keyboard).send(compile_text(layout, text), batch=batch)
+    return [r for r in keyboard._keyboard_device.reports if any(r)]
+
+
+def _keys(report):
+    return [k for k in report[2:] if k]
+
+
+def test_turbo_batches_plain_text(layout):
+    assert len(_presses(layout, "abc", True)) == 1
+    assert len(_presses(layout, "abc", False)) == 3
+
+
+def test_turbo_keeps_dead_key_and_base_alone(layout):
+    normal = [_keys(r) for r in _presses(layout, "être", False)]
+    turbo = [_keys(r) for r in _presses(layout, "être", True)]
+    assert len(normal) == 5  # touche morte ^, e, t, r, e
+    assert turbo == [normal[0], normal[1], normal[2] + normal[3] + normal[4]]
+
+
+def test_dead_key_is_not_absorbed_by_the_previous_batch(layout):
+    assert [len(_keys(r)) for r in _presses(layout, "aê", True)] == [1, 1, 1]
+
+
+def test_type_file_reuses_one_output_buffer(layout, tmp_path):
+    from hid_stream import TextFileStream
+
+    text = "ça, être à noël ou ne pas être ; où ?\r\n" * 40
+    path = tmp_path / "texte.txt"
+    path.write_bytes(text.encode("utf-8"))
+    reader = TextFileStream(layout, chunk=64).open(str(path))
+    typed, buffers = bytearray(), set()
+    stream = reader.next()
+    while stream is not None:
+        typed += stream
+        buffers.add(id(stream.obj))
+        stream = reader.next()
+    assert typed == compile_text(layout, text.replace("\r", ""))
+    assert len(buffers) == 1
@@ -0,0 +1,35 @@
+# tests/test_python_macros.py — Macros Python macro_<name>() : étapes minutées, annulables
+
+import json
+import os
+
+from sim import Simulator, make_root
+
+
+def _run(tmp_path, events, duration_ms):
+    root = make_root(path=str(tmp_path / "CIRCUITPY"))
+    if os.path.exists(os.path.join(root, "config.bin")):
+        os.remove(os.path.join(root, "config.bin"))
+    with open(os.path.join(root, "commands.json"), "w") as f:
+        json.dump({"buttons": [{"id": 1, "pin": "GP11", "macro": "marche", "winsearch": False,
+                                "delay_ms": 0}]}, f)
+    sim = Simulator(root=root, events=[{"t_ms": 0, "pin": "GP15", "value": False}] + events,
+                    duration_ms=duration_ms)
+    sim.run()
+    return [(t / 1e6, value) for t, name, value in sim.timeline.log if name == "GP20"]
+
+
+def test_marche_plays_without_blocking_the_loop(tmp_path):
+    buzzer = _run(tmp_path, [{"t_ms": 500, "press": "GP11", "hold_ms": 30}], 12000)
+    notes = [v for _, v in buzzer if v]
+    assert len(notes) == 18 and notes[0] == (392, 2**15)
+    assert buzzer[-1][1] is None  # deinit à la fin
+    assert buzzer[-1][0] - buzzer[0][0] > 8000  # durées des notes respectées
+
+
+def test_switch_off_cancels_and_mutes(tmp_path):
+    buzzer = _run(tmp_path, [{"t_ms": 500, "press": "GP11", "hold_ms": 30},
+                             {"t_ms": 2000, "pin": "GP15", "value": True}], 4000)
+    assert 0 < len([v for _, v in buzzer if v]) < 18
+    t_end, last = buzzer[-1]
+    assert last is None and 2000 <= t_end < 2100  # annulée au passage OFF, buzzer libéré
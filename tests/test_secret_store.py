@@ -0,0 +1,45 @@
+# tests/test_secret_store.py — Coffre binaire : journal, fin tronquée, compactage
+
+from secret_store import SecretStore
+
+
+def _store(tmp_path):
+    return SecretStore(path=str(tmp_path / "secrets.bin"), legacy_dir=str(tmp_path / "keys"))
+
+
+def test_round_trip(tmp_path):
+    store = _store(tmp_path)
+    store.write("a", b"A" * 16)
+    store.write_many([("b", b"B" * 32), ("a", b"a" * 16)])
+    store.delete("b")
+    for s in (store, _store(tmp_path)):
+        assert s.names() == ["a"]
+        assert s.read("a") == b"a" * 16
+
+
+def test_torn_journal_tail(tmp_path):
+    store = _store(tmp_path)
+    store.write("abc", b"A" * 16)
+    with open(store.path, "ab") as f:
+        f.write(b"\x05abc")  # ajout interrompu : en-tête d'entrée incomplet
+
+    store = _store(tmp_path)
+    assert store.read("abc") == b"A" * 16
+    store.write("c", b"C" * 16)
+    assert store.read("c") == b"C" * 16
+
+    reloaded = _store(tmp_path)
+    assert sorted(reloaded.names()) == ["abc", "c"]
+    assert reloaded.read("abc") == b"A" * 16
+    assert reloaded.read("c") == b"C" * 16
+
+
+def test_check_survives_compaction(tmp_path):
+    store = _store(tmp_path)
+    store.write("a", b"A" * 16)
+    store.set_check(b"K" * 16)
+    store.write("b", b"B" * 16)
+    store.compact()
+    reloaded = _store(tmp_path)
+    assert reloaded.key_check() == b"K" * 16
+    assert reloaded.read("b") == b"B" * 16
@@ -0,0 +1,84 @@
+# tests/test_setup.py — Mode setup : PATCH des boutons (fusion, création, broches en double), profils
+
+import json
+import os
+
+import pytest
+
+from sim import Simulator, make_root
+
+
+@pytest.fixture
+def setup(device):
+    import setup
+
+    return setup
+
+
+@pytest.fixture
+def buttons(device):
+    with open(os.path.join(device.fs.root, "commands.json")) as f:
+        return json.load(f)["buttons"]
+
+
+def test_patch_unknown_id_without_pin_is_unknown(setup, buttons):
+    btns, changed, errors, unknown = setup._merge_patches(buttons, [{"id": 42, "command": "x"}])
+    assert unknown == [42] and list(errors) == ["42"]
+    assert changed == [] and len(btns) == len(buttons)
+
+
+def test_patch_creating_on_a_used_pin_collides(setup, buttons):
+    pin = buttons[0]["pin"]
+    btns, changed, errors, _ = setup._merge_patches(buttons, [{"id": 42, "pin": pin}])
+    assert changed == [42] and not errors
+    slot_errors = setup._slot_errors(btns, None, changed)
+    assert list(slot_errors) == ["42"] and pin in slot_errors["42"]
+
+
+def test_patch_creating_on_a_free_pin(setup, buttons):
+    btns, changed, errors, _ = setup._merge_patches(buttons, [{"id": 42, "pin": "GP3", "command": "x"}])
+    assert changed == [42] and not errors
+    assert setup._slot_errors(btns, None, changed) == {}
+
+
+def test_patch_moving_onto_a_matrix_pin_collides(setup, buttons):
+    matrix = {"rows": ["GP3"], "cols": ["GP4"]}
+    bid = buttons[0]["id"]
+    btns, changed, errors, _ = setup._merge_patches(buttons, [{"id": bid, "pin": "gp4"}])
+    assert not errors
+    assert list(setup._slot_errors(btns, matrix, changed)) == [str(bid)]
+
+
+def test_duplicate_matrix_cells_collide(setup):
+    btns = setup._validate_buttons([{"id": 1, "row": 0, "col": 1}, {"id": 2, "row": 0, "col": 1},
+                                    {"id": 3, "row": 1, "col": 1}])
+    assert sorted(setup._slot_errors(btns, {"rows": ["GP2", "GP3"], "cols": ["GP6", "GP7"]})) == ["1", "2"]
+
+
+def _interrupted_profile_swap(root):
+    """Coupure pendant l'échange de save_profile : .json déjà renommé en .back, .tmp complet."""
+    os.makedirs(os.path.join(root, "profiles"), exist_ok=True)
+    with open(os.path.join(root, "profiles", "work.json.tmp"), "w") as f:
+        json.dump({"buttons": [{"id": 1, "command": "new"}]}, f)
+    with open(os.path.join(root, "profiles", "work.back"), "w") as f:
+        json.dump({"buttons": [{"id": 1, "command": "old"}]}, f)
+
+
+def test_setup_restores_an_interrupted_profile_swap(tmp_path):
+    root = make_root(path=str(tmp_path / "CIRCUITPY"))
+    open(os.path.join(root, "setup"), "w").close()
+    _interrupted_profile_swap(root)
+    Simulator(root=root, setup=True, duration_ms=300, http_port=0).run()
+    with open(os.path.join(root, "profiles", "work.json")) as f:
+        assert json.load(f)["buttons"][0]["command"] == "new"
+
+
+def test_device_reads_an_interrupted_profile_swap(device, buttons):
+    _interrupted_profile_swap(device.fs.root)
+    from config_compiler import load_buttons_from_json, load_profile_buttons, profile_names
+
+    data = {"buttons": buttons}
+    assert profile_names() == ["work"]
+    btns = load_profile_buttons("work", data, load_buttons_from_json(data=data))
+    assert btns is not None and btns[0] is not None  # bouton 1 redéfini par le .tmp
+    assert all(b is None for b in btns[1:])
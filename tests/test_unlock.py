@@ -0,0 +1,71 @@
+# tests/test_unlock.py — Passage OFF→ON : clé AES saisie aux boutons, profils configurés
+
+import json
+import os
+import shutil
+
+from sim import Simulator, make_root
+
+KEY = "1" * 20 + "X120"  # bouton 1 pressé 20 fois (séquence + "X" + comptes)
+
+
+def _run(tmp_path, command, capfd, button=None, macros=None, unlock=True, duration_ms=5000):
+    root = make_root(path=str(tmp_path / "CIRCUITPY"))
+    if os.path.exists(os.path.join(root, "config.bin")):
+        os.remove(os.path.join(root, "config.bin"))
+    os.makedirs(os.path.join(root, "profiles"), exist_ok=True)
+    for name, data in (macros or {}).items():
+        with open(os.path.join(root, "macros", name + ".json"), "w") as f:
+            json.dump(data, f)
+    with open(os.path.join(root, "commands.json"), "w") as f:
+        json.dump({"buttons": [dict({"id": 1, "pin": "GP11", "command": command, "winsearch": False,
+                                     "delay_ms": 0}, **(button or {}))]}, f)
+    with open(os.path.join(root, "profiles", "work.json"), "w") as f:
+        json.dump({"buttons": [{"id": 1, "command": "w"}]}, f)
+    events = [{"t_ms": 0, "pin": "GP15", "value": True}]  # OFF : saisie de la clé
+    if unlock:
+        events += [{"t_ms": 200 + 100 * i, "press": "GP11", "hold_ms": 30} for i in range(20)]
+    events += [{"t_ms": 3000, "pin": "GP15", "value": False}, {"t_ms": 4000, "press": "GP11", "hold_ms": 30}]
+    sim = Simulator(root=root, events=events, duration_ms=duration_ms)
+    sim.install()
+    try:
+        sim.fs.readonly = False
+        shutil.rmtree(os.path.join(root, ".keys"), ignore_errors=True)
+        from password_manager import PasswordManager
+
+        PasswordManager(KEY).store_password("user", "bob")
+    finally:
+        sim.uninstall()
+    capfd.readouterr()
+    sim.run()
+    return [r for _, r in sim.hid.keyboard_reports()], capfd.readouterr().out
+
+
+def test_unlock_with_profiles_expands_templates(tmp_path, capfd):
+    plain, _ = _run(tmp_path / "plain", "ssh bob@h\n", capfd)
+    reports, out = _run(tmp_path / "template", "ssh {{secret:user}}@h\n", capfd)
+    assert "[AES] test clé" not in out
+    assert "[VAULT] 1 modèle(s) prêt(s)" in out
+    assert plain and reports == plain
+
+
+# Secret indisponible au milieu d'une macro : elle s'arrête là, sans Entrée ni
+# action suivante (l'exécuteur abandonne sur None)
+SECRET_MACRO = {"login": {"actions": [{"command": "a", "password_key": "missing"}, {"command": "z"}]}}
+
+
+def _keys(reports):
+    return [r[2] for r in reports if any(r)]
+
+
+def test_missing_secret_aborts_the_macro(tmp_path, capfd):
+    reports, out = _run(tmp_path, "", capfd, button={"macro": "login"}, macros=SECRET_MACRO, duration_ms=9000)
+    assert _keys(reports) == [0x14]  # "a" (AZERTY) seul : ni Entrée (0x28) ni "z"
+    assert "secret 'missing'" in out
+
+
+def test_locked_vault_aborts_the_macro(tmp_path, capfd):
+    macros = {"login": {"actions": [{"command": "a", "password_key": "user"}, {"command": "z"}]}}
+    reports, _ = _run(tmp_path, "", capfd, button={"macro": "login"}, macros=macros, unlock=False,
+                      duration_ms=9000)
+    assert _keys(reports) == [0x14]
@@ -0,0 +1,46 @@
+# tests/test_vault.py — Coffre en mémoire : déverrouillage, coffre vide, verrouillage
+
+import pytest
+
+KEY = "1" * 20 + "X120"
+
+
+def _empty_checked_vault():
+    """Coffre dont le contrôle de clé est posé mais qui n'a plus aucun secret."""
+    from password_manager import PasswordManager
+
+    manager = PasswordManager(KEY)
+    manager.store_password("user", "bob")
+    manager.delete_password("user")
+    assert manager.list_names() == []
+
+
+def test_checked_empty_vault_unlocks(device):
+    _empty_checked_vault()
+    from vault import Vault
+
+    vault = Vault()
+    assert vault.unlock(KEY) == 0
+    assert vault.unlocked and vault.get("user") is None
+    vault.wipe()
+    assert not vault.unlocked
+
+
+def test_checked_empty_vault_rejects_a_wrong_key(device):
+    _empty_checked_vault()
+    from vault import Vault
+
+    vault = Vault()
+    with pytest.raises(ValueError):
+        vault.unlock("2" * 20 + "X220")
+    assert not vault.unlocked
+
+
+def test_unlocked_with_secrets(device):
+    from password_manager import PasswordManager
+    from vault import Vault
+
+    PasswordManager(KEY).store_password("user", "bob")
+    vault = Vault()
+    assert vault.unlock(KEY) == 1
+    assert vault.unlocked and bytes(vault.get("user")) == b"bob"
@@ -0,0 +1,297 @@
+# tools/bench.py — Benchmarks de frappe sur le simulateur hôte (sim/), résultats en JSON
+#
+#   python tools/bench.py [--out bench.json] [--only typing,unlock] [--cpu-scale 0]
+#
+# Mesures :
+#   boot     : durée de chaque phase du démarrage de code.py (bootlog) jusqu'au
+#              premier scan des boutons ; cpu_scale vaut 1 si nul (temps CPU hôte)
+#   latency  : appui bouton → premier rapport HID (code.py complet, commande GP11)
+#   typing   : caractères/s via keyboard_layout.write et via les flux précompilés
+#              (hid_stream, avec et sans regroupement turbo), pour du texte
+#              ASCII, à touches mortes et AltGr
+#   macro    : durée de bout en bout de macros/example.json (secret compris),
+#              sans signal hôte et avec wait_for_host (Scroll Lock simulé)
+#   unlock   : déverrouillage des secrets (Vault.unlock → PasswordManager)
+# Les temps "device_*" sont sur l'horloge virtuelle du simulateur (bornée par
+# l'intervalle de polling USB) ; les temps "host_*" sont le CPU réel de l'hôte,
+# utiles pour comparer deux versions du code, pas pour prédire le RP2040.
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import time
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+from sim import Simulator, make_root  # noqa: E402
+
+SWITCH = "GP15"
+KEY_SEQUENCE = (1, 2, 3, 4, 5, 6, 1, 2, 3, 4, 5)
+SAMPLES = {
+    "ascii": "The quick brown fox jumps over the lazy dog, 0123456789.\n",
+    "dead_key": "ãñõÃÑÕìòÌÒâêîôûäëïöü~",
+    "altgr": "#@[\\]{|}€^#@[\\]{|}€",
+}
+
+
+def _perf_ns():
+    return time.perf_counter_ns()
+
+
+# -------------------- Outils de scénario --------------------
+def capture_key(ids):
+    """Clé AES 24 produite par code.py pour cette séquence d'ID (mode OFF)."""
+    counts = {}
+    for i in ids:
+        counts[i] = counts.get(i, 0) + 1
+    seq = "".join(str(i) for i in ids)
+    return seq + "X" + "".join(f"{i}{counts[i]}" for i in sorted(counts))
+
+
+def key_events(buttons, ids, t0=3000, step=200):
+    """Scénario : switch OFF, saisie de la clé, switch ON. Retourne (événements, t fin)."""
+    pins = {b["id"]: b["pin"] for b in buttons}
+    events = [{"t_ms": 0, "pin": SWITCH, "value": True}]
+    t = t0
+    for i in ids:
+        events.append({"t_ms": t, "press": pins[i], "hold_ms": 60})
+        t += step
+    t += 1000
+    events.append({"t_ms": t, "pin": SWITCH, "value": False})
+    return events, t + 1500
+
+
+def prepare_root(buttons=None, secrets=None, aes_key=None):
+    """CIRCUITPY simulé : commands.json éventuellement remplacé, secrets chiffrés."""
+    root = make_root()
+    if buttons is not None:
+        with open(os.path.join(root, "commands.json"), "w") as f:
+            json.dump({"buttons": buttons}, f)
+    if secrets:
+        sim = Simulator(root=root)
+        sim.install()
+        try:
+            sim.fs.readonly = False
+            from password_manager import PasswordManager
+
+            pm = PasswordManager(aes_key)
+            for name, value in secrets.items():
+                pm.store_password(name, value)
+        finally:
+            sim.uninstall()
+    return root
+
+
+def _load_buttons():
+    with open(os.path.join(REPO, "commands.json")) as f:
+        return json.load(f)["buttons"]
+
+
+def _summary(values):
+    values = [v for v in values if v is not None]
+    if not values:
+        return None
+    return {"n": len(values), "min": min(values), "median": statistics.median(values),
+            "max": max(values)}
+
+
+# -------------------- Benchmarks --------------------
+def bench_boot(args):
+    root = make_root()
+    try:
+        sim = Simulator(root=root, events=[{"t_ms": 0, "pin": SWITCH, "value": True}],
+                        cpu_scale=args.cpu_scale or 1.0, duration_ms=200)
+        sim.run()
+        phases = sys.modules["bootlog"].phases()
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    return {
+        "phases_ms": {name: delta for name, _t, delta in phases},
+        "first_scan_ms": phases[-1][1] if phases else None,
+    }
+
+
+def bench_latency(args):
+    presses = 5
+    events = [{"t_ms": 0, "pin": SWITCH, "value": False}]
+    # instants non alignés sur le scan keypad (5 ms) ni sur la boucle (1 ms)
+    events += [{"t_ms": 3000 + 4000 * i + 0.37 * i, "press": "GP11", "hold_ms": 80}
+               for i in range(presses)]
+    root = make_root()
+    try:
+        sim = Simulator(root=root, events=events, cpu_scale=args.cpu_scale,
+                        report_interval_ms=args.report_interval_ms)
+        t0 = _perf_ns()
+        sim.run()
+        host_ms = (_perf_ns() - t0) / 1e6
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    return {
+        "presses": presses,
+        "device_latency_ms": _summary([p["latency_ms"] for p in sim.latencies_ms()]),
+        "host_run_ms": host_ms,
+    }
+
+
+def bench_typing(args):
+    root = make_root()
+    sim = Simulator(root=root, report_interval_ms=args.report_interval_ms)
+    results = {}
+    sim.install()
+    try:
+        import usb_hid
+        from adafruit_hid.keyboard import Keyboard
+        from adafruit_hid.keyboard_layout_win_fr import KeyboardLayout
+        from hid_stream import ReportWriter, compile_text
+
+        keyboard = Keyboard(usb_hid.devices)
+        layout = KeyboardLayout(keyboard)
+        writer = ReportWriter(keyboard)
+        paths = {
+            "layout_write": lambda text: layout.write(text),
+            "hid_stream": lambda text: writer.send(compile_text(KeyboardLayout, text)),
+            "hid_stream_precompiled": None,
+            "hid_stream_turbo": None,
+        }
+        for label, text in SAMPLES.items():
+            text = text * args.repeat
+            stream = compile_text(KeyboardLayout, text)
+            paths["hid_stream_precompiled"] = lambda _text: writer.send(stream)
+            paths["hid_stream_turbo"] = lambda _text: writer.send(stream, batch=True)
+            for path, send in paths.items():
+                n0 = len(sim.hid.reports)
+                v0 = sim.clock.now_ns()
+                t0 = _perf_ns()
+                send(text)
+                host_ns = _perf_ns() - t0
+                device_ns = sim.clock.now_ns() - v0
+                results[f"{label}/{path}"] = {
+                    "chars": len(text),
+                    "reports": len(sim.hid.reports) - n0,
+                    "device_ms": device_ns / 1e6,
+                    "device_chars_per_s": len(text) * 1e9 / device_ns if device_ns else None,
+                    "host_us_per_char": host_ns / 1e3 / len(text),
+                }
+    finally:
+        sim.uninstall()
+        shutil.rmtree(root, ignore_errors=True)
+    return results
+
+
+def bench_macro(args):
+    buttons = _load_buttons()
+    buttons[0] = dict(buttons[0], macro="example", command="", pass_key="", winsearch=False)
+    aes_key = capture_key(KEY_SEQUENCE)
+    results = {}
+    # "fixed" : aucun signal hôte (délais max) ; "host_sync" : l'hôte bascule Scroll Lock toutes les 300 ms
+    for variant in ("fixed", "host_sync"):
+        root = prepare_root(buttons, {"user_pi": "raspberry-Pï"}, aes_key)
+        events, t = key_events(buttons, KEY_SEQUENCE)
+        t_press = t + 500
+        events.append({"t_ms": t_press, "press": buttons[0]["pin"], "hold_ms": 80})
+        if variant == "host_sync":
+            events += [{"t_ms": t_press + 300 * i, "host_leds": 4 if i % 2 else 0}
+                       for i in range(1, 60)]
+        try:
+            sim = Simulator(root=root, events=events, cpu_scale=args.cpu_scale,
+                            report_interval_ms=args.report_interval_ms, idle_ms=15000)
+            t0 = _perf_ns()
+            sim.run()
+            host_ms = (_perf_ns() - t0) / 1e6
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+        reports = [(ts, r) for ts, r in sim.hid.keyboard_reports() if ts >= t_press * 1e6]
+        end = reports[-1][0] / 1e6 if reports else None
+        results[variant] = {
+            "macro": "example",
+            "reports": len(reports),
+            "first_report_ms": reports[0][0] / 1e6 - t_press if reports else None,
+            "end_to_end_ms": end - t_press if end is not None else None,
+            "host_run_ms": host_ms,
+        }
+    return results
+
+
+def bench_unlock(args):
+    aes_key = capture_key(KEY_SEQUENCE)
+    results = {}
+    for count in (1, 8, 32):
+        secrets = {f"secret{i:02d}": f"p@ssw0rd-{i}-àé€" for i in range(count)}
+        root = prepare_root(secrets=secrets, aes_key=aes_key)
+        sim = Simulator(root=root)
+        sim.install()
+        try:
+            from password_manager import PasswordManager
+            from vault import Vault
+
+            times = []
+            for _ in range(args.rounds):
+                vault = Vault()
+                t0 = _perf_ns()
+                vault.unlock(aes_key)
+                times.append((_perf_ns() - t0) / 1e6)
+                vault.wipe()
+            t0 = _perf_ns()
+            PasswordManager(aes_key, create_dir=False).load_password("secret00")
+            one_ms = (_perf_ns() - t0) / 1e6
+            t0 = _perf_ns()
+            PasswordManager(aes_key, create_dir=False).verify_key()
+            verify_ms = (_perf_ns() - t0) / 1e6
+        finally:
+            sim.uninstall()
+            shutil.rmtree(root, ignore_errors=True)
+        results[f"{count}_secrets"] = {"host_unlock_ms": _summary(times),
+                                       "host_load_one_ms": one_ms,
+                                       "host_verify_key_ms": verify_ms}
+    return results
+
+
+BENCHMARKS = {
+    "boot": bench_boot,
+    "latency": bench_latency,
+    "typing": bench_typing,
+    "macro": bench_macro,
+    "unlock": bench_unlock,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks BiduleBox (simulateur hôte)")
+    parser.add_argument("--out", help="fichier JSON (défaut : sortie standard)")
+    parser.add_argument("--only", help="liste séparée par des virgules parmi: " + ",".join(BENCHMARKS))
+    parser.add_argument("--cpu-scale", type=float, default=0.0,
+                        help="temps CPU hôte × facteur ajouté à l'horloge virtuelle")
+    parser.add_argument("--report-interval-ms", type=float, default=1.0)
+    parser.add_argument("--repeat", type=int, default=4, help="répétitions des textes de frappe")
+    parser.add_argument("--rounds", type=int, default=3, help="répétitions du déverrouillage")
+    args = parser.parse_args(argv)
+
+    names = args.only.split(",") if args.only else list(BENCHMARKS)
+    out = {
+        "python": sys.version.split()[0],
+        "cpu_scale": args.cpu_scale,
+        "report_interval_ms": args.report_interval_ms,
+        "results": {},
+    }
+    stdout = sys.stdout
+    for name in names:
+        # les print() du firmware vont sur stderr : stdout reste du JSON
+        sys.stdout = sys.stderr
+        try:
+            out["results"][name] = BENCHMARKS[name](args)
+        finally:
+            sys.stdout = stdout
+    text = json.dumps(out, indent=1)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
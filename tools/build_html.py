@@ -0,0 +1,165 @@
+# tools/build_html.py — Prépare /html pour le serveur du mode setup
+#
+#   python tools/build_html.py [--src html] [--out html]
+#
+# Pour chaque fichier de l'UI : minification prudente (indentation, lignes
+# vides, commentaires), gzip (niveau 9, horodatage nul : sortie
+# reproductible) dans <nom>.gz, et ETag = CRC32 du contenu minifié. Les
+# références de index.html vers les CSS/JS reçoivent ?v=<etag> : ces fichiers
+# peuvent alors être mis en cache un an, index.html étant toujours revalidé
+# (304 si inchangé). Le tout est décrit dans manifest.json (chemin → taille
+# servie, type MIME, ETag) : setup.py le charge au démarrage et résout chaque
+# requête statique par une simple recherche dans ce dictionnaire, sans
+# parcourir /html.
+# Les fichiers générés ne sont pas versionnés : relancer ce script après
+# chaque modification de html/ puis copier html/ sur CIRCUITPY.
+
+import argparse
+import binascii
+import gzip
+import json
+import os
+import re
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MANIFEST = "manifest.json"
+_SKIP_SUFFIXES = (".gz",)
+
+# Mêmes types que adafruit_httpserver.MIMETypes pour les fichiers d'une UI web
+MIME_TYPES = {
+    ".html": "text/html", ".htm": "text/html", ".js": "text/javascript",
+    ".css": "text/css", ".json": "application/json", ".txt": "text/plain",
+    ".png": "image/png", ".jpg": "image/jpeg", ".jpeg": "image/jpeg",
+    ".gif": "image/gif", ".svg": "image/svg+xml", ".webp": "image/webp",
+    ".ico": "image/vnd.microsoft.icon", ".woff2": "font/woff2",
+}
+
+
+def etag_of(data):
+    return '"%08x"' % (binascii.crc32(data) & 0xFFFFFFFF)
+
+
+# -------------------- Minification prudente --------------------
+def _backticks(line):
+    """Nombre de ` non échappés : un nombre impair ouvre/ferme un gabarit multiligne."""
+    return len(re.findall(r"(?<!\\)`", line))
+
+
+def minify_js(text):
+    out = []
+    in_template = False
+    for line in text.splitlines():
+        if in_template:
+            out.append(line)  # contenu d'un gabarit `...` : pris tel quel
+        else:
+            stripped = line.strip()
+            if not stripped or stripped.startswith("//"):
+                continue
+            out.append(stripped)
+        if _backticks(line) % 2:
+            in_template = not in_template
+    return "\n".join(out) + "\n"
+
+
+def minify_css(text):
+    text = re.sub(r"/\*.*?\*/", "", text, flags=re.S)
+    text = " ".join(text.split())
+    text = re.sub(r"\s*([{};])\s*", r"\1", text)
+    text = re.sub(r"([:,])\s+", r"\1", text)
+    return text.replace(";}", "}") + "\n"
+
+
+def minify_html(text):
+    text = re.sub(r"<!--(?!\[).*?-->", "", text, flags=re.S)
+    out = []
+    raw = False  # <pre>/<textarea> sur plusieurs lignes : espaces significatifs
+    for line in text.splitlines():
+        if raw:
+            out.append(line)
+        else:
+            stripped = line.strip()
+            if stripped:
+                out.append(stripped)
+        opened = len(re.findall(r"<(pre|textarea)\b", line, flags=re.I))
+        closed = len(re.findall(r"</(pre|textarea)>", line, flags=re.I))
+        if opened != closed:
+            raw = opened > closed
+    return "\n".join(out) + "\n"
+
+
+MINIFIERS = {".js": minify_js, ".css": minify_css, ".html": minify_html, ".htm": minify_html}
+
+
+def version_refs(html, etags):
+    """href="style.css" / src="script.js" → ?v=<etag> pour les fichiers construits."""
+    def repl(m):
+        attr, quote, url = m.group(1), m.group(2), m.group(3)
+        rel = "/" + url.lstrip("./")
+        etag = etags.get(rel)
+        if etag is None or "?" in url or "://" in url:
+            return m.group(0)
+        return f"{attr}={quote}{url}?v={etag.strip(chr(34))}{quote}"
+
+    return re.sub(r"""\b(href|src)=(["'])([^"'#]+)\2""", repl, html)
+
+
+# -------------------- Construction --------------------
+def _sources(src):
+    for dirpath, dirnames, filenames in os.walk(src):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith("."))
+        for name in sorted(filenames):
+            if name.startswith(".") or name.endswith(_SKIP_SUFFIXES) or name == MANIFEST:
+                continue
+            full = os.path.join(dirpath, name)
+            yield full, "/" + os.path.relpath(full, src).replace(os.sep, "/")
+
+
+def build(src, out):
+    files = sorted(_sources(src), key=lambda item: item[1].endswith((".html", ".htm")))
+    etags = {}
+    manifest = {}
+    report = []
+    for full, rel in files:  # pages HTML en dernier : elles référencent les ETags des autres
+        with open(full, "rb") as f:
+            data = f.read()
+        ext = os.path.splitext(rel)[1].lower()
+        minify = MINIFIERS.get(ext)
+        if minify:
+            text = minify(data.decode("utf-8"))
+            if ext in (".html", ".htm"):
+                text = version_refs(text, etags)
+            data = text.encode("utf-8")
+        etags[rel] = etag_of(data)
+        packed = gzip.compress(data, 9, mtime=0)
+        dst = os.path.join(out, rel.lstrip("/") + ".gz")
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        with open(dst, "wb") as f:
+            f.write(packed)
+        manifest[rel] = {
+            "size": len(packed),
+            "mime": MIME_TYPES.get(ext, "application/octet-stream"),
+            "etag": etags[rel],
+            "gzip": True,
+        }
+        report.append((rel, os.path.getsize(full), len(data), len(packed)))
+    with open(os.path.join(out, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Minifie + gzip les fichiers de l'UI setup")
+    parser.add_argument("--src", default=os.path.join(REPO, "html"))
+    parser.add_argument("--out", help="dossier de sortie (défaut : --src)")
+    args = parser.parse_args(argv)
+    out = args.out or args.src
+    total = [0, 0]
+    for rel, size, minified, packed in build(args.src, out):
+        print(f"{rel:<24} {size:>7} → {minified:>7} (min) → {packed:>6} (gz)")
+        total[0] += size
+        total[1] += packed
+    print(f"{'total':<24} {total[0]:>7} → {total[1]:>6} octets")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+# tools/compile_config.py — Compile commands.json + macros/*.json dans config.bin
+#
+#   python tools/compile_config.py [--root /media/CIRCUITPY] [--check]
+#
+# Même compilation que setup.py à chaque enregistrement (config_compiler.py +
+# config_cache.py, exécutés sur l'hôte via les remplaçants de sim/) : à lancer
+# après avoir modifié commands.json ou une macro directement sur le lecteur
+# USB. Sans image à jour, code.py retombe sur le JSON (boot plus lent).
+
+import argparse
+import os
+import sys
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+from sim import Simulator  # noqa: E402
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile la configuration BiduleBox dans config.bin")
+    parser.add_argument("--root", default=REPO, help="racine CIRCUITPY (défaut : le dépôt)")
+    parser.add_argument("--check", action="store_true", help="indique seulement si l'image est à jour")
+    args = parser.parse_args(argv)
+
+    sim = Simulator(root=os.path.abspath(args.root))
+    sim.install()
+    try:
+        sim.fs.readonly = False
+        import config_cache
+
+        if args.check:
+            fresh = config_cache.load() is not None
+            print("config.bin à jour" if fresh else "config.bin absent ou périmé")
+            return 0 if fresh else 1
+        import logger
+
+        n, size = config_cache.rebuild()
+        logger.flush()
+        print(f"config.bin : boutons + {n} macro(s), {size} octets")
+        return 0
+    finally:
+        sim.uninstall()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
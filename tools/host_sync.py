@@ -0,0 +1,116 @@
+# tools/host_sync.py — Signal "hôte prêt" pour les actions wait_for_host
+# Tourne sur le PC où la BiduleBox est branchée : bascule Scroll Lock (la LED
+# arrive à la box dans le rapport de sortie clavier), ce qui termine l'attente
+# en cours de la macro sans attendre son délai max.
+#
+#   python tools/host_sync.py toggle                        bascule tout de suite
+#   python tools/host_sync.py wait --port 192.168.1.2:22    quand le port répond
+#   python tools/host_sync.py wait --window PuTTY           quand la fenêtre existe (Windows)
+#   python tools/host_sync.py wait --cmd "ping -n 1 rpi"    quand la commande réussit
+#
+# Bascule Scroll Lock via user32 (Windows) ou xdotool (Linux/X11).
+
+import argparse
+import socket
+import subprocess
+import sys
+import time
+
+VK_SCROLL = 0x91
+KEYEVENTF_KEYUP = 0x0002
+
+
+def toggle_scroll_lock():
+    if sys.platform == "win32":
+        import ctypes
+
+        user32 = ctypes.windll.user32
+        user32.keybd_event(VK_SCROLL, 0x46, 0, 0)
+        user32.keybd_event(VK_SCROLL, 0x46, KEYEVENTF_KEYUP, 0)
+    else:
+        try:
+            subprocess.run(["xdotool", "key", "Scroll_Lock"], check=True)
+        except FileNotFoundError:
+            raise SystemExit("host_sync: xdotool introuvable (Linux/X11 requis hors Windows)")
+
+
+def _port_open(target):
+    host, _, port = target.rpartition(":")
+    try:
+        with socket.create_connection((host, int(port)), timeout=1):
+            return True
+    except OSError:
+        return False
+
+
+def _window_exists(title):
+    if sys.platform != "win32":
+        raise SystemExit("host_sync: --window n'est disponible que sous Windows")
+    import ctypes
+
+    user32 = ctypes.windll.user32
+    found = []
+
+    @ctypes.WINFUNCTYPE(ctypes.c_bool, ctypes.c_void_p, ctypes.c_void_p)
+    def visit(hwnd, _):
+        n = user32.GetWindowTextLengthW(hwnd)
+        if n and user32.IsWindowVisible(hwnd):
+            buf = ctypes.create_unicode_buffer(n + 1)
+            user32.GetWindowTextW(hwnd, buf, n + 1)
+            if title.lower() in buf.value.lower():
+                found.append(hwnd)
+                return False
+        return True
+
+    user32.EnumWindows(visit, 0)
+    return bool(found)
+
+
+def _cmd_ok(cmd):
+    return subprocess.run(cmd, shell=True, stdout=subprocess.DEVNULL,
+                          stderr=subprocess.DEVNULL).returncode == 0
+
+
+def wait_ready(args):
+    checks = []
+    if args.port:
+        checks.append(lambda: _port_open(args.port))
+    if args.window:
+        checks.append(lambda: _window_exists(args.window))
+    if args.cmd:
+        checks.append(lambda: _cmd_ok(args.cmd))
+    deadline = time.monotonic() + args.timeout
+    while not all(check() for check in checks):
+        if time.monotonic() >= deadline:
+            print("host_sync: délai écoulé, pas de signal (la macro attendra son délai max)")
+            return False
+        time.sleep(args.interval)
+    if args.settle:
+        time.sleep(args.settle)
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Signal wait_for_host (Scroll Lock) pour la BiduleBox")
+    sub = parser.add_subparsers(dest="action", required=True)
+    sub.add_parser("toggle", help="bascule Scroll Lock maintenant")
+    wait = sub.add_parser("wait", help="attend que l'hôte soit prêt puis bascule Scroll Lock")
+    wait.add_argument("--port", help="HOST:PORT qui doit accepter une connexion TCP")
+    wait.add_argument("--window", help="titre (partiel) d'une fenêtre visible, Windows")
+    wait.add_argument("--cmd", help="commande qui doit réussir (code retour 0)")
+    wait.add_argument("--timeout", type=float, default=30.0, help="secondes avant abandon")
+    wait.add_argument("--interval", type=float, default=0.2, help="secondes entre deux essais")
+    wait.add_argument("--settle", type=float, default=0.0, help="secondes d'attente en plus avant le signal")
+    args = parser.parse_args(argv)
+
+    if args.action == "wait":
+        if not (args.port or args.window or args.cmd):
+            parser.error("wait: au moins une condition (--port, --window, --cmd)")
+        if not wait_ready(args):
+            return 1
+    toggle_scroll_lock()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
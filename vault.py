@@ -0,0 +1,74 @@
+# vault.py — Coffre de secrets déverrouillé en mémoire
+# Au passage OFF→ON, tous les secrets de /.keys sont déchiffrés une seule fois
+# (un seul chiffreur AES) dans des bytearray ; les lectures suivantes sont un
+# simple accès dict. Au retour sur OFF, les tampons sont mis à zéro et oubliés.
+
+import logger
+from password_manager import PasswordManager, valid_utf8
+
+
+def wipe_buffer(buf):
+    """Écrase un bytearray en place (secret ou flux HID contenant un secret)."""
+    for i in range(len(buf)):
+        buf[i] = 0
+
+
+class Vault:
+    """Secrets déchiffrés, bornés en nombre et en taille totale."""
+
+    def __init__(self, max_secrets=32, max_bytes=2048):
+        self.max_secrets = max_secrets
+        self.max_bytes = max_bytes
+        self._secrets = {}
+        self._size = 0
+        self._unlocked = False
+
+    @property
+    def unlocked(self):
+        return self._unlocked
+
+    def __len__(self):
+        return len(self._secrets)
+
+    def __contains__(self, name):
+        return name in self._secrets
+
+    def unlock(self, aes_key):
+        """Déchiffre tous les secrets avec `aes_key`. Retourne leur nombre.
+
+        Lève ValueError si la clé est invalide (longueur, contrôle de clé du
+        coffre ou, pour un coffre sans contrôle, un secret qui ne se déchiffre
+        pas en UTF-8 valide). Un coffre vide n'est déverrouillé (0) que si le
+        contrôle de clé l'a validée : sans contrôle, rien ne prouve la clé.
+        """
+        self.wipe()
+        manager = PasswordManager(aes_key, create_dir=False)
+        verified = manager.verify_key()
+        if verified is False:
+            raise ValueError("clé AES invalide (contrôle du coffre)")
+        for name, secret in manager.iter_passwords():
+            if not verified and not valid_utf8(secret):
+                wipe_buffer(secret)
+                self.wipe()
+                raise ValueError(f"clé AES invalide (secret '{name}' illisible)")
+            if len(self._secrets) >= self.max_secrets or self._size + len(secret) > self.max_bytes:
+                logger.warn("[VAULT] coffre plein : '%s' ignoré", name)
+                wipe_buffer(secret)
+                continue
+            self._secrets[name] = secret
+            self._size += len(secret)
+        if not self._secrets and not verified:
+            raise ValueError("aucun secret déchiffré")
+        self._unlocked = True
+        return len(self._secrets)
+
+    def get(self, name):
+        """Secret en clair (bytearray, à ne pas conserver) ou None."""
+        return self._secrets.get(name)
+
+    def wipe(self):
+        for secret in self._secrets.values():
+            wipe_buffer(secret)
+        self._secrets = {}
+        self._size = 0
+        self._unlocked = False